@@ -0,0 +1,199 @@
+""" Benchmark suite timing the throughput, peak memory and scaling of the FastaSeq methods, with regression gates
+against a stored baseline. Run it with python -m benchmarks.bench --help. """
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import writeFasta
+from source.sequences import FastaSeq
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# A run slower (or using more memory) than the baseline by more than this fraction is a regression
+THRESHOLD = 0.25
+# Slowdowns smaller than this many seconds are timer noise and never count as regressions
+NOISE_SECONDS = 1e-3
+REPEAT_LENGTH = 8
+LENGTH_UNITS = {'': 1, 'K': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9}
+
+
+def _first(fs):
+    """ _first returns the first sequence of the instance dictionary """
+    return fs.sequences[next(iter(fs.sequences))]
+
+
+# Each case runs one method on a loaded file and tells whether it processes the whole file or the first record
+CASES = {
+    'buildDict': (True, lambda fs, filename: fs.buildDict(filename)),
+    'getStopCodons': (False, lambda fs, filename: fs.getStopCodons(_first(fs))),
+    'getStartCodons': (False, lambda fs, filename: fs.getStartCodons(_first(fs))),
+    'getLongestORF': (False, lambda fs, filename: fs.getLongestORF(_first(fs))),
+    'getFileLongestORF': (True, lambda fs, filename: fs.getFileLongestORF()),
+    'getRepeats': (False, lambda fs, filename: fs.getRepeats(_first(fs), REPEAT_LENGTH)),
+    'getMultiSeqRepeats': (True, lambda fs, filename: fs.getMultiSeqRepeats(fs.sequences, REPEAT_LENGTH)),
+}
+
+
+def parseLength(text):
+    """ parseLength reads a record length such as 1k, 10k or 100M (powers of 1000, an optional trailing b) """
+    size = text.strip().upper()
+    size = size[:-1] if size.endswith('B') else size
+    unit = size[-1:] if size[-1:] in LENGTH_UNITS else ''
+    return int(float(size[:len(size) - len(unit)]) * LENGTH_UNITS[unit])
+
+
+def measure(case, filename, repeat=3):
+    """ measure times one case on a file and then runs it once more under tracemalloc for its peak allocation
+
+    Args:
+        case (str): The name of the case in CASES
+        filename (str): The FASTA file to load
+        repeat (int): How many timed runs to take the best of
+
+    Returns:
+        { 'seconds': float, 'bases_per_second': float, 'peak_bytes': int }: The best time, the throughput it gives
+        and the peak memory allocated by one run
+    """
+    whole_file, run = CASES[case]
+    fs = FastaSeq()
+    fs.disableCache()
+    fs.buildDict(filename)
+    bases = sum(fs.getAllLengths()) if whole_file else len(_first(fs))
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(fs, filename)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run(fs, filename)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        fs.close()
+    return {'seconds': best, 'bases_per_second': bases / best if best else math.inf, 'peak_bytes': peak}
+
+
+def runSuite(sizes=DEFAULT_SIZES, records=4, gc=0.5, repeat_density=0.1, repeat=3, cases=None, seed=0):
+    """ runSuite generates one synthetic file per record length and measures every case on each
+
+    Args:
+        sizes ([ int length ]): The record lengths to generate
+        records (int): The number of records per file
+        gc (float): The GC content of the records
+        repeat_density (float): The share of each record made of repeated motifs
+        repeat (int): How many timed runs to take the best of
+        cases ([ str case ]): The cases to run, defaults to all of CASES
+        seed (int): The random seed of the generator
+
+    Returns:
+        { str case: { str length: measure result } }: The measurements
+    """
+    results = {case: {} for case in cases or CASES}
+    workdir = tempfile.mkdtemp()
+    try:
+        for size in sizes:
+            filename = os.path.join(workdir, f"synthetic_{size}.fasta")
+            writeFasta(filename, records, size, gc, repeat_density, seed)
+            for case in results:
+                results[case][str(size)] = measure(case, filename, repeat)
+            os.remove(filename)
+    finally:
+        shutil.rmtree(workdir)
+    return results
+
+
+def scaling(results):
+    """ scaling estimates how each case grows with the record length, as the log-log slope between consecutive
+    sizes: about 1 for linear time, 2 for quadratic
+
+    Returns:
+        { str case: [ (int low, int high, float exponent) ] }: The exponent between each pair of sizes
+    """
+    curves = {}
+    for case, runs in results.items():
+        sizes = sorted(int(size) for size in runs)
+        curves[case] = [(low, high, math.log(max(runs[str(high)]['seconds'], 1e-9) / max(runs[str(low)]['seconds'], 1e-9))
+                         / math.log(high / low)) for low, high in zip(sizes, sizes[1:])]
+    return curves
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """ compare flags every measurement that is slower, or allocates more at its peak, than the baseline by more
+    than threshold. Slowdowns under NOISE_SECONDS and measurements missing from the baseline are not flagged.
+
+    Returns:
+        [ (str case, str length, str metric, float baseline, float current) ]: The regressions
+    """
+    regressions = []
+    for case, runs in results.items():
+        for size, current in runs.items():
+            base = baseline.get(case, {}).get(size)
+            if base is None:
+                continue
+            for metric, noise in (('seconds', NOISE_SECONDS), ('peak_bytes', 0)):
+                if current[metric] > base[metric] * (1 + threshold) and current[metric] - base[metric] > noise:
+                    regressions.append((case, size, metric, base[metric], current[metric]))
+    return regressions
+
+
+def formatResults(results, curves, regressions):
+    """ formatResults renders the measurements, scaling exponents and regressions as a text table """
+    lines = [f"{'case':<20}{'length':>12}{'seconds':>12}{'Mbases/s':>12}{'peak MiB':>12}"]
+    for case, runs in results.items():
+        for size, run in sorted(runs.items(), key=lambda item: int(item[0])):
+            lines.append(f"{case:<20}{size:>12}{run['seconds']:>12.4f}{run['bases_per_second'] / 1e6:>12.2f}"
+                         f"{run['peak_bytes'] / (1 << 20):>12.2f}")
+        if curves.get(case):
+            lines.append(f"{'':<20}scaling exponents " + ', '.join(f"{low}->{high}: {exp:.2f}"
+                                                                   for low, high, exp in curves[case]))
+    for case, size, metric, base, current in regressions:
+        lines.append(f"REGRESSION {case} at {size}: {metric} {current:.4g} vs baseline {base:.4g}")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+    """ main runs the suite, prints the results and returns 1 when any measurement regressed against the baseline,
+    or 2 when there is no baseline to gate against """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench', description="Benchmark the FastaSeq methods "
+                                     "over synthetic multi-FASTA files and gate on regressions.")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated record lengths, such as 1k,1M,100M")
+    parser.add_argument('--records', type=int, default=4, help="records per file")
+    parser.add_argument('--gc', type=float, default=0.5, help="GC content, between 0 and 1")
+    parser.add_argument('--repeat-density', type=float, default=0.1, help="share of each record made of repeats")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per measurement, the best is kept")
+    parser.add_argument('--cases', help="comma separated cases to run, from " + ', '.join(CASES))
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the generator")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="the baseline results to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="allowed slowdown, 0.25 for 25%%")
+    parser.add_argument('--output', help="also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+    cases = args.cases.split(',') if args.cases else None
+    results = runSuite([parseLength(size) for size in args.sizes.split(',')], args.records, args.gc,
+                       args.repeat_density, args.repeat, cases, args.seed)
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    regressions = compare(results, baseline, args.threshold)
+    sys.stdout.write(formatResults(results, scaling(results), regressions))
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(results, file, indent=2)
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        sys.stderr.write(f"No baseline at {args.baseline}, nothing was gated; store one with --save-baseline\n")
+        return 2
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+""" Deterministic synthetic multi-FASTA generator with tunable record count, length, GC content and repeat density """
+import random
+
+LINE_WIDTH = 60
+# Motifs are drawn from a pool shared by every record, so repeats also occur across records
+MOTIF_COUNT = 16
+MOTIF_LENGTHS = (20, 200)
+
+
+def baseWeights(gc):
+    """ baseWeights returns the A, C, G, T weights giving a GC content of gc """
+    if not 0 <= gc <= 1:
+        raise ValueError("GC content must be between 0 and 1")
+    return [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2]
+
+
+def generateSequence(rng, length, weights, motifs=(), repeat_density=0.0):
+    """ generateSequence builds one sequence from random blocks, replacing about repeat_density of them with a copy
+    of a motif
+
+    Args:
+        rng (random.Random): The random source, which makes the output reproducible
+        length (int): The length of the sequence
+        weights ([ float ]): The A, C, G, T weights, see baseWeights
+        motifs ([ str motif ]): The motifs to repeat
+        repeat_density (float): The share of the sequence made of motif copies, between 0 and 1
+
+    Returns:
+        str sequence: The generated sequence, in uppercase
+    """
+    parts = []
+    filled = 0
+    while filled < length:
+        if motifs and rng.random() < repeat_density:
+            part = rng.choice(motifs)
+        else:
+            part = ''.join(rng.choices('ACGT', weights, k=rng.randint(*MOTIF_LENGTHS)))
+        parts.append(part)
+        filled += len(part)
+    return ''.join(parts)[:length]
+
+
+def generateRecords(records, length, gc=0.5, repeat_density=0.0, seed=0):
+    """ generateRecords yields synthetic records one at a time; the same arguments always give the same records
+
+    Args:
+        records (int): The number of records
+        length (int): The length of every record
+        gc (float): The GC content, between 0 and 1
+        repeat_density (float): The share of each record made of copies of shared motifs, between 0 and 1
+        seed (int): The random seed
+
+    Returns:
+        generator of (str name, str sequence): The records
+    """
+    rng = random.Random(seed)
+    weights = baseWeights(gc)
+    motifs = [''.join(rng.choices('ACGT', weights, k=rng.randint(*MOTIF_LENGTHS))) for _ in range(MOTIF_COUNT)]
+    for idx in range(records):
+        yield f"synthetic|{seed}|{idx}", generateSequence(rng, length, weights, motifs, repeat_density)
+
+
+def writeFasta(filename, records, length, gc=0.5, repeat_density=0.0, seed=0):
+    """ writeFasta writes the records of generateRecords to a multi-FASTA file with LINE_WIDTH bases per line
+
+    Args:
+        filename (str): The name of the file to write
+        records, length, gc, repeat_density, seed: See generateRecords
+
+    Returns:
+        int bases: The number of bases written
+    """
+    bases = 0
+    with open(filename, 'w') as file:
+        for name, seq in generateRecords(records, length, gc, repeat_density, seed):
+            file.write(f">{name} length={length} gc={gc} repeats={repeat_density}\n")
+            for start in range(0, len(seq), LINE_WIDTH):
+                file.write(seq[start:start + LINE_WIDTH] + '\n')
+            bases += len(seq)
+    return bases
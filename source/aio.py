@@ -0,0 +1,102 @@
+""" asyncio API that runs loads and scans in shared, bounded worker pools, so one event loop can serve many FASTA jobs """
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from source.kmers import countKmers, countMultiKmers
+from source.parallel import batchTasks, runBatch
+from source.sequences import FastaSeq, recordLongestORF, reduceORFs
+
+
+class AnalysisPool():
+    """ Worker pools shared by any number of AsyncFastaSeq: a thread pool for loading files, where reading and
+    decompression release the GIL, and a process pool for the CPU-bound scans. At most max_pending scan tasks are
+    handed to the process pool at once; the others wait in the event loop, so a burst of jobs cannot pile up
+    unbounded work (and the sequences it carries) in the pool's queue. """
+
+    def __init__(self, jobs=None, io_threads=4, max_pending=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.io = ThreadPoolExecutor(max_workers=io_threads)
+        self.cpu = ProcessPoolExecutor(max_workers=self.jobs)
+        self.max_pending = max_pending or 2 * self.jobs
+        self._slots = None                      # created in the running event loop on first use
+
+    async def load(self, func, *args, **kwargs):
+        """ load runs a blocking loader in the thread pool """
+        return await asyncio.get_running_loop().run_in_executor(self.io, partial(func, *args, **kwargs))
+
+    async def scan(self, func, *args):
+        """ scan runs a picklable function in the process pool once one of the max_pending slots is free """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self.cpu, partial(func, *args))
+
+    def close(self):
+        """ close shuts both pools down, waiting for running tasks """
+        self.io.shutdown()
+        self.cpu.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+class AsyncFastaSeq():
+    """ An asynchronous front end to one FastaSeq. Loading runs in the pool's threads and the ORF and repeat scans are
+    split into size-balanced batches that run in its processes, so awaiting them never blocks the event loop. The
+    synchronous FastaSeq methods, such as getLongest or numRecords, are available on the instance too; they are
+    answered from indexes built while loading. Results are not cached (see FastaSeq.enableCache). """
+
+    def __init__(self, pool=None):
+        self.fs = FastaSeq()
+        self.pool = pool if pool is not None else AnalysisPool()
+        self._own_pool = pool is None
+
+    def __getattr__(self, name):
+        if name == 'fs':                        # not set yet, as while unpickling
+            raise AttributeError(name)
+        return getattr(self.fs, name)
+
+    async def buildDict(self, filename, **kwargs):
+        """ buildDict loads a fasta file like FastaSeq.buildDict, in the pool's threads """
+        await self.pool.load(self.fs.buildDict, filename, **kwargs)
+
+    async def loadStore(self, filename):
+        """ loadStore opens a packed store like FastaSeq.loadStore, in the pool's threads """
+        await self.pool.load(self.fs.loadStore, filename)
+
+    async def getLongestORF(self, sequence):
+        """ getLongestORF returns the longest ORF of each forward frame of one sequence, see FastaSeq.getLongestORF """
+        return await self.pool.scan(recordLongestORF, sequence)
+
+    async def getFileLongestORF(self):
+        """ getFileLongestORF returns the longest ORF of each forward frame over the loaded records, identical to
+        FastaSeq.getFileLongestORF """
+        tasks = batchTasks(self.fs.sequences, self.pool.jobs)
+        batches = await asyncio.gather(*(self.pool.scan(runBatch, recordLongestORF, True, task) for task in tasks))
+        return reduceORFs(item for batch in batches for item in batch)
+
+    async def getRepeats(self, sequence, length):
+        """ getRepeats counts the substrings of length in one sequence, see FastaSeq.getRepeats """
+        return await self.pool.scan(countKmers, sequence, length)
+
+    async def getMultiSeqRepeats(self, seq_dict, length):
+        """ getMultiSeqRepeats counts the substrings of length over seq_dict, identical to
+        FastaSeq.getMultiSeqRepeats """
+        tasks = batchTasks(seq_dict, self.pool.jobs)
+        func = partial(countMultiKmers, length=length)
+        totals = Counter()
+        for counts in await asyncio.gather(*(self.pool.scan(runBatch, func, False, task) for task in tasks)):
+            totals.update(counts)
+        return dict(totals)
+
+    async def close(self):
+        """ close releases the loaded file, and the pool when this instance created it """
+        self.fs.close()
+        if self._own_pool:
+            await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
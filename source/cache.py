@@ -0,0 +1,164 @@
+""" Persistent on-disk result cache with size-based LRU eviction, and a bounded in-process memo """
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pygds')
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def fileStamp(filename):
+    """ fileStamp identifies the current version of a file by its absolute path, modification time and size
+
+    Args:
+        filename (str): The name of the file
+
+    Returns:
+        (str path, str version): The absolute path and a version string that changes whenever the file does
+    """
+    stat = os.stat(filename)
+    return os.path.abspath(filename), f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def contentHash(seq_dict):
+    """ contentHash hashes the names and sequences of a dictionary, for results that do not come from a file
+
+    Args:
+        seq_dict ({ str name: str sequence}): A dictionary of name: sequence pairs
+
+    Returns:
+        str digest: A hex digest that changes whenever any name or sequence does
+    """
+    digest = hashlib.sha256()
+    for name, seq in seq_dict.items():
+        digest.update(name.encode('utf-8') + b'\x00')
+        digest.update(str(seq).encode('latin-1') + b'\x01')
+    return digest.hexdigest()
+
+
+def sequenceDigest(sequence):
+    """ sequenceDigest identifies a sequence by a short digest of its bases, so results can be keyed without keeping
+    the sequence alive
+
+    Args:
+        sequence (str or PackedSeq): A sequence of nucleotides
+
+    Returns:
+        bytes digest: A 16 byte digest that changes whenever the sequence does
+    """
+    return hashlib.blake2b(str(sequence).encode('latin-1'), digest_size=16).digest()
+
+
+class ResultCache():
+    """ Pickled results stored in SQLite, keyed by the data they came from (a file path or a content hash), the
+    data's version, the method and its arguments. Storing a result for a new version of a file drops the results of
+    the old one, and the least recently used entries are evicted once the cache grows past max_bytes. The connection
+    is shared by every thread, one statement at a time, so a FastaSeq may load from a worker thread (see aio). """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if path is None:
+            os.makedirs(DEFAULT_DIR, exist_ok=True)
+            path = os.path.join(DEFAULT_DIR, 'results.sqlite')
+        self.path = path
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute("CREATE TABLE IF NOT EXISTS results (source TEXT, version TEXT, call TEXT, value BLOB, "
+                        "size INTEGER, used REAL, PRIMARY KEY (source, call))")
+
+    def get(self, source, version, call):
+        """ get returns a stored result, or None when there is none for this version of the source
+
+        Args:
+            source (str): The file path or content hash the result was computed from
+            version (str): The version of the source, see fileStamp
+            call (tuple): The method name and arguments
+
+        Returns:
+            The unpickled result, or None
+        """
+        with self.lock:
+            row = self.db.execute("SELECT value FROM results WHERE source = ? AND version = ? AND call = ?",
+                                  (source, version, repr(call))).fetchone()
+            if row is None:
+                return None
+            with self.db:
+                self.db.execute("UPDATE results SET used = ? WHERE source = ? AND call = ?",
+                                (time.time(), source, repr(call)))
+        return pickle.loads(row[0])
+
+    def put(self, source, version, call, value):
+        """ put stores a result, replacing any result of an older version of the source, then evicts the least recently
+        used entries until the cache fits in max_bytes. A result larger than max_bytes on its own is not stored.
+
+        Args:
+            source (str): The file path or content hash the result was computed from
+            version (str): The version of the source, see fileStamp
+            call (tuple): The method name and arguments
+            value: The picklable result
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:          # would be evicted straight away
+            return
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM results WHERE source = ? AND version != ?", (source, version))
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                            (source, version, repr(call), blob, len(blob), time.time()))
+            self._evict()
+
+    def _evict(self):
+        """ _evict deletes the least recently used entries while the cache is larger than max_bytes """
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        rows = self.db.execute("SELECT source, call, size FROM results ORDER BY used").fetchall() \
+            if total > self.max_bytes else []
+        for source, call, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM results WHERE source = ? AND call = ?", (source, call))
+            total -= size
+
+    def size(self):
+        """ size returns the number of bytes of results stored """
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def clear(self):
+        """ clear deletes every stored result """
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM results")
+
+    def close(self):
+        """ close closes the database """
+        with self.lock:
+            self.db.close()
+
+
+class Memo():
+    """ A bounded least recently used map of per-sequence results kept in memory. Sequences are keyed by their
+    sequenceDigest rather than the str itself, so the memo never keeps a decoded record of a lazily loaded file alive. """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        """ get returns the result stored for key and marks it recently used, or None """
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """ put stores the result for key, dropping the least recently used result when full """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """ clear drops every stored result """
+        self.entries.clear()
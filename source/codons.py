@@ -0,0 +1,185 @@
+""" Single pass codon scanning shared by the start codon, stop codon and ORF queries """
+import re
+from bisect import bisect_left
+
+START_CODONS = ('atg',)
+STOP_CODONS = ('tga', 'tag', 'taa')
+
+# Zero width lookaheads let finditer report overlapping codons without slicing the sequence at every index. Group 1
+# only takes part in a match when the codon is the start codon, so one pass tells starts and stops apart.
+CODON_RE = re.compile(r'(?=(a)tg|t(?:ag|aa|ga))', re.IGNORECASE)
+START_RE = re.compile(r'(?=atg)', re.IGNORECASE)
+STOP_RE = re.compile(r'(?=t(?:ag|aa|ga))', re.IGNORECASE)
+
+
+def _framePositions(pattern, sequence, offset):
+    """ _framePositions returns the indices where pattern matches sequence, split by reading frame """
+    frames = ([], [], [])
+    for match in pattern.finditer(sequence):
+        idx = match.start() + offset
+        frames[idx % 3].append(idx)
+    return {frame: frames[frame] for frame in range(3)}
+
+
+def findStarts(sequence, offset=0):
+    """ findStarts returns the indices of every start codon in sequence, split by reading frame
+
+    Args:
+        sequence (str): The sequence of nucleotides to search, in any case
+        offset (int): The position of sequence within a longer sequence it was cut from, added to every index
+
+    Returns:
+        { int reading_frame: [ int index ]}: Lists of start codon indices for reading frames 0, 1 and 2
+    """
+    return _framePositions(START_RE, sequence, offset)
+
+
+def findStops(sequence, offset=0):
+    """ findStops returns the indices of every stop codon in sequence, split by reading frame
+
+    Args:
+        sequence (str): The sequence of nucleotides to search, in any case
+        offset (int): The position of sequence within a longer sequence it was cut from, added to every index
+
+    Returns:
+        { int reading_frame: [ int index ]}: Lists of stop codon indices for reading frames 0, 1 and 2
+    """
+    return _framePositions(STOP_RE, sequence, offset)
+
+
+def scanCodons(sequence, offset=0):
+    """ scanCodons finds every start and stop codon in sequence in a single pass, without lowercasing or slicing it
+
+    Args:
+        sequence (str): The sequence of nucleotides to search, in any case
+        offset (int): The position of sequence within a longer sequence it was cut from, added to every index
+
+    Returns:
+        ({ int reading_frame: [ int index ]}, { int reading_frame: [ int index ]}): The start codon indices and the
+        stop codon indices, each split by reading frame 0, 1 and 2 and sorted in increasing order
+    """
+    starts = ([], [], [])
+    stops = ([], [], [])
+    for match in CODON_RE.finditer(sequence):
+        idx = match.start() + offset
+        if match.start(1) < 0:
+            stops[idx % 3].append(idx)
+        else:
+            starts[idx % 3].append(idx)
+    return {frame: starts[frame] for frame in range(3)}, {frame: stops[frame] for frame in range(3)}
+
+
+def mergeFrames(parts):
+    """ mergeFrames concatenates the per-frame codon indices of consecutive windows of a sequence
+
+    Args:
+        parts ([ { int reading_frame: [ int index ]} ]): The codon indices found in each window, in order
+
+    Returns:
+        { int reading_frame: [ int index ]}: The codon indices of the whole sequence for each reading frame
+    """
+    return {frame: [idx for part in parts for idx in part[frame]] for frame in range(3)}
+
+
+def pairFrame(starts, stops):
+    """ pairFrame merges the sorted start and stop codon positions of one reading frame. Each stop codon closes the ORF
+    opened by the earliest start codon after the previous stop codon.
+
+    Args:
+        starts ([ int index ]): Sorted start codon indices on one reading frame
+        stops ([ int index ]): Sorted stop codon indices on the same reading frame
+
+    Returns:
+        (int longest, int index): The length and index of the first longest ORF, or (0, -1) if there is none
+    """
+    lngst = 0
+    lng_idx = -1
+    idx1 = 0
+    for stop in stops:
+        if idx1 == len(starts):
+            break
+        if starts[idx1] < stop:
+            length = 3 + stop - starts[idx1]
+            if length > lngst:
+                lngst = length
+                lng_idx = starts[idx1]
+            idx1 = bisect_left(starts, stop, idx1)
+    return lngst, lng_idx
+
+
+def pairORFs(starts, stops):
+    """ pairORFs calls pairFrame on each reading frame to find its longest ORF
+
+    Args:
+        starts ({ int reading_frame: [ int index ]}): Sorted start codon indices for each reading frame
+        stops ({ int reading_frame: [ int index ]}): Sorted stop codon indices for each reading frame
+
+    Returns:
+        { int reading_frame: { 'length': int longest, 'index': int index} }: The length and index of the longest ORF
+        on each reading frame, or a length of 0 and index of -1 if the frame has none
+    """
+    orf_dict = {}
+    for frame in range(3):
+        lngst, lng_idx = pairFrame(starts[frame], stops[frame])
+        orf_dict[frame] = {'length': lngst, 'index': lng_idx}
+    return orf_dict
+
+
+def summarizeORFs(sequence, offset=0):
+    """ summarizeORFs reduces one window of a long sequence to what is needed to stitch its ORFs to its neighbours'.
+    Only the first stop codon of a window can close an ORF opened in an earlier window; every later stop pairs with a
+    start inside the window.
+
+    Args:
+        sequence (str): The window, including the two bases after it so codons on its right border are seen
+        offset (int): The position of the window within the whole sequence
+
+    Returns:
+        { int reading_frame: (int lead, int first_stop, (int longest, int index), int tail) }: For each frame, the
+        first start before the first stop, the first stop, the longest ORF closed by a later stop and the first start
+        after the last stop (None where there is no such codon; without stops, lead and tail are the first start)
+    """
+    starts, stops = scanCodons(sequence, offset)
+    summary = {}
+    for frame in range(3):
+        frame_starts = starts[frame]
+        frame_stops = stops[frame]
+        if not frame_stops:
+            first = frame_starts[0] if frame_starts else None
+            summary[frame] = (first, None, (0, -1), first)
+            continue
+        lead = frame_starts[0] if frame_starts and frame_starts[0] < frame_stops[0] else None
+        after_first = frame_starts[bisect_left(frame_starts, frame_stops[0]):]
+        tail = bisect_left(frame_starts, frame_stops[-1])
+        tail = frame_starts[tail] if tail < len(frame_starts) else None
+        summary[frame] = (lead, frame_stops[0], pairFrame(after_first, frame_stops[1:]), tail)
+    return summary
+
+
+def stitchORFs(summaries):
+    """ stitchORFs joins the summaries of consecutive windows into the longest ORF on each reading frame, carrying an
+    ORF opened in one window to the first stop codon of a later one. The result equals pairORFs on the whole sequence.
+
+    Args:
+        summaries ([ { int reading_frame: tuple summary } ]): The summarizeORFs result of each window, in order
+
+    Returns:
+        { int reading_frame: { 'length': int longest, 'index': int index} }: The length and index of the longest ORF
+        on each reading frame, or a length of 0 and index of -1 if the frame has none
+    """
+    orf_dict = {}
+    for frame in range(3):
+        best = (0, -1)
+        opened = None
+        for lead, first_stop, internal, tail in (summary[frame] for summary in summaries):
+            if opened is None:
+                opened = lead
+            if first_stop is None:
+                continue
+            if opened is not None and 3 + first_stop - opened > best[0]:
+                best = (3 + first_stop - opened, opened)
+            if internal[0] > best[0]:
+                best = internal
+            opened = tail
+        orf_dict[frame] = {'length': best[0], 'index': best[1]}
+    return orf_dict
@@ -0,0 +1,281 @@
+""" Compressed FASTA input: gzip, bzip2 and xz decompressed in a background thread, and BGZF random access """
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+
+# Leading bytes of each supported compression format
+MAGICS = {'gzip': b'\x1f\x8b', 'bz2': b'BZh', 'xz': b'\xfd7zXZ\x00'}
+OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+# Bytes decompressed per chunk handed to the parser, and how many chunks the background thread may run ahead
+CHUNK_SIZE = 1 << 20
+QUEUE_DEPTH = 4
+
+# A BGZF block is a gzip member whose extra field holds a 'BC' subfield with the block size minus one
+BGZF_HEADER = b'\x1f\x8b\x08\x04'
+BGZF_BLOCK_DATA = 0xff00                        # uncompressed bytes per block written by compressBgzf
+BGZF_EOF = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+# Decompressed BGZF blocks kept for nearby lookups
+BGZF_CACHE_BLOCKS = 64
+
+
+def detectCompression(filename):
+    """ detectCompression identifies the compression of a file from its first bytes
+
+    Args:
+        filename (str): The name of the file
+
+    Returns:
+        str compression: 'gzip' (which includes BGZF), 'bz2', 'xz', or None for an uncompressed file
+    """
+    with open(filename, 'rb') as file:
+        head = file.read(6)
+    for compression, magic in MAGICS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def isBgzf(filename):
+    """ isBgzf tells whether a file is BGZF compressed, which allows random access by block """
+    with open(filename, 'rb') as file:
+        header = file.read(18)
+    return len(header) == 18 and header.startswith(BGZF_HEADER) and header[12:14] == b'BC'
+
+
+class _ThreadedReader(io.RawIOBase):
+    """ A raw binary stream over a decompressing file object whose reads run in a background thread, so that
+    decompression (which releases the GIL) overlaps with parsing. At most QUEUE_DEPTH chunks wait in memory. """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE, depth=QUEUE_DEPTH):
+        super().__init__()
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(depth)
+        self._chunk = b''
+        self._pos = 0
+        self._done = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        """ _fill runs in the background thread, queueing decompressed chunks, then b'' or the error raised """
+        try:
+            while not self._stop.is_set():
+                chunk = self._stream.read(self._chunk_size)
+                self._put(chunk)
+                if not chunk:
+                    return
+        except Exception as error:               # handed to the reading thread
+            self._put(error)
+
+    def _put(self, item):
+        """ _put waits for room in the queue, giving up once the reader is closed """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._pos >= len(self._chunk):
+            if self._done:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                self._done = True
+                raise item
+            if not item:
+                self._done = True
+                return 0
+            self._chunk, self._pos = item, 0
+        size = min(len(buffer), len(self._chunk) - self._pos)
+        buffer[:size] = self._chunk[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._stream.close()
+        super().close()
+
+
+def openFasta(filename, threaded=True):
+    """ openFasta opens a FASTA file for streaming in binary mode, decompressing gzip, BGZF, bzip2 and xz files on the
+    fly, detected by their content rather than their name
+
+    Args:
+        filename (str): The name of the file
+        threaded (bool): Decompress in a background thread, overlapping with the caller's parsing
+
+    Returns:
+        file handle: A binary file object yielding the uncompressed bytes
+    """
+    compression = detectCompression(filename)
+    if compression is None:
+        return open(filename, 'rb')
+    stream = OPENERS[compression](filename, 'rb')
+    if not threaded:
+        return stream
+    return io.BufferedReader(_ThreadedReader(stream), buffer_size=CHUNK_SIZE)
+
+
+def _blockSize(file, offset):
+    """ _blockSize reads the header of the BGZF block at offset and returns its total size in bytes, or 0 at the end
+    of the file """
+    header = file.read(12)
+    if not header:
+        return 0
+    if len(header) < 12 or not header.startswith(BGZF_HEADER):
+        raise ValueError(f"No BGZF block at offset {offset}")
+    extra = file.read(struct.unpack('<H', header[10:12])[0])
+    pos = 0
+    while pos + 4 <= len(extra):
+        length = struct.unpack('<H', extra[pos + 2:pos + 4])[0]
+        if extra[pos:pos + 2] == b'BC' and length == 2:
+            return struct.unpack('<H', extra[pos + 4:pos + 6])[0] + 1
+        pos += 4 + length
+    raise ValueError(f"The gzip member at offset {offset} has no BGZF block size")
+
+
+def scanBlocks(filename):
+    """ scanBlocks finds every BGZF block by reading only its header and its uncompressed size
+
+    Args:
+        filename (str): The name of the BGZF file
+
+    Returns:
+        ([ int compressed ], [ int uncompressed ]): The compressed and uncompressed offsets of every block start
+    """
+    coffsets, uoffsets = [], []
+    coffset = uoffset = 0
+    with open(filename, 'rb') as file:
+        while True:
+            file.seek(coffset)
+            size = _blockSize(file, coffset)
+            if not size:
+                break
+            file.seek(coffset + size - 4)
+            coffsets.append(coffset)
+            uoffsets.append(uoffset)
+            coffset += size
+            uoffset += struct.unpack('<I', file.read(4))[0]
+    return coffsets, uoffsets
+
+
+def gziPath(filename):
+    """ gziPath returns the name of the samtools style .gzi block index belonging to a BGZF file """
+    return filename + '.gzi'
+
+
+def writeBlocks(coffsets, uoffsets, gzi_file):
+    """ writeBlocks writes a .gzi block index: the number of entries, then the compressed and uncompressed offsets of
+    every block but the first, as little endian 64 bit integers """
+    pairs = list(zip(coffsets, uoffsets))[1:]
+    with open(gzi_file, 'wb') as file:
+        file.write(struct.pack('<Q', len(pairs)))
+        file.write(b''.join(struct.pack('<QQ', *pair) for pair in pairs))
+
+
+def readBlocks(gzi_file):
+    """ readBlocks reads a .gzi block index written by writeBlocks (or bgzip -i) """
+    with open(gzi_file, 'rb') as file:
+        count = struct.unpack('<Q', file.read(8))[0]
+        values = struct.unpack(f"<{2 * count}Q", file.read(16 * count))
+    return [0] + list(values[0::2]), [0] + list(values[1::2])
+
+
+def loadBlocks(filename):
+    """ loadBlocks returns the block offsets of a BGZF file, reading the .gzi file if it is up to date and scanning
+    the blocks (and writing the .gzi file) otherwise """
+    gzi_file = gziPath(filename)
+    if os.path.exists(gzi_file) and os.path.getmtime(gzi_file) >= os.path.getmtime(filename):
+        return readBlocks(gzi_file)
+    coffsets, uoffsets = scanBlocks(filename)
+    writeBlocks(coffsets, uoffsets, gzi_file)
+    return coffsets, uoffsets
+
+
+class BgzfFile():
+    """ Random access to the uncompressed bytes of a BGZF file. Slicing decompresses only the blocks holding the
+    requested bytes, keeping the last BGZF_CACHE_BLOCKS of them for nearby lookups. """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.coffsets, self.uoffsets = loadBlocks(filename)
+        self._file = open(filename, 'rb')
+        self._csize = os.fstat(self._file.fileno()).st_size
+        self._cache = OrderedDict()
+        self._size = self.uoffsets[-1] + len(self._block(len(self.coffsets) - 1)) if self.coffsets else 0
+
+    def __len__(self):
+        return self._size
+
+    def _block(self, idx):
+        """ _block returns the uncompressed bytes of block idx """
+        data = self._cache.get(idx)
+        if data is not None:
+            self._cache.move_to_end(idx)
+            return data
+        end = self.coffsets[idx + 1] if idx + 1 < len(self.coffsets) else self._csize
+        self._file.seek(self.coffsets[idx])
+        data = zlib.decompress(self._file.read(end - self.coffsets[idx]), 31)
+        self._cache[idx] = data
+        while len(self._cache) > BGZF_CACHE_BLOCKS:
+            self._cache.popitem(last=False)
+        return data
+
+    def __getitem__(self, key):
+        start, stop, _ = key.indices(self._size)
+        if start >= stop:
+            return b''
+        first = bisect_right(self.uoffsets, start) - 1
+        last = bisect_right(self.uoffsets, stop - 1) - 1
+        data = b''.join(self._block(idx) for idx in range(first, last + 1))
+        return data[start - self.uoffsets[first]:stop - self.uoffsets[first]]
+
+    def close(self):
+        """ close closes the underlying file """
+        self._file.close()
+        self._cache.clear()
+
+
+def compressBgzf(filename, output=None, level=6):
+    """ compressBgzf compresses a file into BGZF blocks readable by gzip, with an end of file marker, and writes its
+    .gzi block index
+
+    Args:
+        filename (str): The name of the file to compress
+        output (str): The name of the BGZF file to write, defaults to filename + '.gz'
+        level (int): The zlib compression level
+
+    Returns:
+        str output: The name of the BGZF file written
+    """
+    output = output or filename + '.gz'
+    with open(filename, 'rb') as source, open(output, 'wb') as target:
+        while True:
+            data = source.read(BGZF_BLOCK_DATA)
+            if not data:
+                break
+            deflate = zlib.compressobj(level, zlib.DEFLATED, -15)
+            body = deflate.compress(data) + deflate.flush()
+            header = BGZF_HEADER + b'\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00' + struct.pack('<H', len(body) + 25)
+            target.write(header + body + struct.pack('<II', zlib.crc32(data), len(data)))
+        target.write(BGZF_EOF)
+    writeBlocks(*scanBlocks(output), gziPath(output))
+    return output
@@ -0,0 +1,229 @@
+""" Streaming FASTA parsing, .fai style indexing and lazy memory-mapped record access """
+import mmap
+import os
+from collections import namedtuple
+from collections.abc import Mapping
+
+from source.compressed import BgzfFile, detectCompression, isBgzf, openFasta
+
+# One line of a samtools style .fai index: the record name, the number of bases in the record, the byte offset of
+# the first base, the number of bases on each full line and the number of bytes on each full line (bases + newline)
+FaiRecord = namedtuple('FaiRecord', ['name', 'length', 'offset', 'linebases', 'linewidth'])
+
+
+def recordName(header):
+    """ recordName returns the identifier of a FASTA header line, the first word following '>'
+
+    Args:
+        header (str): A header line, with or without the leading '>'
+
+    Returns:
+        str name: The sequence identifier
+    """
+    words = (header[1:] if header.startswith('>') else header).split()
+    return words[0] if words else ''
+
+
+class _RecordBuilder():
+    """ Accumulates the lines of one record while checking that they share a common layout """
+
+    def __init__(self, name, offset, keep_seq):
+        self.name = name
+        self.offset = offset
+        self.length = 0
+        self.linebases = 0
+        self.linewidth = 0
+        self.regular = True
+        self.closed = False
+        self.lines = [] if keep_seq else None
+
+    def add(self, raw):
+        """ add appends one raw sequence line, including its line terminator """
+        bases = raw.rstrip()
+        if self.lines is not None:
+            self.lines.append(bases)
+        if not bases:
+            self.closed = True                  # a blank line may only end the record
+            return
+        if len(raw.rstrip(b'\r\n')) != len(bases):
+            self.regular = False                # trailing spaces cannot be skipped when slicing by offset
+        if self.length == 0:
+            self.linebases = len(bases)
+            self.linewidth = len(raw)
+        elif self.closed or len(bases) > self.linebases:
+            self.regular = False
+        elif len(bases) == self.linebases and len(raw) != self.linewidth and raw.endswith(b'\n'):
+            self.regular = False
+        self.closed = self.closed or len(bases) < self.linebases
+        self.length += len(bases)
+
+    def record(self):
+        """ record returns the FaiRecord describing the lines added so far """
+        return FaiRecord(self.name, self.length, self.offset, self.linebases, self.linewidth)
+
+    def sequence(self):
+        """ sequence returns the joined sequence of the lines added so far """
+        return b''.join(self.lines).decode('latin-1')
+
+
+def iterRecords(handle, keep_seq=True):
+    """ iterRecords streams a FASTA file in a single linear pass, yielding one record at a time. Each record's lines
+    are collected in a list and joined once, so the cost is linear in the size of the record.
+
+    Args:
+        handle (file): A FASTA file opened in binary mode
+        keep_seq (bool): When False the sequence is not kept and only the index entry is built
+
+    Returns:
+        generator of (FaiRecord record, str sequence, bool regular): The index entry for each record, its sequence
+        (None when keep_seq is False) and whether its lines are regular enough to be addressed through the index
+    """
+    builder = None
+    offset = 0
+    for raw in handle:
+        offset += len(raw)
+        if raw.startswith(b'>'):
+            if builder is not None:
+                yield builder.record(), builder.sequence() if keep_seq else None, builder.regular
+            builder = _RecordBuilder(recordName(raw.decode('utf-8')), offset, keep_seq)
+        elif builder is not None:                # lines before the first header are ignored
+            builder.add(raw)
+    if builder is not None:
+        yield builder.record(), builder.sequence() if keep_seq else None, builder.regular
+
+
+def indexPath(filename):
+    """ indexPath returns the name of the .fai index belonging to a FASTA file """
+    return filename + '.fai'
+
+
+def writeIndex(index, index_file):
+    """ writeIndex writes index to index_file in the tab separated samtools .fai format
+
+    Args:
+        index ({ str name: FaiRecord record }): The index to write
+        index_file (str): The name of the index file to write
+    """
+    with open(index_file, 'w') as file:
+        for rec in index.values():
+            file.write('\t'.join(str(x) for x in rec) + '\n')
+
+
+def readIndex(index_file):
+    """ readIndex reads a .fai index written by writeIndex (or samtools faidx)
+
+    Args:
+        index_file (str): The name of the index file to read
+
+    Returns:
+        { str name: FaiRecord record }: The index entries in file order
+    """
+    index = {}
+    with open(index_file) as file:
+        for line in file:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < 5:
+                continue
+            index[fields[0]] = FaiRecord(fields[0], *(int(x) for x in fields[1:5]))
+    return index
+
+
+def buildIndex(filename, index_file=None):
+    """ buildIndex scans a FASTA file once without keeping its sequences and writes its .fai index
+
+    Args:
+        filename (str): The name of the fasta file to index
+        index_file (str): The name of the index file, defaults to filename + '.fai'
+
+    Returns:
+        { str name: FaiRecord record }: The index entries in file order
+
+    Raises:
+        ValueError: if a record has irregular line lengths and cannot be addressed by offset
+    """
+    index = {}
+    with openFasta(filename) as file:
+        for rec, _, regular in iterRecords(file, keep_seq=False):
+            if not regular:
+                raise ValueError(f"Record {rec.name} in {filename} has irregular line lengths")
+            index[rec.name] = rec
+    writeIndex(index, index_file or indexPath(filename))
+    return index
+
+
+def loadIndex(filename):
+    """ loadIndex returns the index of a FASTA file, reading the .fai file if it is up to date and building
+    (and writing) it otherwise
+
+    Args:
+        filename (str): The name of the fasta file
+
+    Returns:
+        { str name: FaiRecord record }: The index entries in file order
+    """
+    index_file = indexPath(filename)
+    if os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(filename):
+        return readIndex(index_file)
+    return buildIndex(filename, index_file)
+
+
+class IndexedFasta(Mapping):
+    """ A read only { name: sequence } mapping over a memory-mapped FASTA file. Records are only decoded when they
+    are looked up, so opening a file costs about as much as reading its index. A BGZF compressed file is read through
+    its block index instead of a memory map, decompressing only the blocks holding the records looked up. """
+
+    def __init__(self, filename, index=None):
+        self.filename = filename
+        compression = detectCompression(filename)
+        if compression is not None and not isBgzf(filename):
+            raise ValueError(f"{filename} is {compression} compressed; random access needs a plain or BGZF file")
+        self.index = loadIndex(filename) if index is None else index
+        if compression is not None:
+            self._file = None
+            self._mm = BgzfFile(filename)
+            return
+        self._file = open(filename, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __getitem__(self, name):
+        return self.fetch(name)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def getLength(self, name):
+        """ getLength returns the length of a record straight from the index """
+        return self.index[name].length
+
+    def fetch(self, name, start=0, end=None):
+        """ fetch decodes the bases in [start, end) of a record by slicing the memory map
+
+        Args:
+            name (str): The name of the record
+            start (int): The index of the first base to return
+            end (int): One past the index of the last base to return, defaults to the end of the record
+
+        Returns:
+            str sequence: The requested bases
+        """
+        rec = self.index[name]
+        end = rec.length if end is None else min(end, rec.length)
+        if start >= end:
+            return ''
+        first = rec.offset + (start // rec.linebases) * rec.linewidth + start % rec.linebases
+        last = rec.offset + ((end - 1) // rec.linebases) * rec.linewidth + (end - 1) % rec.linebases + 1
+        return self._mm[first:last].translate(None, b'\r\n').decode('latin-1')
+
+    def close(self):
+        """ close releases the memory map (or BGZF reader) and the underlying file """
+        if isinstance(self._mm, (mmap.mmap, BgzfFile)):
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
@@ -0,0 +1,187 @@
+""" Hash-based k-mer counting shared by the repeat queries """
+from collections import Counter
+
+from source.packed import encodeBases, np
+
+# Below this many bases the slice counter beats the set up cost of the array pipeline
+NUMPY_MIN_LENGTH = 1 << 12
+# Longest k-mer counted in a dense table of 4 ** k counters. Past this most k-mers are distinct, building the
+# result dict dominates and the slice counter is just as fast.
+TABLE_MAX_K = 10
+# Packed k-mers buffered before they are added to the table in one bincount
+FLUSH_SIZE = 1 << 22
+
+
+def _windowCount(size, length):
+    """ _windowCount returns how many windows of length fit in a sequence of size, the way getRepeats slices """
+    if length > 0:
+        return max(size - length + 1, 0)
+    return size if length == 0 else 0
+
+
+def _sliceCounts(sequence, length):
+    """ _sliceCounts counts the lowercased k-mers of one sequence with a C level Counter over its slices """
+    seq = str(sequence).lower()
+    return Counter(seq[idx:idx+length] for idx in range(_windowCount(len(seq), length)))
+
+
+def _useTable(length):
+    """ _useTable tells whether k-mers of length can be counted in a dense table """
+    return np is not None and 0 < length <= TABLE_MAX_K
+
+
+def packKmers(codes, ambiguous, length):
+    """ packKmers rolls a window of length over the base codes, shifting each base into a 2-bit packed integer
+
+    Args:
+        codes (array): The base code (0-3) of every base
+        ambiguous (array): True at every base outside A, C, G and T
+        length (int): The k-mer length, at most 32 so that a k-mer fits a uint64
+
+    Returns:
+        (array kmers, array valid): The packed k-mer starting at every window and whether it is free of ambiguous bases
+    """
+    windows = len(codes) - length + 1
+    kmers = np.zeros(windows, dtype=np.uint64)
+    for offset in range(length):
+        kmers <<= np.uint64(2)
+        kmers |= codes[offset:offset + windows]
+    marks = np.concatenate(([0], np.cumsum(ambiguous, dtype=np.int64)))
+    valid = marks[length:] == marks[:windows]
+    return kmers, valid
+
+
+def unpackKmers(kmers, length):
+    """ unpackKmers decodes 2-bit packed k-mers back into lowercase strings
+
+    Args:
+        kmers (array): Packed k-mers
+        length (int): The k-mer length
+
+    Returns:
+        [ str kmer ]: The decoded k-mers
+    """
+    letters = np.frombuffer(b'acgt', dtype=np.uint8)
+    kmers = np.asarray(kmers, dtype=np.uint64)
+    chars = np.empty((len(kmers), length), dtype=np.uint8)
+    for offset in range(length):
+        chars[:, offset] = letters[(kmers >> np.uint64(2 * (length - 1 - offset))) & np.uint64(3)]
+    return [x.decode('ascii') for x in chars.view(f'S{length}').ravel().tolist()] if length else []
+
+
+class _TableCounter():
+    """ Counts 2-bit packed k-mers from a stream of sequences in a dense table of 4 ** k counters, merging all the
+    sequences with bulk bincounts. Windows touching an ambiguous base cannot be packed, so they are counted as strings.
+    Every k-mer remembers its first position across all sequences, which lets the result keep the first-occurrence key
+    order the slice counter produces. """
+
+    def __init__(self, length):
+        self.length = length
+        self.totals = np.zeros(4 ** length, dtype=np.int64)
+        self.first = np.full(4 ** length, -1, dtype=np.int64)
+        self.unseen = 4 ** length
+        self.pending = []
+        self.pending_size = 0
+        self.others = {}
+        self.offset = 0
+
+    def add(self, sequence):
+        """ add counts the k-mers of one sequence """
+        windows = _windowCount(len(sequence), self.length)
+        if windows:
+            kmers, valid = packKmers(*encodeBases(sequence), self.length)
+            kmers = kmers[valid].astype(np.intp)
+            if self.unseen:
+                self._markFirst(kmers, np.flatnonzero(valid) + self.offset)
+            self.pending.append(kmers)
+            self.pending_size += len(kmers)
+            if self.pending_size >= FLUSH_SIZE:
+                self._flush()
+            if not valid.all():
+                self._addOthers(str(sequence).lower(), np.flatnonzero(~valid).tolist())
+        self.offset += windows
+
+    def _markFirst(self, kmers, positions):
+        """ _markFirst records the position of every k-mer seen for the first time, a chunk at a time so that once
+        the common k-mers are known only the few new ones need sorting """
+        for start in range(0, len(kmers), 1 << 16):
+            chunk = kmers[start:start + (1 << 16)]
+            new = self.first[chunk] < 0
+            if new.any():
+                keys, idx = np.unique(chunk[new], return_index=True)
+                self.first[keys] = positions[start:start + (1 << 16)][new][idx]
+                self.unseen -= len(keys)
+
+    def _addOthers(self, seq, windows):
+        """ _addOthers counts the windows containing ambiguous bases as strings """
+        for idx in windows:
+            substr = seq[idx:idx+self.length]
+            first, count = self.others.get(substr, (idx + self.offset, 0))
+            self.others[substr] = (first, count + 1)
+
+    def _flush(self):
+        """ _flush adds the buffered k-mers to the table """
+        if self.pending:
+            self.totals += np.bincount(np.concatenate(self.pending), minlength=len(self.totals))
+        self.pending = []
+        self.pending_size = 0
+
+    def counts(self):
+        """ counts returns { str substr: int count } in first-occurrence order """
+        self._flush()
+        present = np.flatnonzero(self.first >= 0)
+        present = present[np.argsort(self.first[present], kind='stable')]
+        keys = unpackKmers(present, self.length)
+        entries = list(zip(self.first[present].tolist(), keys, self.totals[present].tolist()))
+        if self.others:
+            entries.extend((first, key, count) for key, (first, count) in self.others.items())
+            entries.sort()
+        return {key: count for _, key, count in entries}
+
+
+def countKmers(sequence, length):
+    """ countKmers counts every k-mer of length in sequence, giving the same { substr: count } as getRepeats. With
+    numpy, sequences of at least NUMPY_MIN_LENGTH bases and k-mers of at most TABLE_MAX_K bases are packed into 2-bit
+    integers and counted in a table; longer k-mers, short sequences and runs without numpy use a Counter over slices.
+
+    Args:
+        sequence (str or PackedSeq): A sequence of nucleotides to search
+        length (int): The length of subsequences to count
+
+    Returns:
+        { str substr: int repeats }: The lowercased k-mers, in order of first occurrence, and their counts
+    """
+    if not _useTable(length) or len(sequence) < NUMPY_MIN_LENGTH:
+        return dict(_sliceCounts(sequence, length))
+    counter = _TableCounter(length)
+    counter.add(sequence)
+    return counter.counts()
+
+
+def countMultiKmers(sequences, length):
+    """ countMultiKmers counts every k-mer of length across several sequences, giving the same { substr: count } as
+    getMultiSeqRepeats. With numpy, short k-mers of all the sequences are streamed into one table of counters and
+    merged in bulk, otherwise the per-sequence Counters are merged.
+
+    Args:
+        sequences ([ str or PackedSeq ]): The sequences of nucleotides to search
+        length (int): The length of subsequences to count
+
+    Returns:
+        { str substr: int repeats }: The lowercased k-mers, in order of first occurrence, and their total counts
+    """
+    if not _useTable(length):
+        totals = Counter()
+        for seq in sequences:
+            totals.update(_sliceCounts(seq, length))
+        return dict(totals)
+    counter = _TableCounter(length)
+    for seq in sequences:
+        counter.add(seq)
+    return counter.counts()
+
+
+def countWindow(window, offset, length):
+    """ countWindow counts the k-mers of one window of a longer sequence for parallel.mapChunks. The window carries
+    length - 1 extra bases, so it holds exactly the k-mers starting inside it and offset is not needed. """
+    return countKmers(window, length)
@@ -0,0 +1,279 @@
+""" Out-of-core k-mer counting: k-mers hash-partitioned into bins on disk, counted one bin at a time into a table """
+import heapq
+import os
+import shutil
+import struct
+import tempfile
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+from source.packed import np, requireNumpy
+
+# The file starts with MAGIC, the format version, the k-mer length, the number of bins and the number of windows
+# counted. The first record of every bin follows (bins + 1 int64, the last being the number of records), then the
+# records of every bin sorted by k-mer, each the k-mer then its first window and its count as uint64, and last, padded
+# to 8 bytes, the record numbers of every bin in order of first occurrence as uint64.
+MAGIC = b'PYGDSKC\x00'
+VERSION = 1
+PREAMBLE = struct.Struct('<8sIIIQ')            # magic, version, k-mer length, bins, windows
+TABLE_SUFFIX = '.pgkc'
+# Most bins, each an open file while the k-mers are partitioned
+MAX_BINS = 512
+# Most windows partitioned at a time
+CHUNK_WINDOWS = 1 << 20
+# FNV-1a offset basis and prime, hashing k-mers to bins the same way in every process
+HASH_BASIS = 14695981039346656037
+HASH_PRIME = 1099511628211
+
+
+def tablePath(filename):
+    """ tablePath returns the name of the k-mer table belonging to a FASTA file """
+    return filename + TABLE_SUFFIX
+
+
+def recordType(length):
+    """ recordType returns the numpy record of one k-mer of length and its first window and count """
+    return np.dtype([('kmer', f'S{length}'), ('first', '<u8'), ('count', '<u8')])
+
+
+def recordBytes(length):
+    """ recordBytes estimates the memory one k-mer record takes while a chunk or a bin is counted: the record, its
+    sorted copy and the index arrays of the sort """
+    return 3 * (length + 16) + 16
+
+
+def binCount(bases, length, budget):
+    """ binCount chooses how many bins keep the records of one bin within budget bytes, every window of bases
+    counting as a distinct k-mer, up to MAX_BINS """
+    return min(max(-(-bases * recordBytes(length) // max(budget, 1)), 1), MAX_BINS)
+
+
+def binOf(kmers, bins):
+    """ binOf hashes k-mers to bins with FNV-1a over their bytes
+
+    Args:
+        kmers (array): k-mers as a numpy bytes array
+        bins (int): The number of bins
+
+    Returns:
+        array: The bin of every k-mer
+    """
+    codes = kmers.view(np.uint8).reshape(len(kmers), -1)
+    hashes = np.full(len(kmers), HASH_BASIS, dtype=np.uint64)
+    for column in range(codes.shape[1]):
+        hashes ^= codes[:, column]
+        hashes *= np.uint64(HASH_PRIME)
+    return (hashes % np.uint64(bins)).astype(np.intp)
+
+
+def binPath(workdir, idx):
+    """ binPath returns the name of the file holding bin idx """
+    return os.path.join(workdir, f"bin{idx:04d}")
+
+
+def _spill(files, data, start, count, length, offset):
+    """ _spill counts the count windows of data from start, then appends each distinct k-mer with its first window and
+    its count to the file of its bin """
+    codes = np.frombuffer(data, dtype=np.uint8, count=count + length - 1, offset=start)
+    windows = np.ascontiguousarray(np.lib.stride_tricks.sliding_window_view(codes, length))
+    keys, first, counts = np.unique(windows.view(f'S{length}').ravel(), return_index=True, return_counts=True)
+    records = np.empty(len(keys), dtype=recordType(length))
+    records['kmer'], records['first'], records['count'] = keys, first + offset + start, counts
+    owner = binOf(keys, len(files))
+    order = np.argsort(owner, kind='stable')
+    records, owner = records[order], owner[order]
+    bounds = np.searchsorted(owner, np.arange(len(files) + 1))
+    for idx in np.flatnonzero(np.diff(bounds)).tolist():
+        files[idx].write(records[bounds[idx]:bounds[idx + 1]].tobytes())
+
+
+def partitionKmers(sequences, length, bins, workdir, chunk_windows=CHUNK_WINDOWS):
+    """ partitionKmers streams the k-mers of every sequence into bin files, a chunk of windows at a time. Each chunk
+    is counted first, so a k-mer repeated within a chunk is written once with its count and first window.
+
+    Args:
+        sequences ([ str or PackedSeq ]): The sequences of nucleotides, read one at a time
+        length (int): The k-mer length
+        bins (int): The number of bins
+        workdir (str): The directory the bin files are written to
+        chunk_windows (int): The number of windows counted at a time
+
+    Returns:
+        int windows: The number of windows of all the sequences
+    """
+    files = [open(binPath(workdir, idx), 'wb') for idx in range(bins)]
+    offset = 0
+    try:
+        for seq in sequences:
+            data = str(seq).lower().encode('latin-1')
+            windows = max(len(data) - length + 1, 0)
+            for start in range(0, windows, chunk_windows):
+                _spill(files, data, start, min(chunk_windows, windows - start), length, offset)
+            offset += windows
+    finally:
+        for file in files:
+            file.close()
+    return offset
+
+
+def countBin(bin_file, length):
+    """ countBin merges the partial counts of one bin, keeping the earliest first window of each k-mer. The records
+    are written sorted by k-mer to bin_file + '.keys' and their order of first occurrence to bin_file + '.order'.
+
+    Args:
+        bin_file (str): The bin written by partitionKmers, removed once counted
+        length (int): The k-mer length
+
+    Returns:
+        int distinct: The number of distinct k-mers in the bin
+    """
+    records = np.fromfile(bin_file, dtype=recordType(length))
+    os.remove(bin_file)
+    records = records[np.argsort(records, order=('kmer', 'first'), kind='stable')]
+    if len(records):
+        starts = np.flatnonzero(np.concatenate(([True], records['kmer'][1:] != records['kmer'][:-1])))
+        counts = np.add.reduceat(records['count'], starts)
+        records = records[starts]
+        records['count'] = counts
+    records.tofile(bin_file + '.keys')
+    np.argsort(records['first'], kind='stable').astype('<u8').tofile(bin_file + '.order')
+    return len(records)
+
+
+def writeTable(table_file, length, windows, bin_files, sizes):
+    """ writeTable joins the counted bins into one k-mer table, removing their files """
+    bounds = np.concatenate(([0], np.cumsum(sizes, dtype=np.int64))).astype('<u8')
+    with open(table_file, 'wb') as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, length, len(bin_files), windows))
+        file.write(bounds.tobytes())
+        for bin_file in bin_files:
+            with open(bin_file + '.keys', 'rb') as keys:
+                shutil.copyfileobj(keys, file)
+            os.remove(bin_file + '.keys')
+        file.write(b'\x00' * (-file.tell() % 8))
+        for idx, bin_file in enumerate(bin_files):
+            file.write((np.fromfile(bin_file + '.order', dtype='<u8') + bounds[idx]).tobytes())
+            os.remove(bin_file + '.order')
+    return table_file
+
+
+def countToTable(sequences, length, table_file, max_memory, bases=None, jobs=None):
+    """ countToTable counts every k-mer of length across the sequences within about max_memory bytes and writes the
+    counts to a k-mer table. The k-mers are partitioned into bins on disk as the sequences stream, each bin is
+    counted on its own, serially or in a pool of jobs processes, and the bins are joined into the table. Only one
+    sequence, one chunk of windows and one bin per worker are in memory at a time. The bins are written to a
+    temporary directory next to table_file.
+
+    Args:
+        sequences ([ str or PackedSeq ]): The sequences of nucleotides, read one at a time
+        length (int): The length of subsequences to count, at least 1
+        table_file (str): The name of the table to write
+        max_memory (int): The bytes the counting may use, shared between the jobs
+        bases (int): The total length of the sequences, which sizes the bins; MAX_BINS bins are used without it
+        jobs (int): The number of worker processes counting bins, None or 1 to count serially
+
+    Returns:
+        KmerTable table: The table, open for queries
+    """
+    requireNumpy()
+    if length < 1:
+        raise ValueError("Out-of-core counting needs a repeat length of at least 1")
+    jobs = jobs if jobs and jobs > 1 else 1
+    budget = max(max_memory // jobs, 1)
+    bins = MAX_BINS if bases is None else binCount(bases, length, budget)
+    chunk_windows = min(max(max_memory // recordBytes(length), 1 << 10), CHUNK_WINDOWS)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(table_file))) as workdir:
+        windows = partitionKmers(sequences, length, bins, workdir, chunk_windows)
+        bin_files = [binPath(workdir, idx) for idx in range(bins)]
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                sizes = list(executor.map(countBin, bin_files, [length] * bins))
+        else:
+            sizes = [countBin(bin_file, length) for bin_file in bin_files]
+        writeTable(table_file, length, windows, bin_files, sizes)
+    return KmerTable(table_file)
+
+
+class KmerTable(Mapping):
+    """ A read only { substr: count } mapping over a memory-mapped k-mer table written by countToTable. A lookup hashes
+    the k-mer to its bin and binary searches the bin; iteration merges the bins back into order of first occurrence,
+    so it gives the keys of getMultiSeqRepeats in the same order without holding them in memory. """
+
+    def __init__(self, filename):
+        requireNumpy()
+        self.filename = filename
+        self._data = np.memmap(filename, dtype=np.uint8, mode='r')
+        if len(self._data) < PREAMBLE.size:
+            raise ValueError(f"{filename} is not a k-mer table")
+        magic, version, self.length, self.bins, self.windows = PREAMBLE.unpack(self._data[:PREAMBLE.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a k-mer table of version {VERSION}")
+        offset = PREAMBLE.size + 8 * (self.bins + 1)
+        self.bounds = self._data[PREAMBLE.size:offset].view('<u8').tolist()
+        dtype = recordType(self.length)
+        end = offset + self.bounds[-1] * dtype.itemsize
+        self.records = self._data[offset:end].view(dtype)
+        end += -end % 8
+        self.order = self._data[end:end + 8 * self.bounds[-1]].view('<u8')
+
+    def __getitem__(self, kmer):
+        key = kmer.lower().encode('latin-1', 'replace')
+        if len(key) != self.length or not self.bins:
+            raise KeyError(kmer)
+        idx = int(binOf(np.array([key], dtype=f'S{self.length}'), self.bins)[0])
+        keys = self.records['kmer'][self.bounds[idx]:self.bounds[idx + 1]]
+        pos = int(np.searchsorted(keys, key))
+        if pos == len(keys) or keys[pos] != key:
+            raise KeyError(kmer)
+        return int(self.records['count'][self.bounds[idx] + pos])
+
+    def __iter__(self):
+        return (kmer for kmer, _ in self.iterCounts())
+
+    def __len__(self):
+        return self.bounds[-1]
+
+    def _binCounts(self, idx, batch=1 << 16):
+        """ _binCounts yields (first, kmer, count) for the records of bin idx in order of first occurrence """
+        end = self.bounds[idx + 1]
+        for start in range(self.bounds[idx], end, batch):
+            rows = self.records[self.order[start:min(start + batch, end)]]
+            yield from zip(rows['first'].tolist(), [kmer.decode('latin-1') for kmer in rows['kmer'].tolist()],
+                           rows['count'].tolist())
+
+    def iterCounts(self):
+        """ iterCounts yields every (substr, count) pair in order of first occurrence, the items of getMultiSeqRepeats
+
+        Returns:
+            generator of (str substr, int count): The lowercased k-mers and their counts
+        """
+        for _, kmer, count in heapq.merge(*(self._binCounts(idx) for idx in range(self.bins))):
+            yield kmer, count
+
+    def mostCommon(self):
+        """ mostCommon returns the most frequent k-mer, ties going to the first seen, as getMostRepeats does over
+        getMultiSeqRepeats, scanning the counts a bin at a time
+
+        Returns:
+            { str most_common: int most_reps }: The most common substring and the number of times it occurs
+        """
+        best = (0, 0, b'')                      # count, -first, kmer
+        for idx in range(self.bins):
+            rows = self.records[self.bounds[idx]:self.bounds[idx + 1]]
+            if not len(rows):
+                continue
+            top = int(rows['count'].max())
+            if top < best[0]:
+                continue
+            tied = np.flatnonzero(rows['count'] == top)
+            row = rows[tied[np.argmin(rows['first'][tied])]]
+            best = max(best, (top, -int(row['first']), bytes(row['kmer'])))
+        return {best[2].decode('latin-1'): best[0]}
+
+    def close(self):
+        """ close drops the memory map; it is unmapped once nothing refers to it """
+        self._data = None
+        self.records = None
+        self.order = None
+        self.bounds = [0]
+        self.bins = 0
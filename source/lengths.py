@@ -0,0 +1,125 @@
+""" Length index built while a file loads, answering length queries without rescanning the sequences """
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+
+class LengthIndex():
+    """ Keeps the length of every record in load order together with a length: [ names ] map. The sorted order and its
+    running totals are computed once, on the first query after the last record was added, so the longest, shortest,
+    top-N, N50 and percentile queries are then constant or logarithmic time lookups. """
+
+    def __init__(self):
+        self.names = []
+        self.lengths = []
+        self.positions = {}                     # name: position in load order
+        self.by_length = {}                     # length: [ names ] in load order
+        self._sorted = None
+
+    def add(self, name, length):
+        """ add records the length of a record. A name that is added again keeps its place but takes the new length,
+        the way a repeated key does in a dictionary. """
+        self._sorted = None
+        if name in self.positions:
+            idx = self.positions[name]
+            self.lengths[idx] = length
+            self.by_length = {}
+            for other, other_length in zip(self.names, self.lengths):
+                self.by_length.setdefault(other_length, []).append(other)
+            return
+        self.positions[name] = len(self.names)
+        self.names.append(name)
+        self.lengths.append(length)
+        self.by_length.setdefault(length, []).append(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _order(self):
+        """ _order returns the lengths sorted in increasing order and their running totals, computing them once """
+        if self._sorted is None:
+            ascending = sorted(self.lengths)
+            self._sorted = (ascending, list(accumulate(reversed(ascending))))
+        return self._sorted
+
+    def _require(self):
+        """ _require raises ValueError when there are no records, as max() and min() do on an empty list """
+        if not self.names:
+            raise ValueError("The length index is empty")
+
+    def longest(self):
+        """ longest returns { int max_length: [ str names ] } for the longest records """
+        self._require()
+        max_length = self._order()[0][-1]
+        return {max_length: list(self.by_length[max_length])}
+
+    def shortest(self):
+        """ shortest returns { int min_length: [ str names ] } for the shortest records """
+        self._require()
+        min_length = self._order()[0][0]
+        return {min_length: list(self.by_length[min_length])}
+
+    def topLongest(self, num):
+        """ topLongest returns the num longest records, longest first and in load order among equal lengths
+
+        Args:
+            num (int): How many records to return
+
+        Returns:
+            [ (str name, int length) ]: The names and lengths of the longest records
+        """
+        ascending = self._order()[0]
+        top = []
+        for length in sorted(set(ascending[-num:]) if num > 0 else [], reverse=True):
+            top.extend((name, length) for name in self.by_length[length])
+        return top[:max(num, 0)]
+
+    def nx(self, fraction=0.5):
+        """ nx returns the Nx and Lx statistics, N50 and L50 by default: the length of the shortest record among the
+        fewest longest records that together hold at least fraction of all bases, and how many records that takes
+
+        Args:
+            fraction (float): The share of the bases to cover, between 0 and 1
+
+        Returns:
+            (int nx, int lx): The length of the shortest record needed and the number of records needed
+        """
+        self._require()
+        ascending, totals = self._order()
+        needed = bisect_left(totals, fraction * totals[-1]) + 1
+        return ascending[-min(needed, len(ascending))], min(needed, len(ascending))
+
+    def percentile(self, percent):
+        """ percentile returns the length below which percent of the records fall, interpolating linearly between
+        the two nearest lengths
+
+        Args:
+            percent (float): The percentile, between 0 and 100
+
+        Returns:
+            float length: The interpolated length
+        """
+        self._require()
+        ascending = self._order()[0]
+        rank = (len(ascending) - 1) * percent / 100
+        low = int(rank)
+        high = min(low + 1, len(ascending) - 1)
+        return ascending[low] + (ascending[high] - ascending[low]) * (rank - low)
+
+    def histogram(self, bins=10):
+        """ histogram counts the records in bins of equal width spanning the shortest to the longest length
+
+        Args:
+            bins (int): The number of bins
+
+        Returns:
+            [ (float low, float high, int count) ]: The bounds of each bin and how many lengths fall in it. Bins
+            include their lower bound and, for the last bin only, their upper bound.
+        """
+        self._require()
+        ascending = self._order()[0]
+        low = ascending[0]
+        high = ascending[-1] if ascending[-1] > low else low + 1
+        width = (high - low) / bins
+        edges = [low + width * idx for idx in range(bins)] + [high]
+        counts = [bisect_left(ascending, edge) for edge in edges[:-1]] + [bisect_right(ascending, high)]
+        return [(edges[idx], edges[idx + 1], counts[idx + 1] - counts[idx]) for idx in range(bins)]
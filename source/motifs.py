@@ -0,0 +1,217 @@
+""" Motif search over every loaded record through a generalized suffix array, built once and optionally saved to disk """
+import mmap
+import os
+import struct
+from bisect import bisect_right
+
+from source.packed import np, requireNumpy
+from source.suffix import SEPARATOR, suffixArray
+
+# The file starts with MAGIC, the format version, the number of records and the sizes of the text and the names. The
+# NUL separated record names follow, then the start of every record in the text and the suffix array as int64, and
+# last the lowercased text itself, every section padded to 8 bytes.
+MAGIC = b'PYGDSSA\x00'
+VERSION = 1
+PREAMBLE = struct.Struct('<8sIIQQ')            # magic, version, records, text size, names size
+MOTIF_SUFFIX = '.pgsa'
+
+
+def motifPath(filename):
+    """ motifPath returns the name of the motif index belonging to a FASTA file """
+    return filename + MOTIF_SUFFIX
+
+
+def motifCurrent(filename):
+    """ motifCurrent tells whether the motif index of a file exists and is newer than the file """
+    index_file = motifPath(filename)
+    return os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(filename)
+
+
+def _padded(size):
+    """ _padded rounds a section size up to a multiple of 8 bytes """
+    return size + (-size % 8)
+
+
+class MotifIndex():
+    """ A suffix array over the lowercased records, each followed by a separator. The occurrences of a motif are one
+    run of adjacent suffixes, found by two binary searches, so a query costs O(m log n) whatever the number of records
+    and a count never touches the hits themselves. Searches ignore case and never match across two records. """
+
+    def __init__(self, names, starts, text, sa, base=0):
+        self.names = names
+        self.starts = starts
+        self.sa = sa
+        self._text = text                       # bytes, or the memory map of a loaded index
+        self._base = base                       # where the text starts in _text
+        self._size = len(sa)
+
+    @classmethod
+    def fromSequences(cls, records):
+        """ fromSequences indexes (name, sequence) pairs
+
+        Args:
+            records ([ (str name, str or PackedSeq sequence) ]): The records to index, in order
+
+        Returns:
+            MotifIndex index: The index of the records
+        """
+        names, starts, parts = [], [], []
+        position = 0
+        for name, seq in records:
+            names.append(name)
+            starts.append(position)
+            parts.append(str(seq).lower() + SEPARATOR)
+            position += len(parts[-1])
+        text = ''.join(parts)
+        return cls(names, starts, text.encode('latin-1'), suffixArray(text))
+
+    @classmethod
+    def load(cls, index_file):
+        """ load opens an index written by save. The file is memory-mapped, so only the pages a query touches are
+        read. Requires numpy. """
+        requireNumpy()
+        with open(index_file, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < PREAMBLE.size:
+            raise ValueError(f"{index_file} is not a motif index")
+        magic, version, count, text_size, names_size = PREAMBLE.unpack(data[:PREAMBLE.size])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{index_file} is not a motif index of version {VERSION}")
+        offset = PREAMBLE.size
+        names = data[offset:offset + names_size].decode('utf-8').split('\x00') if count else []
+        offset += _padded(names_size)
+        starts = np.frombuffer(data, dtype='<i8', count=count, offset=offset).tolist()
+        offset += 8 * count
+        sa = np.frombuffer(data, dtype='<i8', count=text_size, offset=offset)
+        return cls(names, starts, data, sa, offset + 8 * text_size)
+
+    def save(self, index_file):
+        """ save writes the index to index_file, to be opened again by load. Requires numpy. """
+        requireNumpy()
+        blob = '\x00'.join(self.names).encode('utf-8')
+        with open(index_file, 'wb') as file:
+            file.write(PREAMBLE.pack(MAGIC, VERSION, len(self.names), self._size, len(blob)))
+            file.write(blob + b'\x00' * (-len(blob) % 8))
+            file.write(np.asarray(self.starts, dtype='<i8').tobytes())
+            file.write(np.asarray(self.sa, dtype='<i8').tobytes())
+            file.write(self._text[self._base:self._base + self._size])
+        return index_file
+
+    def _prefix(self, idx, size):
+        """ _prefix returns the first size bytes of the suffix at rank idx """
+        start = self._base + int(self.sa[idx])
+        return self._text[start:start + size]
+
+    def _key(self, motif):
+        """ _key encodes a motif the way the text is stored """
+        if not motif:
+            raise ValueError("Motif must not be empty")
+        return motif.lower().encode('latin-1')
+
+    def _bounds(self, key, low=0):
+        """ _bounds returns the ranks [first, last) of the suffixes starting with key, searching from rank low """
+        high = self._size
+        while low < high:
+            mid = (low + high) // 2
+            if self._prefix(mid, len(key)) < key:
+                low = mid + 1
+            else:
+                high = mid
+        first, high = low, self._size
+        while low < high:
+            mid = (low + high) // 2
+            if self._prefix(mid, len(key)) <= key:
+                low = mid + 1
+            else:
+                high = mid
+        return first, low
+
+    def _batch(self, motifs):
+        """ _batch finds the suffix ranks of several motifs, in sorted order so each search starts where the one
+        before it began """
+        bounds = {}
+        low = 0
+        for key in sorted({self._key(motif) for motif in motifs}):
+            bounds[key] = self._bounds(key, low)
+            low = bounds[key][0]
+        return bounds
+
+    def _hits(self, first, last):
+        """ _hits turns the suffixes of ranks [first, last) into (name, position) pairs in text order """
+        if np is not None:
+            positions = np.sort(np.asarray(self.sa[first:last], dtype=np.int64))
+            records = np.searchsorted(np.asarray(self.starts, dtype=np.int64), positions, side='right') - 1
+            offsets = positions - np.asarray(self.starts, dtype=np.int64)[records]
+            return [(self.names[rec], pos) for rec, pos in zip(records.tolist(), offsets.tolist())]
+        hits = []
+        for position in sorted(self.sa[first:last]):
+            rec = bisect_right(self.starts, position) - 1
+            hits.append((self.names[rec], position - self.starts[rec]))
+        return hits
+
+    def count(self, motif):
+        """ count returns the number of occurrences of motif, overlapping ones included, over every record """
+        first, last = self._bounds(self._key(motif))
+        return last - first
+
+    def find(self, motif):
+        """ find returns every occurrence of motif
+
+        Args:
+            motif (str): The bases to search for, in any case
+
+        Returns:
+            [ (str name, int position) ]: The record and 0-based position of every occurrence, in record order and
+            then by position
+        """
+        return self._hits(*self._bounds(self._key(motif)))
+
+    def countAll(self, motifs):
+        """ countAll counts a batch of motifs
+
+        Args:
+            motifs ([ str motif ]): The motifs to search for
+
+        Returns:
+            { str motif: int count }: The number of occurrences of each motif, in the order given
+        """
+        bounds = self._batch(motifs)
+        return {motif: bounds[self._key(motif)][1] - bounds[self._key(motif)][0] for motif in motifs}
+
+    def findAll(self, motifs):
+        """ findAll finds every occurrence of a batch of motifs
+
+        Args:
+            motifs ([ str motif ]): The motifs to search for
+
+        Returns:
+            { str motif: [ (str name, int position) ] }: The occurrences of each motif as returned by find
+        """
+        bounds = self._batch(motifs)
+        return {motif: self._hits(*bounds[self._key(motif)]) for motif in motifs}
+
+    def close(self):
+        """ close drops the index; the memory map of a loaded one is unmapped once nothing refers to it """
+        self.sa = []
+        self.starts = []
+        self.names = []
+        self._text = b''
+        self._size = 0
+
+
+def loadMotifIndex(filename, records):
+    """ loadMotifIndex returns the motif index of a file, reading filename + '.pgsa' if it is up to date and
+    building (and writing) it from records otherwise
+
+    Args:
+        filename (str): The name of the fasta file or store the records were loaded from
+        records ([ (str name, str or PackedSeq sequence) ]): The loaded records
+
+    Returns:
+        MotifIndex index: The motif index of the records
+    """
+    if motifCurrent(filename):
+        return MotifIndex.load(motifPath(filename))
+    index = MotifIndex.fromSequences(records)
+    index.save(motifPath(filename))
+    return index
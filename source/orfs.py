@@ -0,0 +1,111 @@
+""" Streaming enumeration of every ORF on all six reading frames, one codon scan per strand """
+from collections import namedtuple
+
+from source.codons import CODON_RE
+from source.packed import PackedSeq
+
+# One ORF, start codon through stop codon. start and end are 0-based, end exclusive, on the forward strand for both
+# strands; frame is the reading frame 0-2 counted from the start of its own strand, the reverse complement for '-'.
+ORF = namedtuple('ORF', ['strand', 'frame', 'start', 'end', 'length'])
+
+# Bases fetched, and reverse complemented, at a time
+CHUNK_SIZE = 1 << 20
+COMPLEMENT = str.maketrans('ACGTURYKMBVDHNacgturykmbvdhn', 'TGCAAYRMKVBHDNtgcaayrmkvbhdn')
+
+
+def reverseComplement(sequence):
+    """ reverseComplement returns the reverse complement of a sequence, keeping its case and IUPAC ambiguity codes """
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+def _forwardWindows(fetch, length, chunk_size):
+    """ _forwardWindows yields (window, offset, bound): consecutive chunks of the forward strand extended by the two
+    bases a codon starting before bound needs """
+    for start in range(0, length, chunk_size):
+        end = min(start + chunk_size, length)
+        yield fetch(start, min(end + 2, length)), start, end
+
+
+def _reverseWindows(fetch, length, chunk_size):
+    """ _reverseWindows yields the windows of the reverse complement strand, in its own coordinates, complementing one
+    chunk at a time from the end of the forward strand rather than copying the whole strand """
+    for end in range(length, 0, -chunk_size):
+        start = max(end - chunk_size, 0)
+        yield reverseComplement(fetch(max(start - 2, 0), end)), length - end, length - start
+
+
+def _strandORFs(windows, min_length, nested):
+    """ _strandORFs scans the windows of one strand for codons in a single pass, yielding (frame, start, end) for each
+    ORF as soon as its stop codon is found. Only the starts opened since the last stop of each frame are kept. """
+    opened = ([], [], [])
+    for window, offset, bound in windows:
+        for match in CODON_RE.finditer(window):
+            idx = match.start() + offset
+            if idx >= bound:
+                break
+            starts = opened[idx % 3]
+            if match.start(1) >= 0:
+                if nested or not starts:
+                    starts.append(idx)
+                continue
+            for start in starts:
+                if idx + 3 - start < min_length:
+                    break
+                yield idx % 3, start, idx + 3
+            starts.clear()
+
+
+def scanORFs(fetch, length, min_length=0, nested=False, strands='+-', chunk_size=CHUNK_SIZE):
+    """ scanORFs enumerates the ORFs of a sequence read in chunks through fetch, so the sequence (and its reverse
+    complement) never has to be held whole
+
+    Args:
+        fetch (callable): fetch(start, end) returns the bases in [start, end) as a str
+        length (int): The length of the sequence
+        min_length (int): The shortest ORF to report, in bases including the stop codon
+        nested (bool): Also report the ORFs of every later start codon in frame before the same stop codon, instead
+            of only the longest one from the first start after the previous stop (as getLongestORF pairs them)
+        strands (str): The strands to scan, '+', '-' or '+-'
+        chunk_size (int): The number of bases fetched at a time
+
+    Returns:
+        generator of ORF: The ORFs of the forward strand by increasing stop codon, then those of the reverse strand
+        by decreasing stop codon position
+    """
+    if '+' in strands:
+        for frame, start, end in _strandORFs(_forwardWindows(fetch, length, chunk_size), min_length, nested):
+            yield ORF('+', frame, start, end, end - start)
+    if '-' in strands:
+        for frame, start, end in _strandORFs(_reverseWindows(fetch, length, chunk_size), min_length, nested):
+            yield ORF('-', frame, length - end, length - start, end - start)
+
+
+def iterORFs(sequence, min_length=0, nested=False, strands='+-', chunk_size=CHUNK_SIZE):
+    """ iterORFs enumerates the ORFs of one sequence, see scanORFs
+
+    Args:
+        sequence (str or PackedSeq): The sequence of nucleotides to search
+        min_length, nested, strands, chunk_size: See scanORFs
+
+    Returns:
+        generator of ORF: The ORFs found
+    """
+    seq = str(sequence) if isinstance(sequence, PackedSeq) else sequence
+    return scanORFs(lambda start, end: seq[start:end], len(seq), min_length, nested, strands, chunk_size)
+
+
+def writeBed(records, handle):
+    """ writeBed writes (name, ORF) pairs as BED6 lines, one at a time, the ORF being named strand, frame and start
+
+    Args:
+        records (iterable of (str name, ORF orf)): The ORFs and the records they were found in
+        handle (file): A text file open for writing
+
+    Returns:
+        int count: The number of ORFs written
+    """
+    count = 0
+    for name, orf in records:
+        handle.write(f"{name}\t{orf.start}\t{orf.end}\t{orf.strand}{orf.frame}:{orf.start}\t0\t{orf.strand}\n")
+        count += 1
+    return count
@@ -0,0 +1,182 @@
+""" Compact 2-bit sequence representation backed by NumPy, with vectorized codon and ORF detection """
+try:
+    import numpy as np
+except ImportError:                             # numpy is optional, only the packed backend needs it
+    np = None
+
+ALPHABET = b'ACGT'
+
+# Codon codes are base codes read as a base 4 number, with A=0, C=1, G=2, T=3
+START_CODES = (14,)                             # ATG
+STOP_CODES = (56, 50, 48)                       # TGA, TAG, TAA
+
+
+def requireNumpy():
+    """ requireNumpy raises ImportError when numpy is not installed """
+    if np is None:
+        raise ImportError("The packed sequence backend requires numpy, install it with 'pip install numpy'")
+
+
+def _encodeTable():
+    """ _encodeTable builds the byte to base code lookup table, with 4 marking an ambiguous base """
+    table = np.full(256, 4, dtype=np.uint8)
+    for code, base in enumerate(ALPHABET):
+        table[base] = code
+        table[base + 32] = code                 # lowercase
+    return table
+
+
+_TABLE = _encodeTable() if np is not None else None
+
+
+class PackedSeq():
+    """ A nucleotide sequence packed 4 bases to a byte. Bases other than A, C, G and T are packed as A and recorded
+    in an exceptions table of (start, length) runs holding the original characters, which keeps the sequence
+    recoverable while letting vectorized code mask them out. Lowercase (soft-masked) bases decode as uppercase. """
+
+    __slots__ = ('bases', 'length', 'exc_starts', 'exc_lengths', 'exc_chars')
+
+    def __init__(self, bases, length, exc_starts, exc_lengths, exc_chars):
+        self.bases = bases
+        self.length = length
+        self.exc_starts = exc_starts
+        self.exc_lengths = exc_lengths
+        self.exc_chars = exc_chars
+
+    @classmethod
+    def fromString(cls, sequence):
+        """ fromString packs a sequence of nucleotides
+
+        Args:
+            sequence (str): The sequence to pack, in any case
+
+        Returns:
+            PackedSeq packed: The packed sequence
+        """
+        codes, ambiguous = encodeBases(sequence)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], ambiguous.view(np.int8), [0]))))
+        raw = np.frombuffer(sequence.encode('latin-1'), dtype=np.uint8)
+        return cls(packCodes(codes), len(codes), edges[0::2], edges[1::2] - edges[0::2], raw[ambiguous].tobytes())
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        raw = np.frombuffer(ALPHABET, dtype=np.uint8)[self.codes()]
+        raw[self.ambiguousMask()] = np.frombuffer(self.exc_chars, dtype=np.uint8)
+        return raw.tobytes().decode('latin-1')
+
+    def __eq__(self, other):
+        return isinstance(other, PackedSeq) and self.length == other.length and str(self) == str(other)
+
+    @property
+    def nbytes(self):
+        """ nbytes is the memory held by the packed bases and the exceptions table """
+        return self.bases.nbytes + self.exc_starts.nbytes + self.exc_lengths.nbytes + len(self.exc_chars)
+
+    def codes(self):
+        """ codes unpacks the sequence into one base code (0-3) per base """
+        return unpackCodes(self.bases, self.length)
+
+    def ambiguousMask(self):
+        """ ambiguousMask returns a boolean array that is True at every base outside A, C, G and T """
+        marks = np.zeros(self.length + 1, dtype=np.int8)
+        np.add.at(marks, self.exc_starts, 1)
+        np.add.at(marks, self.exc_starts + self.exc_lengths, -1)
+        return np.cumsum(marks[:-1]) > 0
+
+    def codonCodes(self):
+        """ codonCodes computes the codon code starting at every position in one array operation
+
+        Returns:
+            (array codons, array valid): The code (0-63) of the codon at each of the len - 2 positions and whether
+            that codon contains only unambiguous bases
+        """
+        if self.length < 3:
+            return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=bool)
+        codes = self.codes()
+        codons = (codes[:-2] << 4) | (codes[1:-1] << 2) | codes[2:]
+        ambiguous = self.ambiguousMask()
+        valid = ~(ambiguous[:-2] | ambiguous[1:-1] | ambiguous[2:])
+        return codons, valid
+
+    def codonPositions(self):
+        """ codonPositions finds every start and stop codon with boolean masks over the codon codes
+
+        Returns:
+            (array starts, array stops): Sorted indices of every start codon and every stop codon
+        """
+        codons, valid = self.codonCodes()
+        starts = np.flatnonzero(valid & np.isin(codons, START_CODES))
+        stops = np.flatnonzero(valid & np.isin(codons, STOP_CODES))
+        return starts, stops
+
+    def scanCodons(self):
+        """ scanCodons returns the start and stop codon indices split by reading frame, in the same form as
+        codons.scanCodons """
+        return tuple({frame: positions[positions % 3 == frame].tolist() for frame in range(3)}
+                     for positions in self.codonPositions())
+
+    def longestORF(self):
+        """ longestORF finds the longest ORF on each forward reading frame, in the same form as codons.pairORFs """
+        starts, stops = self.codonPositions()
+        return {frame: pairFrame(starts[starts % 3 == frame], stops[stops % 3 == frame]) for frame in range(3)}
+
+
+def encodeBases(sequence):
+    """ encodeBases converts a sequence into one base code (0-3) per base with a single table lookup
+
+    Args:
+        sequence (str or PackedSeq): The sequence to encode, in any case
+
+    Returns:
+        (array codes, array ambiguous): The base codes, with ambiguous bases coded as A, and a boolean array that is
+        True at every base outside A, C, G and T
+    """
+    if isinstance(sequence, PackedSeq):
+        return sequence.codes(), sequence.ambiguousMask()
+    requireNumpy()
+    codes = _TABLE[np.frombuffer(sequence.encode('latin-1'), dtype=np.uint8)]
+    ambiguous = codes > 3
+    codes[ambiguous] = 0
+    return codes, ambiguous
+
+
+def packCodes(codes):
+    """ packCodes packs an array of base codes (0-3) four to a byte, first base in the high bits """
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    return (padded[0::4] << 6) | (padded[1::4] << 4) | (padded[2::4] << 2) | padded[3::4]
+
+
+def unpackCodes(bases, length):
+    """ unpackCodes reverses packCodes, returning the first length base codes """
+    codes = np.empty(len(bases) * 4, dtype=np.uint8)
+    for shift in range(4):
+        codes[shift::4] = (bases >> (6 - 2 * shift)) & 3
+    return codes[:length]
+
+
+def pairFrame(starts, stops):
+    """ pairFrame pairs the sorted start and stop codon indices of one reading frame. Each stop codon closes the ORF
+    opened by the first start codon after the previous stop, which searchsorted finds for every stop at once.
+
+    Args:
+        starts (array): Sorted start codon indices on one reading frame
+        stops (array): Sorted stop codon indices on the same reading frame
+
+    Returns:
+        { 'length': int longest, 'index': int index}: The length and index of the longest ORF, or a length of 0 and
+        index of -1 if there is none
+    """
+    if len(starts) == 0 or len(stops) == 0:
+        return {'length': 0, 'index': -1}
+    previous = np.concatenate(([-1], stops[:-1]))
+    first = np.searchsorted(starts, previous, side='right')
+    opened = first < len(starts)
+    first_start = starts[np.minimum(first, len(starts) - 1)]
+    lengths = np.where(opened & (first_start < stops), stops + 3 - first_start, 0)
+    best = int(np.argmax(lengths))
+    if lengths[best] == 0:
+        return {'length': 0, 'index': -1}
+    return {'length': int(lengths[best]), 'index': int(first_start[best])}
@@ -0,0 +1,175 @@
+""" Process pool execution of per-record analyses over size-balanced batches of records """
+from concurrent.futures import ProcessPoolExecutor
+
+from source.cache import fileStamp
+from source.fasta import IndexedFasta
+from source.store import PackedStore
+
+# Batches per worker, so a few long records do not leave the other workers idle at the end
+BATCHES_PER_JOB = 4
+# Sequences shorter than this are scanned in one piece even when jobs are given
+CHUNK_MIN_LENGTH = 1 << 20
+
+_open_files = {}                                # worker side cache of memory-mapped files: (version, handle)
+
+
+def recordSize(seq_dict, name):
+    """ recordSize returns the length of a record without decoding it from a lazily loaded file or a packed store """
+    if isinstance(seq_dict, (IndexedFasta, PackedStore)):
+        return seq_dict.getLength(name)
+    return len(seq_dict[name])
+
+
+def balancedBatches(seq_dict, jobs):
+    """ balancedBatches splits the records into contiguous batches holding about the same number of bases
+
+    Args:
+        seq_dict ({ str name: str sequence}): A dictionary of name: sequence pairs
+        jobs (int): The number of workers the batches are shared between
+
+    Returns:
+        [ [ str name ] ]: The names of the records in each batch, in dictionary order
+    """
+    names = list(seq_dict)
+    sizes = [recordSize(seq_dict, name) for name in names]
+    target = max(sum(sizes) / max(jobs * BATCHES_PER_JOB, 1), 1)
+    batches = []
+    batch = []
+    filled = 0
+    for name, size in zip(names, sizes):
+        batch.append(name)
+        filled += size
+        if filled >= target:
+            batches.append(batch)
+            batch = []
+            filled = 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _task(seq_dict, names):
+    """ _task packs one batch for a worker. Records of a memory-mapped file travel as index entries, records of a
+    packed store as their names, and both are read by the worker itself; other records travel as (name, sequence)
+    pairs. The dictionary itself is never sent. """
+    if isinstance(seq_dict, IndexedFasta):
+        return (seq_dict.filename, [seq_dict.index[name] for name in names])
+    if isinstance(seq_dict, PackedStore):
+        return (seq_dict.filename, list(names))
+    return (None, [(name, seq_dict[name]) for name in names])
+
+
+def _openFile(filename, opener):
+    """ _openFile returns the worker's handle on a memory-mapped file, reopening it when the file has changed since it
+    was opened, as it may between the jobs of a long-lived pool, and closing the stale handle """
+    version = fileStamp(filename)[1]
+    cached = _open_files.get(filename)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    handle = opener(filename)
+    _open_files[filename] = (version, handle)
+    return handle
+
+
+def _records(task):
+    """ _records unpacks a task into (name, sequence) pairs """
+    filename, items = task
+    if filename is None:
+        return items
+    if isinstance(items[0], str):               # names in a packed store, whose index is read on opening
+        store = _openFile(filename, PackedStore)
+        return [(name, store[name]) for name in items]
+    fasta = _openFile(filename, lambda name: IndexedFasta(name, index={}))
+    fasta.index.update((rec.name, rec) for rec in items)
+    return [(rec.name, fasta[rec.name]) for rec in items]
+
+
+def runBatch(func, per_record, task):
+    """ runBatch applies func to every record of a batch, or once to all of its sequences, in a worker process """
+    records = _records(task)
+    if per_record:
+        return [(name, func(seq)) for name, seq in records]
+    return func([seq for _, seq in records])
+
+
+def batchTasks(seq_dict, jobs):
+    """ batchTasks splits seq_dict into size-balanced batches packed for runBatch, in dictionary order """
+    return [_task(seq_dict, names) for names in balancedBatches(seq_dict, jobs)]
+
+
+def _runBatches(func, per_record, seq_dict, jobs):
+    """ _runBatches runs func over size-balanced batches in a pool of jobs processes, returning results in order """
+    tasks = batchTasks(seq_dict, jobs)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(runBatch, [func] * len(tasks), [per_record] * len(tasks), tasks))
+
+
+def mapRecords(func, seq_dict, jobs):
+    """ mapRecords applies func to every sequence of seq_dict in a process pool
+
+    Args:
+        func (callable): A picklable function of one sequence, such as sequences.recordLongestORF
+        seq_dict ({ str name: str sequence}): A dictionary of name: sequence pairs
+        jobs (int): The number of worker processes
+
+    Returns:
+        [ (str name, result) ]: The result for every record, in dictionary order
+    """
+    return [item for batch in _runBatches(func, True, seq_dict, jobs) for item in batch]
+
+
+def mapBatches(func, seq_dict, jobs):
+    """ mapBatches applies func to the list of sequences of each batch of seq_dict in a process pool
+
+    Args:
+        func (callable): A picklable function of a list of sequences, such as partial(countMultiKmers, length=3)
+        seq_dict ({ str name: str sequence}): A dictionary of name: sequence pairs
+        jobs (int): The number of worker processes
+
+    Returns:
+        [ result ]: The result for every batch, in dictionary order, ready to be reduced by the caller
+    """
+    return _runBatches(func, False, seq_dict, jobs)
+
+
+def chunkBounds(size, jobs):
+    """ chunkBounds splits [0, size) into about BATCHES_PER_JOB windows per worker
+
+    Args:
+        size (int): The length of the sequence
+        jobs (int): The number of workers the windows are shared between
+
+    Returns:
+        [ (int start, int end) ]: Consecutive windows covering the sequence
+    """
+    count = max(min(jobs * BATCHES_PER_JOB, size), 1)
+    bounds = [size * idx // count for idx in range(count + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def mapChunks(func, sequence, overlap, jobs):
+    """ mapChunks cuts one long sequence into windows and applies func to each in a process pool. Each window is
+    extended by overlap bases, so a feature of length overlap + 1 starting in a window is always seen whole by that
+    window, and only by it as long as func ignores features starting in the extension.
+
+    Args:
+        func (callable): A picklable function of (str window, int offset), offset being the window's start
+        sequence (str or PackedSeq): The sequence to cut
+        overlap (int): How many bases past its end each window extends
+        jobs (int): The number of worker processes
+
+    Returns:
+        [ result ]: The result for every window, in sequence order, ready to be stitched by the caller
+    """
+    seq = str(sequence)
+    bounds = chunkBounds(len(seq), jobs)
+    windows = [seq[start:end + overlap] for start, end in bounds]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(func, windows, [start for start, _ in bounds]))
+
+
+def useChunks(sequence, jobs):
+    """ useChunks tells whether a sequence is long enough to be split across jobs workers """
+    return bool(jobs) and jobs > 1 and len(sequence) >= CHUNK_MIN_LENGTH
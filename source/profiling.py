@@ -0,0 +1,138 @@
+""" Opt-in instrumentation of the FastaSeq methods: call counts, wall and CPU time, data processed and peak allocation """
+import os
+import time
+import tracemalloc
+from functools import wraps
+
+from source.packed import PackedSeq
+from source.parallel import recordSize
+
+STAT_FIELDS = ('calls', 'wall', 'cpu', 'bases', 'bytes', 'peak')
+
+
+def sequenceSize(sequence):
+    """ sequenceSize returns the bases and bytes of one sequence, a PackedSeq holding about a quarter byte per base """
+    if isinstance(sequence, PackedSeq):
+        return len(sequence), sequence.nbytes
+    return len(sequence), len(sequence)
+
+
+def dictSize(seq_dict):
+    """ dictSize returns the bases of a dictionary of sequences, read from the index of a lazily loaded one """
+    bases = sum(recordSize(seq_dict, name) for name in seq_dict)
+    return bases, bases
+
+
+def _dataSize(kind, owner, args):
+    """ _dataSize measures what a call processes: its sequence argument, its dictionary argument, the loaded
+    dictionary, or the file it loaded, by kind """
+    if kind in ('sequence', 'dict', 'file') and not args:
+        return 0, 0
+    if kind == 'sequence':
+        return sequenceSize(args[0])
+    if kind == 'dict':
+        return dictSize(args[0])
+    if kind == 'loaded':
+        return dictSize(owner.sequences)
+    if kind == 'file':
+        size = os.path.getsize(args[0]) if os.path.exists(args[0]) else 0
+        return sum(owner.lengths.lengths) if owner.lengths is not None else 0, size
+    return 0, 0
+
+
+class Profiler():
+    """ Accumulates per-method statistics of instrumented calls and passes every call to the registered hooks. Peak
+    allocation is only traced with trace_memory, which starts tracemalloc and slows Python allocation down. Times and
+    peaks of nested calls are included in those of the calls around them. """
+
+    def __init__(self, trace_memory=False, hooks=()):
+        self.trace_memory = trace_memory
+        self.hooks = list(hooks)
+        self.stats = {}
+        self._peaks = []                        # [traced memory at start, highest seen] of each open call
+        self._started = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+    def addHook(self, hook):
+        """ addHook registers a callable that receives a dictionary of 'method' and STAT_FIELDS after every call """
+        self.hooks.append(hook)
+
+    def call(self, name, kind, func, owner, args, kwargs):
+        """ call runs an instrumented method and records its statistics """
+        if self.trace_memory:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            self._peaks.append([base, base])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            return func(owner, *args, **kwargs)
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            peak = self._peak() if self.trace_memory else 0
+            bases, size = _dataSize(kind, owner, args)
+            self.record({'method': name, 'calls': 1, 'wall': wall, 'cpu': cpu, 'bases': bases, 'bytes': size,
+                         'peak': peak})
+
+    def _peak(self):
+        """ _peak closes the innermost traced call, returning its peak above the memory in use when it started and
+        passing its absolute peak on to the call around it, whose own peak counter the nested call reset """
+        base, highest = self._peaks.pop()
+        top = max(tracemalloc.get_traced_memory()[1], highest)
+        if self._peaks:
+            self._peaks[-1][1] = max(self._peaks[-1][1], top)
+        return top - base
+
+    def record(self, event):
+        """ record adds one call to the statistics and passes it to the hooks """
+        stats = self.stats.setdefault(event['method'], dict.fromkeys(STAT_FIELDS, 0))
+        for field in STAT_FIELDS:
+            if field == 'peak':
+                stats[field] = max(stats[field], event[field])
+            else:
+                stats[field] += event[field]
+        for hook in self.hooks:
+            hook(event)
+
+    def snapshot(self):
+        """ snapshot returns a copy of the statistics
+
+        Returns:
+            { str method: { 'calls': int, 'wall': float, 'cpu': float, 'bases': int, 'bytes': int, 'peak': int } }:
+            The number of calls, total wall and CPU seconds, total bases and bytes processed and the largest peak
+            allocation in bytes of each method
+        """
+        return {name: dict(stats) for name, stats in self.stats.items()}
+
+    def reset(self):
+        """ reset clears the statistics """
+        self.stats = {}
+
+    def close(self):
+        """ close stops tracemalloc if this profiler started it """
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+
+def profiled(kind=None):
+    """ profiled instruments a FastaSeq method. While the class has no profiler the call goes straight through, at
+    the cost of one attribute lookup.
+
+    Args:
+        kind (str): What the method processes, for the bases and bytes statistics: 'sequence' (its first argument),
+            'dict' (its first argument, a dictionary of sequences), 'loaded' (the instance dictionary), 'file' (the file
+            named by its first argument) or None
+    """
+    def decorate(func):
+        name = func.__name__
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if profiler is None:
+                return func(self, *args, **kwargs)
+            return profiler.call(name, kind, func, self, args, kwargs)
+        return wrapper
+    return decorate
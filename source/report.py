@@ -0,0 +1,209 @@
+""" Single pass batch report over a FASTA file: record count, length statistics, longest ORFs and repeat counts """
+import json
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from source.codons import pairORFs, scanCodons
+from source.compressed import openFasta
+from source.fasta import iterRecords
+from source.kmers import countKmers
+from source.lengths import LengthIndex
+from source.parallel import BATCHES_PER_JOB
+from source.topk import SpaceSaving
+
+# Records are sent to workers in batches of about this many bases
+BATCH_BASES = 1 << 20
+# Rough bytes held by one entry of a k-mer count table, on top of the k-mer itself
+ENTRY_BYTES = 100
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parseSize(text):
+    """ parseSize reads a size such as 512M or 2G as a number of bytes
+
+    Args:
+        text (str): A number followed by an optional K, M, G or T (powers of 1024), with an optional trailing B
+
+    Returns:
+        int size: The size in bytes
+    """
+    size = text.strip().upper()
+    size = size[:-1] if size.endswith('B') else size
+    unit = size[-1:] if size[-1:] in SIZE_UNITS else ''
+    try:
+        return int(float(size[:len(size) - len(unit)]) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid size {text!r}, expected a number such as 512M or 2G") from None
+
+
+def summarizeBatch(records, lengths):
+    """ summarizeBatch scans a batch of records once for codons and k-mers
+
+    Args:
+        records ([ (str name, str sequence) ]): The records of the batch, in file order
+        lengths ([ int length ]): The repeat lengths to count
+
+    Returns:
+        ([ (str name, int length, { int frame: { 'length': int, 'index': int } }) ], { int length: { str substr:
+        int repeats } }): The length and longest ORFs of every record, and the k-mer counts of the whole batch in
+        order of first occurrence
+    """
+    summaries = []
+    totals = {length: Counter() for length in lengths}
+    for name, seq in records:
+        summaries.append((name, len(seq), pairORFs(*scanCodons(seq))))
+        for length in lengths:
+            totals[length].update(countKmers(seq, length))
+    return summaries, {length: dict(counts) for length, counts in totals.items()}
+
+
+def _batches(records):
+    """ _batches groups consecutive records into batches of about BATCH_BASES bases """
+    batch = []
+    filled = 0
+    for name, seq in records:
+        batch.append((name, seq))
+        filled += len(seq)
+        if filled >= BATCH_BASES:
+            yield batch
+            batch = []
+            filled = 0
+    if batch:
+        yield batch
+
+
+def summarizeRecords(records, lengths, jobs=None):
+    """ summarizeRecords runs summarizeBatch over a stream of records, serially or in a pool of jobs processes. At most
+    BATCHES_PER_JOB batches per worker are in flight, so reading the file never runs far ahead of the workers.
+
+    Args:
+        records (iterable of (str name, str sequence)): The records, read lazily
+        lengths ([ int length ]): The repeat lengths to count
+        jobs (int): The number of worker processes, None or 1 to run serially
+
+    Returns:
+        generator of summarizeBatch results, in file order
+    """
+    if not jobs or jobs < 2:
+        for record in records:
+            yield summarizeBatch([record], lengths)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for batch in _batches(records):
+            pending.append(executor.submit(summarizeBatch, batch, lengths))
+            if len(pending) >= jobs * BATCHES_PER_JOB:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class RepeatTally():
+    """ Totals the k-mer counts of one length across batches. Counts are exact while the table fits in budget bytes;
+    past that the table is folded into a Space-Saving summary of the same size, which keeps the most frequent
+    repeat and bounds the error of its count (see topk.SpaceSaving). """
+
+    def __init__(self, length, budget=None):
+        self.length = length
+        self.capacity = None if budget is None else max(budget // (ENTRY_BYTES + length), 1)
+        self.counts = Counter()
+        self.summary = None
+
+    def add(self, counts):
+        """ add merges the k-mer counts of one batch """
+        if self.summary is not None:
+            for key, weight in counts.items():
+                self.summary.update(key, weight)
+            return
+        self.counts.update(counts)
+        if self.capacity is not None and len(self.counts) > self.capacity:
+            self.summary = SpaceSaving(self.capacity)
+            for key, weight in self.counts.items():
+                self.summary.update(key, weight)
+            self.counts = None
+
+    def result(self):
+        """ result returns the number of distinct and repeated k-mers and the most frequent one, ties going to the
+        first seen as in getMostRepeats. Distinct and repeated counts are None once the tally is approximate. """
+        if self.summary is not None:
+            ((most_common, most_reps, error),) = self.summary.top(1) or [('', 0, 0)]
+            return {'exact': False, 'distinct': None, 'repeated': None, 'most_common': most_common,
+                    'repeats': most_reps, 'error': error}
+        most_common, most_reps = '', 0
+        for key, val in self.counts.items():
+            if val > most_reps:
+                most_common, most_reps = key, val
+        return {'exact': True, 'distinct': len(self.counts), 'repeated': sum(1 for val in self.counts.values() if val > 1),
+                'most_common': most_common, 'repeats': most_reps, 'error': 0}
+
+
+def _lengthStats(index):
+    """ _lengthStats summarizes the length index of the report """
+    if not len(index):
+        return {'total': 0}
+    longest, = index.longest().items()
+    shortest, = index.shortest().items()
+    n50, l50 = index.nx()
+    return {'total': sum(index.lengths), 'longest': {'length': longest[0], 'names': longest[1]},
+            'shortest': {'length': shortest[0], 'names': shortest[1]}, 'mean': sum(index.lengths) / len(index),
+            'median': index.percentile(50), 'n50': n50, 'l50': l50}
+
+
+def _updateORFs(best, name, orfs):
+    """ _updateORFs keeps the longest ORF of each frame, the first record winning ties as in getFileLongestORF """
+    for frame in range(3):
+        if orfs[frame]['length'] > best.get(frame, {'length': 0})['length']:
+            best[frame] = {'name': name, 'length': orfs[frame]['length'], 'position': orfs[frame]['index'] + 1}
+        best.setdefault(frame, {'name': '', 'length': 0, 'position': 1})
+
+
+def buildReport(filename, lengths=(), jobs=None, max_memory=None):
+    """ buildReport answers the whole question set of the README in one streaming pass over a FASTA file. Only the
+    records in flight are held in memory, so files larger than RAM can be reported on.
+
+    Args:
+        filename (str): The name of the fasta file
+        lengths ([ int length ]): The repeat lengths to count
+        jobs (int): The number of worker processes, None or 1 to run serially
+        max_memory (int): Bytes the repeat tables may use together before they turn approximate, None for no limit
+
+    Returns:
+        { 'file': str, 'records': int, 'lengths': {..}, 'orfs': { int frame: { 'name', 'length', 'position' } },
+        'repeats': { int length: {..} } }: The report, with the longest ORFs in the form of getFileLongestORF
+    """
+    lengths = list(lengths)
+    budget = None if max_memory is None else max_memory // max(len(lengths), 1)
+    tallies = {length: RepeatTally(length, budget) for length in lengths}
+    index = LengthIndex()
+    orfs = {}
+    with openFasta(filename) as file:
+        records = ((rec.name, seq) for rec, seq, _ in iterRecords(file))
+        for summaries, counts in summarizeRecords(records, lengths, jobs):
+            for name, size, record_orfs in summaries:
+                index.add(name, size)
+                _updateORFs(orfs, name, record_orfs)
+            for length, batch_counts in counts.items():
+                tallies[length].add(batch_counts)
+    return {'file': filename, 'records': len(index), 'lengths': _lengthStats(index), 'orfs': orfs,
+            'repeats': {length: tally.result() for length, tally in tallies.items()}}
+
+
+def formatJson(report):
+    """ formatJson renders a report as indented JSON """
+    return json.dumps(report, indent=2) + '\n'
+
+
+def _flatten(value, prefix):
+    """ _flatten yields (dotted key, value) pairs for every leaf of a nested report """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, list):
+        yield prefix, ','.join(str(item) for item in value)
+    else:
+        yield prefix, '' if value is None else str(value)
+
+
+def formatTsv(report):
+    """ formatTsv renders a report as tab separated key, value lines, keys being dotted paths such as orfs.0.length """
+    return 'key\tvalue\n' + ''.join(f"{key}\t{value}\n" for key, value in _flatten(report, ''))
@@ -3,44 +3,297 @@
 
 # seq_recs = {record.id: record for record in SeqIO.parse(FILENAME, 'fasta')}
 
+import argparse
+import os
+import sys
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+
+from source.cache import DEFAULT_MAX_BYTES, Memo, ResultCache, contentHash, fileStamp, sequenceDigest
+from source.compressed import openFasta
+from source.codons import findStarts, findStops, mergeFrames, pairORFs, scanCodons, stitchORFs, summarizeORFs
+from source.fasta import IndexedFasta, indexPath, iterRecords, writeIndex
+from source.kmers import countKmers, countMultiKmers, countWindow
+from source.kmertable import TABLE_SUFFIX, KmerTable, countToTable
+from source.lengths import LengthIndex
+from source.motifs import MotifIndex, loadMotifIndex, motifCurrent, motifPath
+from source.orfs import iterORFs, scanORFs
+from source.packed import PackedSeq
+from source.parallel import mapBatches, mapChunks, mapRecords, recordSize, useChunks
+from source.profiling import Profiler, profiled
+from source.report import buildReport, formatJson, formatTsv, parseSize
+from source.store import PackedStore, convertFasta, storePath, writeStore
+from source.suffix import RepeatIndex
+from source.topk import topRepeats
+
+
+def recordLongestORF(sequence):
+    """ recordLongestORF scans one sequence for its longest ORF on each forward frame, vectorized for a PackedSeq.
+    It holds no reference to a FastaSeq, so worker processes receive only the sequence. """
+    if isinstance(sequence, PackedSeq):
+        return sequence.longestORF()
+    return pairORFs(*scanCodons(sequence))
+
+
+def reduceORFs(results):
+    """ reduceORFs keeps the longest ORF of each frame over (name, getLongestORF result) pairs, the first record
+    winning ties, in the form getFileLongestORF returns """
+    ret_dict = {}
+    longest = [0, 0, 0]
+    lgst_name = ['', '', '']
+    lgst_idx = [0, 0, 0]
+    for name, result in results:
+        for frame in range(3):
+            if result[frame]["length"] > longest[frame]:
+                longest[frame] = result[frame]["length"]
+                lgst_name[frame] = name
+                lgst_idx[frame] = result[frame]["index"]
+            ret_dict[frame] = {"name": lgst_name[frame], "length": longest[frame], "position": lgst_idx[frame] + 1}
+    return ret_dict
 
-class FastaSeq():
-    sequences = {}
 
-    @classmethod
-    def buildDict(self, filename):
-        """ buildDict builds a dictionary of name: sequence pairs given a fasta formatted file
+class FastaSeq():
+    """ FastaSeq holds the records of one loaded file with its indexes, cache and profiler. Each instance is
+    independent, so several files can be loaded and analyzed at once, from several threads if needed. """
+
+    def __init__(self):
+        self.sequences = {}
+        self.index = {}
+        self.lengths = None
+        self.repeat_index = None
+        self.motif_index = None
+        self.stamp = None
+        self.cache = None
+        self.memo = None
+        self.profiler = None
+
+    @profiled('file')
+    def buildDict(self, filename, lazy=False, write_index=False, packed=False):
+        """ buildDict builds a dictionary of name: sequence pairs given a fasta formatted file. The file is parsed in
+        a single linear pass that also records a .fai style index entry (name, length, offset, line width) for each
+        record, along with the length index that answers the length queries. In lazy mode the sequences are not read
+        at all: the file is memory-mapped and records are sliced out on demand through the index, which is read from
+        filename + '.fai' when it is up to date. In packed mode each record is stored as a PackedSeq, 2 bits per base,
+        and the codon and ORF queries run vectorized over it. Files compressed with gzip, bzip2 or xz are detected by
+        their content and decompressed in a background thread while they are parsed; lazy mode also accepts BGZF files,
+        read through their .gzi block index.
 
         Args:
             filename (str): the name of the fasta file to open
+            lazy (bool): memory-map the file and decode records on demand instead of loading them
+            write_index (bool): write the index built while loading to filename + '.fai'
+            packed (bool): store each record as a NumPy backed PackedSeq instead of a str (requires numpy)
         """
-        self.sequences.clear()
+        if lazy and packed:
+            raise ValueError("buildDict cannot be both lazy and packed")
+        self.close()
         try:
-            file = open(filename)
+            self.stamp = fileStamp(filename)
         except FileNotFoundError:
             print(f"File {filename} not found!")
             return
+        if lazy:
+            self.sequences = IndexedFasta(filename)
+            self.index = self.sequences.index
+            self.lengths = LengthIndex()
+            for rec in self.index.values():
+                self.lengths.add(rec.name, rec.length)
+            return
+        if self.cache is not None and os.path.getsize(filename) > self.cache.max_bytes:
+            self.sequences, self.index, self.lengths = self._readFile(filename, packed)     # too large to be kept
         else:
-            for line in file:
-                line = line.rstrip()
-                if line.startswith('>'):
-                    words = line.split()
-                    name = words[0][1:]
-                    self.sequences[name] = ''
-                else:
-                    self.sequences[name] = self.sequences[name] + line
-            file.close()
-
-    @classmethod
+            self.sequences, self.index, self.lengths = self._cached(None, ('buildDict', packed),
+                                                                    lambda: self._readFile(filename, packed))
+        if write_index:
+            if len(self.index) != len(self.sequences):
+                raise ValueError(f"{filename} has records with irregular line lengths and cannot be indexed")
+            writeIndex(self.index, indexPath(filename))
+
+    def _readFile(self, filename, packed):
+        """ _readFile parses a fasta file in one pass into a dictionary of sequences, a dictionary of index entries
+        for the records whose lines are regular enough to be addressed by offset, and the length index """
+        sequences = {}
+        index = {}
+        lengths = LengthIndex()
+        with openFasta(filename) as file:
+            for rec, seq, regular in iterRecords(file):
+                sequences[rec.name] = PackedSeq.fromString(seq) if packed else seq
+                lengths.add(rec.name, len(seq))
+                if regular:
+                    index[rec.name] = rec
+        return sequences, index, lengths
+
+    @profiled('file')
+    def loadStore(self, filename):
+        """ loadStore opens a packed store written by writeStore or convertFasta in place of the instance dictionary. Only
+        the store's index is read: the file is memory-mapped and each record is a PackedSeq whose bases are paged in
+        when it is used, so opening even a very large store takes milliseconds. Requires numpy.
+
+        Args:
+            filename (str): the name of the store to open
+        """
+        self.close()
+        try:
+            self.stamp = fileStamp(filename)
+        except FileNotFoundError:
+            print(f"File {filename} not found!")
+            return
+        self.sequences = PackedStore(filename)
+        self.lengths = LengthIndex()
+        for rec in self.sequences.index.values():
+            self.lengths.add(rec.name, rec.length)
+
+    @profiled('loaded')
+    def writeStore(self, store_file=None, fasta_file=None):
+        """ writeStore converts the loaded sequences, or a fasta file streamed one record at a time, into a packed
+        store that loadStore opens near instantly. Soft-masked (lowercase) bases are stored as uppercase.
+
+        Args:
+            store_file (str): the name of the store to write, defaults to fasta_file + '.pgds' when converting a file
+            fasta_file (str): a fasta file to convert instead of the instance dictionary
+
+        Returns:
+            str store_file: the name of the store written
+        """
+        if fasta_file is not None:
+            return convertFasta(fasta_file, store_file or storePath(fasta_file))
+        if store_file is None:
+            raise ValueError("writeStore needs a store_file when converting the instance dictionary")
+        writeStore(self.sequences.items(), store_file)
+        return store_file
+
+    def enableCache(self, path=None, max_bytes=DEFAULT_MAX_BYTES, memo_size=256):
+        """ enableCache stores the results of buildDict, getFileLongestORF and getMultiSeqRepeats on disk so they are
+        reused across runs, and keeps the last memo_size results of getLongestORF and getRepeats in memory. Results of
+        a loaded file are keyed by its path, modification time and size, so they are invalidated when it changes;
+        results for any other dictionary are keyed by a hash of its contents.
+
+        Args:
+            path (str): The SQLite database to use, defaults to ~/.cache/pygds/results.sqlite
+            max_bytes (int): The size past which least recently used results are evicted
+            memo_size (int): How many per-sequence results to keep in memory, 0 for none
+        """
+        self.disableCache()
+        self.cache = ResultCache(path, max_bytes)
+        self.memo = Memo(memo_size) if memo_size else None
+
+    def disableCache(self):
+        """ disableCache stops caching results and closes the cache database """
+        if self.cache is not None:
+            self.cache.close()
+        self.cache = None
+        self.memo = None
+
+    def enableProfiling(self, trace_memory=False, hook=None):
+        """ enableProfiling starts recording, for every FastaSeq method, the number of calls, wall and CPU time, the
+        bases and bytes processed and, with trace_memory, the peak allocation traced by tracemalloc. While profiling
+        is off the methods run uninstrumented. Work done in worker processes adds to wall time but not to CPU time.
+
+        Args:
+            trace_memory (bool): Trace the peak allocation of each call, which slows allocation down
+            hook (callable): Called after every call with a dictionary of 'method', 'calls', 'wall', 'cpu', 'bases',
+                'bytes' and 'peak'
+
+        Returns:
+            Profiler profiler: The profiler now in use, see getProfile
+        """
+        self.disableProfiling()
+        self.profiler = Profiler(trace_memory, [hook] if hook is not None else [])
+        return self.profiler
+
+    def disableProfiling(self):
+        """ disableProfiling stops recording statistics, stopping tracemalloc if enableProfiling started it """
+        if self.profiler is not None:
+            self.profiler.close()
+        self.profiler = None
+
+    def getProfile(self):
+        """ getProfile returns the statistics recorded since profiling was enabled
+
+        Returns:
+            { str method: { 'calls': int, 'wall': float, 'cpu': float, 'bases': int, 'bytes': int, 'peak': int } }:
+            The statistics of each method called, empty when profiling is off
+        """
+        return self.profiler.snapshot() if self.profiler is not None else {}
+
+    @contextmanager
+    def profile(self, trace_memory=False, hook=None):
+        """ profile scopes profiling to a with block, restoring the previous profiler (or none) afterwards
+
+            fs = FastaSeq()
+            with fs.profile() as profiler:
+                fs.buildDict(filename)
+                fs.getFileLongestORF()
+            print(profiler.snapshot())
+
+        Args:
+            trace_memory (bool): Trace the peak allocation of each call, see enableProfiling
+            hook (callable): Called after every call, see enableProfiling
+
+        Returns:
+            Profiler profiler: The profiler recording the block
+        """
+        previous = self.profiler
+        profiler = Profiler(trace_memory, [hook] if hook is not None else [])
+        self.profiler = profiler
+        try:
+            yield profiler
+        finally:
+            profiler.close()
+            self.profiler = previous
+
+    def _cached(self, seq_dict, call, compute):
+        """ _cached returns the stored result of call on seq_dict, computing and storing it when there is none. The
+        loaded file (seq_dict None or the instance dictionary) is identified by its path and version, any other
+        dictionary by a hash of its contents. """
+        if self.cache is None:
+            return compute()
+        if seq_dict is None or seq_dict is self.sequences and self.stamp is not None:
+            source, version = self.stamp
+        else:
+            source, version = contentHash(seq_dict), ''
+        result = self.cache.get(source, version, call)
+        if result is None:
+            result = compute()
+            self.cache.put(source, version, call, result)
+        return result
+
+    def _memoized(self, key, compute):
+        """ _memoized returns a copy of the in-memory result for key, (method, sequence, *args), computing and keeping it
+        when there is none. The sequence is keyed by its digest. Copies are returned so that callers cannot change the
+        kept result. """
+        if self.memo is None or not isinstance(key[1], str):
+            return compute()
+        key = (key[0], sequenceDigest(key[1])) + key[2:]
+        result = self.memo.get(key)
+        if result is None:
+            result = compute()
+            self.memo.put(key, result)
+        return {name: dict(val) if isinstance(val, dict) else val for name, val in result.items()}
+
+    def close(self):
+        """ close empties the instance dictionary and indexes, releasing the memory map of a lazily loaded file or store """
+        if isinstance(self.sequences, (IndexedFasta, PackedStore)):
+            self.sequences.close()
+        self.sequences = {}
+        self.index = {}
+        self.lengths = None
+        self.repeat_index = None
+        self.motif_index = None
+        self.stamp = None
+
+    @profiled()
     def numRecords(self):
-        """ numRecords() is a function to get the number of records in the class dictionary
+        """ numRecords() is a function to get the number of records in the instance dictionary
 
         Returns:
-            int num_records: the number of records in the class dictionary returned by len(dict)
+            int num_records: the number of records in the instance dictionary returned by len(dict)
         """
         return len(self.sequences)
 
-    @classmethod
+    @profiled()
     def getLength(self, name):
         """ getLength returns the length of a sequence associated with a name
 
@@ -48,20 +301,31 @@ class FastaSeq():
             name (str): The name of the dictionary key
 
         Returns:
-            int length: the length of the sequence associated with name in the class dictionary
+            int length: the length of the sequence associated with name in the instance dictionary
         """
+        if isinstance(self.sequences, (IndexedFasta, PackedStore)):
+            return self.sequences.getLength(name)
         return len(self.sequences[name])
 
-    @classmethod
+    def _lengthIndex(self):
+        """ _lengthIndex returns the length index built by buildDict, rebuilding it if the instance dictionary was filled
+        some other way """
+        if self.lengths is None or len(self.lengths) != len(self.sequences):
+            self.lengths = LengthIndex()
+            for name in self.sequences:
+                self.lengths.add(name, self.getLength(name))
+        return self.lengths
+
+    @profiled()
     def getAllLengths(self):
-        """ getAllLengths returns a list of the lengths of all sequences in the class dictionary
+        """ getAllLengths returns a list of the lengths of all sequences in the instance dictionary
 
         Returns:
             [ int lengths ]: a list of ints representing the lengths of all sequences
         """
-        return [len(x) for x in list(self.sequences.values())]
+        return list(self._lengthIndex().lengths)
 
-    @classmethod
+    @profiled()
     def getLongest(self):
         """ getLongest returns a dictionary with one key, the max length of sequences in the dictionary,
         and a value consisting of the list of names that have a sequence of that length
@@ -70,20 +334,9 @@ class FastaSeq():
             { int max_length: [ str names ] }: The maximum length of all sequences in the dictionary:
             A list of all names with a sequence of that length
         """
-        lengths = self.getAllLengths()
-        max_length = max(lengths)
-        num_max = lengths.count(max_length)
-        longest = {max_length: []}
-        counts = 0
-        for n in iter(self.sequences):
-            if len(self.sequences[n]) == max_length:
-                longest[max_length] += [n]
-                counts += 1
-                if counts == num_max:
-                    break
-        return longest
-
-    @classmethod
+        return self._lengthIndex().longest()
+
+    @profiled()
     def getShortest(self):
         """ getShortest gets the length of the shortest sequence and a list of all names with a sequence of that length
 
@@ -91,136 +344,218 @@ class FastaSeq():
             { int min_length: [ str names ] }: the length of the shortest sequence in the dictionary:
             a list of all names with sequences of that length
         """
-        lengths = self.getAllLengths()
-        min_length = min(lengths)
-        shortest = []
-        for n in iter(self.sequences):
-            if len(self.sequences[n]) == min_length:
-                shortest += [n]
+        return self._lengthIndex().shortest()
 
-        shortest = {min_length: shortest}
-        return shortest
+    @profiled()
+    def getTopLongest(self, num):
+        """ getTopLongest returns the num longest sequences, longest first and in dictionary order among equal lengths
+
+        Args:
+            num (int): How many sequences to return
 
-    @classmethod
+        Returns:
+            [ (str name, int length) ]: The names and lengths of the longest sequences
+        """
+        return self._lengthIndex().topLongest(num)
+
+    @profiled()
+    def getN50(self, fraction=0.5):
+        """ getN50 returns the N50 and L50 of the instance dictionary: the length of the shortest sequence among the
+        fewest longest sequences holding half of all bases, and how many sequences that takes. Another fraction gives
+        other Nx statistics, 0.9 for N90 and L90.
+
+        Args:
+            fraction (float): The share of the bases to cover, between 0 and 1
+
+        Returns:
+            (int n50, int l50): The length of the shortest sequence needed and the number of sequences needed
+        """
+        return self._lengthIndex().nx(fraction)
+
+    @profiled()
+    def getLengthPercentile(self, percent):
+        """ getLengthPercentile returns the sequence length below which percent of the sequences fall, interpolated
+        linearly between the two nearest lengths
+
+        Args:
+            percent (float): The percentile, between 0 and 100
+
+        Returns:
+            float length: The interpolated length
+        """
+        return self._lengthIndex().percentile(percent)
+
+    @profiled()
+    def getLengthHistogram(self, bins=10):
+        """ getLengthHistogram counts the sequences in bins of equal width spanning the shortest to the longest length
+
+        Args:
+            bins (int): The number of bins
+
+        Returns:
+            [ (float low, float high, int count) ]: The bounds of each bin and the number of sequences in it
+        """
+        return self._lengthIndex().histogram(bins)
+
+    @profiled()
     def getSeq(self, name):
-        return self.sequences[name]
+        """ getSeq returns the sequence associated with a name, unpacking it if the packed backend is in use
+
+        Args:
+            name (str): The name of the dictionary key
 
-    @classmethod
-    def getStopCodons(self, sequence):
+        Returns:
+            str sequence: the sequence associated with name in the instance dictionary
+        """
+        seq = self.sequences[name]
+        return str(seq) if isinstance(seq, PackedSeq) else seq
+
+    @profiled('sequence')
+    def getStopCodons(self, sequence, jobs=None):
         """ getStopCodons looks for the subsequences 'tga', 'tag', and 'taa' in sequence. When it finds one of these
         it locates which reading frame the codon is located in and stores the index in a list associated with that
-        reading frame through a dictionary. The reading frames are numbered 0-2 rather than 1-3.
+        reading frame through a dictionary. The reading frames are numbered 0-2 rather than 1-3. With jobs > 1 a
+        long sequence is cut into windows overlapping by 2 bases that are scanned in a pool of jobs processes.
 
         Args:
-            sequence (str): The sequence of nucleotides to search for stop codons
+            sequence (str or PackedSeq): The sequence of nucleotides to search for stop codons
+            jobs (int): The number of worker processes, None or 1 to run serially
 
         Returns:
             { int reading_frame: [ int index ]}: A dictionary with keys consisting of reading frame 0, 1, 2 and values
             consisting of lists of indices of stop codons on those reading frames.
         """
-        stop_codons = ['tga', 'tag', 'taa']
-        stops_dict = {x: [] for x in range(3)}
-        seq = sequence.lower()
-        for idx in range(len(seq)):             # iterate over each codon in the sequence
-            codon = seq[idx:idx+3]
-            if codon in stop_codons:
-                stops_dict[idx % 3] += [idx]    # idx % 3 gives the frame, add idx to the frame's list
-
-        return stops_dict
-
-    @classmethod
-    def getStartCodons(self, sequence):
+        if isinstance(sequence, PackedSeq):
+            return sequence.scanCodons()[1]
+        if useChunks(sequence, jobs):
+            return mergeFrames(mapChunks(findStops, sequence, 2, jobs))
+        return findStops(sequence)
+
+    @profiled('sequence')
+    def getStartCodons(self, sequence, jobs=None):
         """ getStartCodons looks for the subsequence 'atg' in sequence. When it finds this it locates which reading
         frame the codon is located in and stores the index in a list associated with that reading frame through a
-        dictionary. The reading frames are numbered 0-2 rather than 1-3.
+        dictionary. The reading frames are numbered 0-2 rather than 1-3. With jobs > 1 a long sequence is cut into
+        windows overlapping by 2 bases that are scanned in a pool of jobs processes.
 
         Args:
-            sequence (str): A sequence of nucleotides to search for start codons
+            sequence (str or PackedSeq): A sequence of nucleotides to search for start codons
+            jobs (int): The number of worker processes, None or 1 to run serially
 
         Returns:
             { int reading_frame: [ int index ]}: A dictionary with keys consisting of reading frame 0, 1, 2 and values
             consisting of lists of indices of start codons on those reading frames.
         """
-        starts_dict = {x: [] for x in range(3)}
-        seq = sequence.lower()
-        for idx in range(len(seq)):
-            codon = seq[idx:idx+3]
-            if codon == 'atg':
-                starts_dict[idx % 3] += [idx]
-
-        return starts_dict
-
-    @classmethod
-    def getLongestORF(self, sequence):
-        """ getLongestORF calls getStartCodons and getStopCodons and then computes the longest possible Open Reading
-        Frame by computing the difference between the first start codon and the last stop codon on each reading frame.
+        if isinstance(sequence, PackedSeq):
+            return sequence.scanCodons()[0]
+        if useChunks(sequence, jobs):
+            return mergeFrames(mapChunks(findStarts, sequence, 2, jobs))
+        return findStarts(sequence)
+
+    @profiled('sequence')
+    def getLongestORF(self, sequence, jobs=None):
+        """ getLongestORF finds the start and stop codons of sequence in a single scan and then computes the longest
+        possible Open Reading Frame by computing the difference between the first start codon and the last stop codon
+        on each reading frame. Packed sequences are scanned and paired with vectorized array operations instead.
+        With jobs > 1 a long sequence is cut into windows that are summarized in a pool of jobs processes and
+        stitched back together, so ORFs spanning several windows are still found.
         An Open Reading Frame must begin with a start codon and end with a stop codon on a reading frame.
 
         Args:
-            sequence (str): A string of nucleotides to search for Open Reading Frames.
+            sequence (str or PackedSeq): A string of nucleotides to search for Open Reading Frames.
+            jobs (int): The number of worker processes, None or 1 to run serially
 
         Returns:
             { 'length': int longest, 'index': int index}: A dictionary containing the length and index of the longest
             ORF in the sequence
         """
-        starts = self.getStartCodons(sequence)
-        stops = self.getStopCodons(sequence)
-        orf_dict = {}
-        for frame in range(3):
-            lngst = 0
-            lng_idx = -1
-            idx1 = 0
-            if stops[frame] != [] and starts[frame] != []:
-                for idx2 in range(len(stops[frame])):
-                    if idx1 < len(starts[frame]) and starts[frame][idx1] < stops[frame][idx2]:
-                        length = 3 + stops[frame][idx2] - starts[frame][idx1]
-                        if length > lngst:
-                            lngst = length
-                            lng_idx = starts[frame][idx1]
-                        while idx1 < len(starts[frame]) and starts[frame][idx1] < stops[frame][idx2]:
-                            idx1 += 1
-            orf_dict[frame] = {'length': lngst, 'index': lng_idx}
-        return orf_dict
-
-    @classmethod
-    def getFileLongestORF(self):
+        return self._memoized(('getLongestORF', sequence), lambda: self._longestORF(sequence, jobs))
+
+    def _longestORF(self, sequence, jobs):
+        """ _longestORF picks the ORF scan for getLongestORF: vectorized, chunked across workers or serial """
+        if not isinstance(sequence, PackedSeq) and useChunks(sequence, jobs):
+            return stitchORFs(mapChunks(summarizeORFs, sequence, 2, jobs))
+        return recordLongestORF(sequence)
+
+    @profiled('loaded')
+    def getFileLongestORF(self, jobs=None):
         """ getFileLongestORF calls getLongestORF for each sequence in the dictionary. It then stores the longest ORF
-        in each sequence in a new dictionary, orf_dict, with the key being the name from the class dictionary and the
+        in each sequence in a new dictionary, orf_dict, with the key being the name from the instance dictionary and the
         corresponding value being a length and index for the longest ORF in that name's sequence. The method also tracks
         the length and index of the longest ORF of all the sequences, as well as the name associated with that sequence.
         It then returns all of this to the caller using a dictionary with 'name', 'length', 'index', and 'data' keys.
-        The 'name', 'length' and 'index' keys all correspond to the longest ORF in the class dictionary. The 'data' key
-        corresponds to the dictionary of longest ORFs for each name and sequence in the class dictionary.
+        The 'name', 'length' and 'index' keys all correspond to the longest ORF in the instance dictionary. The 'data' key
+        corresponds to the dictionary of longest ORFs for each name and sequence in the instance dictionary.
+        With jobs > 1 the records are split into size-balanced batches that run in a pool of jobs processes; the
+        results are reduced in dictionary order, so they are identical to the serial ones. When caching is enabled
+        (see enableCache) the result is stored on disk and reused until the file changes.
+
+        Args:
+            jobs (int): The number of worker processes, None or 1 to run serially
 
         Returns:
             { 'name': str lgst_name, 'length': int longest, 'index': lgst_idx, 'data': { str name { 'length': int length,
             'index': int index} } }: A dictionary consisting of the name, length, and starting index of the longest ORF
-            in the class dictionary, as well as a separate dictionary containing the name, length and starting incex of
-            the longest ORF for each sequence in the class dictionary object
-        """
-        orf_dict = {}
-        ret_dict = {}
-        longest = [0, 0, 0]
-        lgst_name = ['', '', '']
-        lgst_idx = [0, 0, 0]
-        for name, seq in self.sequences.items():
-            result = self.getLongestORF(seq)
-            orf_dict[name] = result
-            for frame in range(3):
-                if result[frame]["length"] > longest[frame]:
-                    longest[frame] = result[frame]["length"]
-                    lgst_name[frame] = name
-                    lgst_idx[frame] = result[frame]["index"]
-                ret_dict[frame] = {"name": lgst_name[frame], "length": longest[frame], "position": lgst_idx[frame] + 1}
-        return ret_dict
-
-    @classmethod
-    def getRepeats(self, sequence, length):
-        """ getRepeats searches for repeat sequences of length in sequence
+            in the instance dictionary, as well as a separate dictionary containing the name, length and starting incex of
+            the longest ORF for each sequence in the instance dictionary object
+        """
+        return self._cached(self.sequences, ('getFileLongestORF',), lambda: self._fileLongestORF(jobs))
+
+    def _fileLongestORF(self, jobs):
+        """ _fileLongestORF runs getLongestORF over every record and reduces the results for getFileLongestORF """
+        if jobs and jobs > 1:
+            return reduceORFs(mapRecords(recordLongestORF, self.sequences, jobs))
+        return reduceORFs((name, self.getLongestORF(seq)) for name, seq in self.sequences.items())
+
+    def iterORFs(self, sequence, min_length=0, nested=False, strands='+-'):
+        """ iterORFs lists every ORF of sequence on the six reading frames lazily, scanning each strand once and
+        complementing the reverse strand a chunk at a time (see orfs.scanORFs). Unlike getLongestORF, which keeps one
+        ORF per forward frame, it yields each ORF as its stop codon is reached, so any number of them can be written
+        out without being held in memory.
 
         Args:
-            sequence (str): A sequence of nucleotides to search
+            sequence (str or PackedSeq): A string of nucleotides to search for Open Reading Frames
+            min_length (int): The shortest ORF to yield, in bases including the stop codon
+            nested (bool): Also yield the ORFs of every later in-frame start codon before the same stop codon
+            strands (str): The strands to scan, '+', '-' or '+-'
+
+        Returns:
+            generator of ORF: namedtuples of strand, frame, start, end and length, start and end being 0-based, end
+            exclusive, forward strand positions
+        """
+        return iterORFs(sequence, min_length, nested, strands)
+
+    def iterFileORFs(self, min_length=0, nested=False, strands='+-'):
+        """ iterFileORFs runs iterORFs over every record of the instance dictionary, in dictionary order. Lazily loaded
+        and packed store records are read a chunk at a time from their memory maps rather than decoded whole.
+
+        Args:
+            min_length, nested, strands: See iterORFs
+
+        Returns:
+            generator of (str name, ORF orf): Every ORF and the name of the record it was found in, as taken by
+            orfs.writeBed
+        """
+        indexed = isinstance(self.sequences, (IndexedFasta, PackedStore))
+        for name in self.sequences:
+            if indexed:
+                orfs = scanORFs(partial(self.sequences.fetch, name), self.getLength(name), min_length, nested, strands)
+            else:
+                orfs = iterORFs(self.sequences[name], min_length, nested, strands)
+            for orf in orfs:
+                yield name, orf
+
+    @profiled('sequence')
+    def getRepeats(self, sequence, length, jobs=None):
+        """ getRepeats searches for repeat sequences of length in sequence. Substrings are counted in a hash table,
+        long sequences as 2-bit packed integers (see kmers.countKmers). With jobs > 1 a long sequence is cut into
+        windows overlapping by length - 1 bases, each counting only the substrings that start inside it, in a pool
+        of jobs processes.
+
+        Args:
+            sequence (str or PackedSeq): A sequence of nucleotides to search
             length (int): The length of subsequences to search for
+            jobs (int): The number of worker processes, None or 1 to run serially
 
         Returns:
             { str substr: int repeats }: A dictionary consisting of keys substr and values repeats. The dictionary
@@ -228,16 +563,18 @@ class FastaSeq():
             times that substring has been repeated. Note that if a substring only appears once in the sequence it
             will have a value of 0 in the dictionary.
         """
-        repeats = {}
-        for idx in range(len(sequence)):
-            substr = sequence[idx:idx+length].lower()
-            if substr in list(repeats):
-                repeats[substr] += 1
-            elif len(substr) == length:
-                repeats[substr] = 1                 # We are counting incidents of the substring
-        return repeats
-
-    @classmethod
+        return self._memoized(('getRepeats', sequence, length), lambda: self._repeats(sequence, length, jobs))
+
+    def _repeats(self, sequence, length, jobs):
+        """ _repeats picks the k-mer count for getRepeats: chunked across workers or in one piece """
+        if length > 0 and useChunks(sequence, jobs):
+            totals = Counter()
+            for counts in mapChunks(partial(countWindow, length=length), sequence, length - 1, jobs):
+                totals.update(counts)
+            return dict(totals)
+        return countKmers(sequence, length)
+
+    @profiled()
     def getMostRepeats(self, rep_dict):
         """ getMostRepeats searches rep_dict for the most common repeat in the dictionary
 
@@ -249,6 +586,8 @@ class FastaSeq():
             most common string in rep_dict as key and the value being the same value
             associated with that key in rep_dict.
         """
+        if isinstance(rep_dict, KmerTable):
+            return rep_dict.mostCommon()
         most_common = ''
         most_reps = 0
         for key, val in rep_dict.items():
@@ -257,15 +596,21 @@ class FastaSeq():
                 most_common = key
         return {most_common: most_reps}
 
-    @classmethod
-    def getMultiSeqRepeats(self, seq_dict, length):
-        """ getMultiSeqRepeats repeatedly calls getRepeats for each sequence in seq_dict, searching for repeat
-        substrings of length. It then combines the dictionaries that getRepeats returns into one dictionary
-        containing the totals for all substrings of length found in each sequence in seq_dict
+    @profiled('dict')
+    def getMultiSeqRepeats(self, seq_dict, length, jobs=None, max_memory=None):
+        """ getMultiSeqRepeats counts the repeat substrings of length in each sequence in seq_dict and combines the
+        counts in bulk into one dictionary containing the totals for all substrings of length found in each sequence
+        in seq_dict (see kmers.countMultiKmers). With jobs > 1 size-balanced batches of sequences are counted in a
+        pool of jobs processes and the batch counts are merged in dictionary order, identical to the serial result.
+        When caching is enabled (see enableCache) the result is stored on disk and reused. With max_memory the
+        substrings are counted out of core through a temporary k-mer table (see getRepeatTable), so only the result
+        itself has to fit in memory.
 
         Args:
             seq_dict ({ str name: str sequence}): A dictionary of name: sequence pairs
             length (int): The length of subsequences to search for
+            jobs (int): The number of worker processes, None or 1 to run serially
+            max_memory (int): Bytes the counting may use, None to count in memory
 
         Returns:
             { str substr: int repeats }: A dictionary consisting of keys substr and values repeats. The dictionary
@@ -273,16 +618,179 @@ class FastaSeq():
             the number of times that substring has been repeated. Note that if a substring only appears once in all
             sequences it will have a value of 0 in the dictionary.
         """
-        reps_dict = {}
-        for seq in seq_dict.values():
-            tmp_dict = self.getRepeats(seq, length)
-            for key, val in tmp_dict.items():
-                if key in reps_dict:
-                    reps_dict[key] += val
-                else:
-                    reps_dict[key] = val
-        return reps_dict
+        return self._cached(seq_dict, ('getMultiSeqRepeats', length),
+                            lambda: self._multiSeqRepeats(seq_dict, length, jobs, max_memory))
+
+    def _multiSeqRepeats(self, seq_dict, length, jobs, max_memory):
+        """ _multiSeqRepeats counts the k-mers of seq_dict for getMultiSeqRepeats: out of core, in a process pool or
+        serially """
+        if max_memory is not None and length > 0:
+            with tempfile.TemporaryDirectory() as workdir:
+                table = self.getRepeatTable(seq_dict, length, os.path.join(workdir, 'repeats' + TABLE_SUFFIX),
+                                            max_memory, jobs)
+                counts = dict(table.iterCounts())
+                table.close()
+            return counts
+        if jobs and jobs > 1:
+            totals = Counter()
+            for counts in mapBatches(partial(countMultiKmers, length=length), seq_dict, jobs):
+                totals.update(counts)
+            return dict(totals)
+        return countMultiKmers(seq_dict.values(), length)
+
+    @profiled('dict')
+    def getRepeatTable(self, seq_dict, length, table_file, max_memory, jobs=None):
+        """ getRepeatTable counts the repeat substrings of length in seq_dict out of core, for sets of sequences whose
+        k-mers do not fit in memory. The substrings are hash-partitioned into bins on disk while the sequences
+        stream, each bin is counted on its own (in a pool of jobs processes with jobs > 1) and the counts are written
+        to table_file (see kmertable.countToTable). The table can be opened again later with kmertable.KmerTable.
+
+        Args:
+            seq_dict ({ str name: str sequence}): A dictionary of name: sequence pairs
+            length (int): The length of subsequences to search for, at least 1
+            table_file (str): The name of the table to write, such as kmertable.tablePath(filename)
+            max_memory (int): Bytes the counting may use, shared between the jobs
+            jobs (int): The number of worker processes, None or 1 to run serially
+
+        Returns:
+            KmerTable table: A read only { str substr: int repeats } mapping, iterated in the order of
+            getMultiSeqRepeats and answering getMostRepeats without loading the counts
+        """
+        bases = sum(recordSize(seq_dict, name) for name in seq_dict)
+        return countToTable(seq_dict.values(), length, table_file, max_memory, bases, jobs)
 
+    @profiled('dict')
+    def getTopRepeats(self, seq_dict, length, top=1, epsilon=0.001, verify=True, errors=False):
+        """ getTopRepeats finds the most frequent repeats of length in seq_dict in bounded memory. Instead of the full
+        dictionary that getMultiSeqRepeats builds, repeats are streamed into a Space-Saving summary holding about
+        1 / epsilon counters, and the candidates it keeps are then counted exactly (see topk.topRepeats).
 
-def main():
-    return
+        Args:
+            seq_dict ({ str name: str sequence}): A dictionary of name: sequence pairs
+            length (int): The length of subsequences to search for
+            top (int): How many repeats to return
+            epsilon (float): The error bound of the estimates, as a fraction of the number of subsequences
+            verify (bool): Count the candidates exactly in a second pass over seq_dict
+            errors (bool): Also return the error of each count and whether the top repeats are certain
+
+        Returns:
+            { str substr: int repeats }: The top repeats and their counts, most frequent first. With top=1 and verify
+            this is the same as getMostRepeats(getMultiSeqRepeats(seq_dict, length)) whenever the most common repeat
+            occurs more than epsilon times the number of subsequences; otherwise a RuntimeWarning says the repeats
+            may not be the top ones. With errors, the dictionary described in topk.topRepeats.
+        """
+        return topRepeats(seq_dict.values(), length, top, epsilon, verify, errors)
+
+    @profiled('loaded')
+    def getRepeatIndex(self):
+        """ getRepeatIndex builds a suffix array index over every sequence in the instance dictionary the first time it
+        is called after a file is loaded, and returns the same index afterwards. The index answers repeat counts,
+        the most frequent repeat and the repeat spectrum for any length n without rescanning the sequences.
+
+        Returns:
+            RepeatIndex index: The repeat index of the instance dictionary
+        """
+        if self.repeat_index is None:
+            self.repeat_index = RepeatIndex(self.sequences.values())
+        return self.repeat_index
+
+    @profiled('loaded')
+    def getMotifIndex(self, persist=False):
+        """ getMotifIndex builds a suffix array over every sequence in the instance dictionary the first time it is
+        called after a file is loaded, and returns the same index afterwards. It finds and counts any motif in
+        O(m log n) instead of a find loop over every record. With persist the index is saved next to the loaded file
+        as filename + '.pgsa' and read back from there, memory-mapped, while it is newer than the file (requires numpy).
+
+        Args:
+            persist (bool): read the index from, or write it to, the file next to the loaded one
+
+        Returns:
+            MotifIndex index: The motif index of the instance dictionary
+        """
+        if self.motif_index is None:
+            if persist and self.stamp is not None:
+                self.motif_index = loadMotifIndex(self.stamp[0], self.sequences.items())
+            else:
+                self.motif_index = MotifIndex.fromSequences(self.sequences.items())
+        elif persist and self.stamp is not None and not motifCurrent(self.stamp[0]):
+            self.motif_index.save(motifPath(self.stamp[0]))
+        return self.motif_index
+
+    @profiled()
+    def findMotif(self, motif):
+        """ findMotif finds every occurrence of motif, ignoring case, through the motif index (see getMotifIndex)
+
+        Args:
+            motif (str): The bases to search for
+
+        Returns:
+            [ (str name, int position) ]: The record and 0-based position of every occurrence, overlapping ones
+            included, in dictionary order and then by position
+        """
+        return self.getMotifIndex().find(motif)
+
+    @profiled()
+    def findMotifs(self, motifs):
+        """ findMotifs runs findMotif for a batch of motifs, searching them in sorted order so that each binary search
+        starts where the previous one began
+
+        Args:
+            motifs ([ str motif ]): The motifs to search for
+
+        Returns:
+            { str motif: [ (str name, int position) ] }: The occurrences of each motif
+        """
+        return self.getMotifIndex().findAll(motifs)
+
+    @profiled()
+    def countMotifs(self, motifs):
+        """ countMotifs counts the occurrences of a batch of motifs without listing them
+
+        Args:
+            motifs ([ str motif ]): The motifs to search for
+
+        Returns:
+            { str motif: int count }: The number of occurrences of each motif over all the records
+        """
+        return self.getMotifIndex().countAll(motifs)
+
+
+def main(argv=None):
+    """ main answers the question set of the README for a FASTA file in a single streaming pass (see
+    report.buildReport) and writes the report as JSON or TSV
+
+    Args:
+        argv ([ str ]): The command line arguments, defaults to sys.argv[1:]
+
+    Returns:
+        int status: 0 on success, 1 if the file could not be read
+    """
+    parser = argparse.ArgumentParser(prog='python -m source.sequences',
+                                     description="Report record count, length statistics, the longest ORF of each "
+                                                 "forward frame and repeat counts of a multi-FASTA file in one pass.")
+    parser.add_argument('fasta', help="the multi-FASTA file to report on")
+    parser.add_argument('-n', '--repeat-length', type=int, action='append', default=[], metavar='N',
+                        help="count repeats of length N, may be given several times")
+    parser.add_argument('-f', '--format', choices=('json', 'tsv'), default='json', help="the report format")
+    parser.add_argument('-o', '--output', help="write the report to this file instead of standard output")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="the number of worker processes")
+    parser.add_argument('--max-memory', type=parseSize, metavar='SIZE',
+                        help="memory for the repeat tables, such as 512M or 2G, past which the most frequent repeat "
+                             "is estimated with a bounded error instead of counted exactly")
+    args = parser.parse_args(argv)
+    try:
+        report = buildReport(args.fasta, args.repeat_length, args.jobs, args.max_memory)
+    except FileNotFoundError:
+        print(f"File {args.fasta} not found!")
+        return 1
+    text = formatJson(report) if args.format == 'json' else formatTsv(report)
+    if args.output is None:
+        sys.stdout.write(text)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+""" Compact binary sequence store: 2-bit packed records behind a header index, memory-mapped for instant loading """
+import struct
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+
+from source.compressed import openFasta
+from source.fasta import iterRecords
+from source.packed import ALPHABET, PackedSeq, np, requireNumpy, unpackCodes
+
+# The file starts with MAGIC, the format version, the number of records and where the index lies. The records follow,
+# each as its packed bases then its exceptions table (int64 run starts, int64 run lengths, the original characters),
+# every section padded to 8 bytes. The index comes last so the store can be written in one streaming pass: the
+# NUL separated record names, then one row of RECORD_FIELDS per record.
+MAGIC = b'PYGDSPK\x00'
+VERSION = 1
+PREAMBLE = struct.Struct('<8sIIQQ')            # magic, version, records, names offset, names size
+RECORD_FIELDS = ('length', 'offset', 'exceptions', 'exc_offset')
+STORE_SUFFIX = '.pgds'
+
+StoreRecord = namedtuple('StoreRecord', ('name',) + RECORD_FIELDS)
+
+
+def storePath(filename):
+    """ storePath returns the name of the packed store belonging to a FASTA file """
+    return filename + STORE_SUFFIX
+
+
+def _pad(file):
+    """ _pad writes zeros up to the next multiple of 8 bytes and returns the new position """
+    position = file.tell()
+    file.write(b'\x00' * (-position % 8))
+    return position + (-position % 8)
+
+
+def writeStore(records, store_file):
+    """ writeStore writes (name, sequence) pairs to a packed store, keeping only one record in memory at a time
+
+    Args:
+        records ([ (str name, str or PackedSeq sequence) ]): The records to store, in order
+        store_file (str): The name of the store to write
+
+    Returns:
+        int num_records: The number of records written
+    """
+    requireNumpy()
+    names = []
+    rows = []
+    with open(store_file, 'wb') as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, 0, 0, 0))
+        for name, seq in records:
+            packed = seq if isinstance(seq, PackedSeq) else PackedSeq.fromString(seq)
+            offset = _pad(file)
+            file.write(packed.bases.tobytes())
+            exc_offset = _pad(file)
+            file.write(packed.exc_starts.astype('<i8').tobytes())
+            file.write(packed.exc_lengths.astype('<i8').tobytes())
+            file.write(packed.exc_chars)
+            names.append(name)
+            rows.append((packed.length, offset, len(packed.exc_starts), exc_offset))
+        names_offset = _pad(file)
+        blob = '\x00'.join(names).encode('utf-8')
+        file.write(blob)
+        _pad(file)
+        file.write(np.array(rows, dtype='<u8').reshape(-1, len(RECORD_FIELDS)).tobytes())
+        file.seek(0)
+        file.write(PREAMBLE.pack(MAGIC, VERSION, len(names), names_offset, len(blob)))
+    return len(names)
+
+
+def convertFasta(filename, store_file=None):
+    """ convertFasta converts a FASTA file into a packed store in one streaming pass. Bases outside A, C, G and T are
+    kept through the exceptions table; soft-masked (lowercase) bases are stored as uppercase.
+
+    Args:
+        filename (str): The name of the fasta file to convert
+        store_file (str): The name of the store to write, defaults to filename + '.pgds'
+
+    Returns:
+        str store_file: The name of the store written
+    """
+    store_file = store_file or storePath(filename)
+    with openFasta(filename) as file:
+        writeStore(((rec.name, seq) for rec, seq, _ in iterRecords(file)), store_file)
+    return store_file
+
+
+class PackedStore(Mapping):
+    """ A read only { name: PackedSeq } mapping over a memory-mapped packed store. Opening a store only reads its
+    index; the packed bases of a record are views into the map, paged in when the record is used. """
+
+    def __init__(self, filename):
+        requireNumpy()
+        self.filename = filename
+        self._data = np.memmap(filename, dtype=np.uint8, mode='r')
+        if len(self._data) < PREAMBLE.size:
+            raise ValueError(f"{filename} is not a packed sequence store")
+        magic, version, count, names_offset, names_size = PREAMBLE.unpack(self._data[:PREAMBLE.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a packed sequence store of version {VERSION}")
+        names = self._data[names_offset:names_offset + names_size].tobytes().decode('utf-8').split('\x00')
+        table_offset = names_offset + names_size + (-(names_offset + names_size) % 8)
+        table = self._data[table_offset:table_offset + count * 8 * len(RECORD_FIELDS)].view('<u8')
+        rows = table.reshape(-1, len(RECORD_FIELDS)).tolist()
+        self.index = {name: StoreRecord(name, *row) for name, row in zip(names if count else [], rows)}
+
+    def __getitem__(self, name):
+        rec = self.index[name]
+        bases = self._data[rec.offset:rec.offset + (rec.length + 3) // 4]
+        exc_starts, exc_lengths, exc_chars = self._exceptions(rec)
+        return PackedSeq(bases, rec.length, exc_starts, exc_lengths, exc_chars)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def _exceptions(self, rec):
+        """ _exceptions returns the run starts, run lengths and original characters of a record's ambiguous bases """
+        middle = rec.exc_offset + 8 * rec.exceptions
+        exc_starts = self._data[rec.exc_offset:middle].view('<i8')
+        exc_lengths = self._data[middle:middle + 8 * rec.exceptions].view('<i8')
+        chars = middle + 8 * rec.exceptions
+        return exc_starts, exc_lengths, self._data[chars:chars + int(exc_lengths.sum())].tobytes()
+
+    def getLength(self, name):
+        """ getLength returns the length of a record straight from the index """
+        return self.index[name].length
+
+    def fetch(self, name, start=0, end=None):
+        """ fetch decodes the bases in [start, end) of a record, unpacking only the bytes that hold them
+
+        Args:
+            name (str): The name of the record
+            start (int): The index of the first base to return
+            end (int): One past the index of the last base to return, defaults to the end of the record
+
+        Returns:
+            str sequence: The requested bases, in uppercase
+        """
+        rec = self.index[name]
+        end = rec.length if end is None else min(end, rec.length)
+        if start >= end:
+            return ''
+        first = rec.offset + start // 4
+        codes = unpackCodes(self._data[first:rec.offset + (end + 3) // 4], end - start + start % 4)[start % 4:]
+        raw = np.frombuffer(ALPHABET, dtype=np.uint8)[codes]
+        exc_starts, exc_lengths, exc_chars = self._exceptions(rec)
+        position = 0
+        for run_start, run_length in zip(exc_starts.tolist(), exc_lengths.tolist()):
+            low, high = max(run_start, start), min(run_start + run_length, end)
+            if low < high:
+                skip = position + low - run_start
+                raw[low - start:high - start] = np.frombuffer(exc_chars[skip:skip + high - low], dtype=np.uint8)
+            position += run_length
+        return raw.tobytes().decode('latin-1')
+
+    def close(self):
+        """ close drops the memory map; it is unmapped once no record still refers to it """
+        self._data = None
+        self.index = {}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m source.store FASTA [STORE]")
+    print(convertFasta(*sys.argv[1:]))
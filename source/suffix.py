@@ -0,0 +1,204 @@
+""" Generalized suffix array with an LCP array, answering repeat queries for any length from one index """
+from collections import Counter
+
+from source.packed import np
+
+# Terminates every sequence in the concatenated text. It sorts before every base and is never counted as matching,
+# so no repeat runs from one sequence into the next.
+SEPARATOR = '\x00'
+
+
+def suffixArray(text):
+    """ suffixArray sorts the suffixes of text by prefix doubling, with numpy when it is installed
+
+    Args:
+        text (str): The text to index
+
+    Returns:
+        [ int position ]: The start of every suffix of text in sorted order (a numpy array when numpy is installed)
+    """
+    if np is not None:
+        return _suffixArrayNumpy(np.frombuffer(text.encode('latin-1'), dtype=np.uint8))
+    return _suffixArrayList(text)
+
+
+def _suffixArrayNumpy(codes):
+    """ _suffixArrayNumpy ranks suffixes by their first 2k characters in each round, sorting on one combined key """
+    size = len(codes)
+    rank = np.unique(codes, return_inverse=True)[1].astype(np.int64)     # dense ranks keep the combined key exact
+    sa = np.argsort(rank, kind='stable')
+    span = 1
+    while size > 1:
+        second = np.zeros(size, dtype=np.int64)
+        second[:size - span] = rank[span:] + 1
+        key = rank * (size + 2) + second
+        sa = np.argsort(key, kind='stable')
+        ordered = key[sa]
+        rank = np.empty(size, dtype=np.int64)
+        rank[sa] = np.concatenate(([0], np.cumsum(ordered[1:] != ordered[:-1])))
+        if rank[sa[-1]] == size - 1 or span >= size:
+            break
+        span <<= 1
+    return sa
+
+
+def _suffixArrayList(text):
+    """ _suffixArrayList is the pure Python prefix doubling fallback """
+    size = len(text)
+    rank = [ord(c) for c in text]
+    sa = list(range(size))
+    span = 1
+    while size > 1:
+        keys = [(rank[idx], rank[idx + span] if idx + span < size else -1) for idx in range(size)]
+        sa.sort(key=keys.__getitem__)
+        rank = [0] * size
+        for idx in range(1, size):
+            rank[sa[idx]] = rank[sa[idx - 1]] + (keys[sa[idx - 1]] != keys[sa[idx]])
+        if rank[sa[-1]] == size - 1 or span >= size:
+            break
+        span <<= 1
+    return sa
+
+
+def lcpArray(text, sa):
+    """ lcpArray computes the longest common prefix of every suffix and the one before it in sa with Kasai's
+    algorithm. Prefixes stop at SEPARATOR, so they never span two sequences.
+
+    Args:
+        text (str): The indexed text
+        sa ([ int position ]): The suffix array of text
+
+    Returns:
+        [ int lcp ]: lcp[i] is the common prefix length of suffixes sa[i - 1] and sa[i], with lcp[0] = 0
+    """
+    size = len(text)
+    sa = [int(x) for x in sa]
+    rank = [0] * size
+    for idx, pos in enumerate(sa):
+        rank[pos] = idx
+    lcp = [0] * size
+    common = 0
+    for pos in range(size):
+        if rank[pos] == 0:
+            common = 0
+            continue
+        prev = sa[rank[pos] - 1]
+        while pos + common < size and prev + common < size and text[pos + common] == text[prev + common] \
+                and text[pos + common] != SEPARATOR:
+            common += 1
+        lcp[rank[pos]] = common
+        if common:
+            common -= 1
+    return lcp
+
+
+class RepeatIndex():
+    """ A suffix array and LCP array built once over the lowercased sequences. The occurrences of any k-mer are a run
+    of adjacent suffixes whose LCP is at least k, so the repeats of every length can be read off the same arrays
+    without rescanning the sequences. """
+
+    def __init__(self, sequences):
+        self.text = ''.join(str(seq).lower() + SEPARATOR for seq in sequences)
+        self.sa = suffixArray(self.text)
+        self.lcp = lcpArray(self.text, self.sa)
+        ends = [0] * len(self.text)                     # distance from each position to the next separator
+        remaining = 0
+        for pos in range(len(self.text) - 1, -1, -1):
+            remaining = 0 if self.text[pos] == SEPARATOR else remaining + 1
+            ends[pos] = remaining
+        if np is not None:
+            self.lcp = np.asarray(self.lcp, dtype=np.int64)
+            self.room = np.asarray(ends, dtype=np.int64)[self.sa]
+            self.sa = np.asarray(self.sa, dtype=np.int64)
+        else:
+            self.room = [ends[pos] for pos in self.sa]
+
+    def _runs(self, length):
+        """ _runs finds the run of suffixes holding every k-mer of length
+
+        Returns:
+            ([ int first ], [ int count ]): The first position and the number of occurrences of each distinct k-mer,
+            in suffix array order
+        """
+        if length < 1:
+            raise ValueError("Repeat length must be at least 1")
+        if np is not None:
+            return self._runsNumpy(length)
+        firsts, counts = [], []
+        for idx, pos in enumerate(self.sa):
+            if self.room[idx] < length:
+                continue
+            if counts and self.lcp[idx] >= length:
+                firsts[-1] = min(firsts[-1], pos)
+                counts[-1] += 1
+            else:
+                firsts.append(pos)
+                counts.append(1)
+        return firsts, counts
+
+    def _runsNumpy(self, length):
+        """ _runsNumpy is _runs with the runs split and reduced by array operations """
+        valid = self.room >= length
+        group = np.cumsum(self.lcp < length)[valid]
+        if len(group) == 0:
+            return [], []
+        starts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+        firsts = np.minimum.reduceat(self.sa[valid], starts)
+        counts = np.diff(np.append(starts, len(group)))
+        return firsts.tolist(), counts.tolist()
+
+    def getRepeats(self, length):
+        """ getRepeats returns the same { substr: count } as getMultiSeqRepeats over the indexed sequences
+
+        Args:
+            length (int): The length of subsequences to count
+
+        Returns:
+            { str substr: int repeats }: Every lowercased substring of length, in order of first occurrence, and the
+            number of times it occurs in all the sequences
+        """
+        return {self.text[first:first + length]: count for first, count in sorted(zip(*self._runs(length)))}
+
+    def getMostRepeats(self, length):
+        """ getMostRepeats returns the most frequent substring of length, breaking ties by first occurrence like
+        getMostRepeats
+
+        Args:
+            length (int): The length of subsequences to search
+
+        Returns:
+            { str most_common: int most_reps }: The most common substring and the number of times it occurs
+        """
+        firsts, counts = self._runs(length)
+        if not counts:
+            return {'': 0}
+        most_reps = max(counts)
+        first = min(first for first, count in zip(firsts, counts) if count == most_reps)
+        return {self.text[first:first + length]: most_reps}
+
+    def numRepeats(self, length):
+        """ numRepeats returns how many distinct substrings of length occur more than once """
+        return sum(1 for count in self._runs(length)[1] if count > 1)
+
+    def getSpectrum(self, length):
+        """ getSpectrum returns the repeat spectrum of length
+
+        Args:
+            length (int): The length of subsequences to count
+
+        Returns:
+            { int occurrences: int substrings }: For each number of occurrences, how many distinct substrings of
+            length occur that many times
+        """
+        return dict(sorted(Counter(self._runs(length)[1]).items()))
+
+    def getSpectra(self, lengths):
+        """ getSpectra returns the repeat spectrum of every length in lengths, for example range(3, 31)
+
+        Args:
+            lengths ([ int length ]): The lengths of subsequences to count
+
+        Returns:
+            { int length: { int occurrences: int substrings } }: The spectrum of each length
+        """
+        return {length: self.getSpectrum(length) for length in lengths}
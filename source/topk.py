@@ -0,0 +1,171 @@
+""" Bounded-memory top-k repeat tracking with the Space-Saving heavy hitters algorithm """
+import heapq
+import math
+import warnings
+from collections import Counter
+
+# Windows counted exactly before they are folded into the summary as weighted updates
+CHUNK_SIZE = 1 << 16
+
+
+class SpaceSaving():
+    """ Space-Saving keeps at most capacity counters. A new key that finds the summary full takes over the counter
+    with the smallest count, inheriting that count as its error. Every estimate overcounts its key by at most its
+    error, which never exceeds N / capacity after N updates, and every key occurring more than N / capacity times is
+    guaranteed to hold a counter. """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("Space-Saving needs at least one counter")
+        self.capacity = capacity
+        self.counters = {}                      # key: [count, error]
+        self.heap = []                          # (count, key), lazily refreshed when counts grow
+        self.total = 0
+
+    def update(self, key, weight=1):
+        """ update adds weight occurrences of key """
+        self.total += weight
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0]
+            heapq.heappush(self.heap, (weight, key))
+            return
+        floor, victim = self._popMin()
+        del self.counters[victim]
+        self.counters[key] = [floor + weight, floor]
+        heapq.heappush(self.heap, (floor + weight, key))
+
+    def _popMin(self):
+        """ _popMin removes and returns the (count, key) of the smallest counter, skipping stale heap entries """
+        while True:
+            count, key = heapq.heappop(self.heap)
+            current = self.counters[key][0]
+            if current == count:
+                return count, key
+            heapq.heappush(self.heap, (current, key))
+
+    @property
+    def bound(self):
+        """ bound is the largest possible overcount of any estimate, N / capacity """
+        return self.total / self.capacity
+
+    def top(self, num):
+        """ top returns the num keys with the largest estimated counts
+
+        Args:
+            num (int): How many keys to return
+
+        Returns:
+            [ (str key, int count, int error) ]: The keys, their estimated counts and the most each count can be over
+            the true count, largest first
+        """
+        best = heapq.nlargest(num, self.counters.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in best]
+
+
+def _windows(sequence, length):
+    """ _windows yields the lowercased windows of length of a sequence in chunks, each counted exactly """
+    seq = str(sequence)
+    last = len(seq) - length + 1
+    for start in range(0, max(last, 0), CHUNK_SIZE):
+        chunk = seq[start:min(start + CHUNK_SIZE, last) + length - 1].lower()
+        yield Counter(chunk[idx:idx+length] for idx in range(len(chunk) - length + 1))
+
+
+def streamTopRepeats(sequences, length, capacity):
+    """ streamTopRepeats feeds every k-mer of length into a Space-Saving summary with a fixed number of counters
+
+    Args:
+        sequences ([ str or PackedSeq ]): The sequences of nucleotides to search
+        length (int): The length of subsequences to count
+        capacity (int): The number of counters to keep
+
+    Returns:
+        SpaceSaving summary: The summary of all the k-mers
+    """
+    if length < 1:
+        raise ValueError("Repeat length must be at least 1")
+    summary = SpaceSaving(capacity)
+    for seq in sequences:
+        for counts in _windows(seq, length):
+            for key, weight in counts.items():
+                summary.update(key, weight)
+    return summary
+
+
+def verifyCounts(sequences, length, candidates):
+    """ verifyCounts rescans the sequences counting only the candidate k-mers, so memory stays bounded by the number
+    of candidates
+
+    Args:
+        sequences ([ str or PackedSeq ]): The sequences of nucleotides to search
+        length (int): The length of subsequences to count
+        candidates ([ str kmer ]): The lowercased k-mers to count
+
+    Returns:
+        { str substr: int repeats }: The exact count of every candidate that occurs, in order of first occurrence
+    """
+    wanted = set(candidates)
+    exact = {}
+    for seq in sequences:
+        for counts in _windows(seq, length):
+            for key, count in counts.items():
+                if key in wanted:
+                    exact[key] = exact.get(key, 0) + count
+    return exact
+
+
+def _floor(summary):
+    """ _floor returns the most times a k-mer without a counter can occur: the smallest count once the summary is
+    full, 0 while every k-mer seen still has its own counter """
+    if len(summary.counters) < summary.capacity:
+        return 0
+    return min(count for count, _ in summary.counters.values())
+
+
+def topRepeats(sequences, length, top=1, epsilon=0.001, verify=True, errors=False):
+    """ topRepeats finds the top most frequent k-mers of length in bounded memory. A Space-Saving summary of
+    ceil(1 / epsilon) counters (at least 2 * top) is built in one pass, so every estimate is within epsilon * N of the
+    true count for N k-mers. With verify the candidates are counted exactly in a second pass. The k-mers returned are
+    only certain to be the top ones when their (lowest possible) counts are above the count any k-mer left out could
+    have; when that guarantee fails a RuntimeWarning is issued, unless errors asks for it to be returned instead.
+
+    Args:
+        sequences ([ str or PackedSeq ]): The sequences of nucleotides to search, iterated once or twice
+        length (int): The length of subsequences to count
+        top (int): How many k-mers to return
+        epsilon (float): The error bound as a fraction of the number of k-mers
+        verify (bool): Replace the estimates with exact counts from a second pass over the candidates
+        errors (bool): Return the error of every count and whether the guarantee holds along with the k-mers
+
+    Returns:
+        { str substr: int repeats }: The top k-mers and their (estimated or exact) counts, most frequent first. With
+        errors, { 'repeats': { str substr: int repeats }, 'errors': { str substr: int error }, 'floor': int,
+        'guaranteed': bool }: the k-mers, the most each count can be over the true one (0 once verified), the most
+        times a k-mer left out can occur, and whether the k-mers returned are certainly the top ones
+    """
+    capacity = max(math.ceil(1 / epsilon), 2 * top)
+    summary = streamTopRepeats(sequences, length, capacity)
+    floor = _floor(summary)
+    if verify:
+        exact = verifyCounts(sequences, length, summary.counters)
+        ranked = sorted(exact.items(), key=lambda item: -item[1])
+        repeats = dict(ranked[:top])
+        error = dict.fromkeys(repeats, 0)
+        ceiling = floor
+    else:
+        ranked = summary.top(top + 1)
+        repeats = {key: count for key, count, _ in ranked[:top]}
+        error = {key: err for key, _, err in ranked[:top]}
+        ceiling = max([floor] + [count for _, count, _ in ranked[top:]])
+    lowest = min((count - error[key] for key, count in repeats.items()), default=0)
+    guaranteed = ceiling == 0 or lowest > ceiling
+    if errors:
+        return {'repeats': repeats, 'errors': error, 'floor': floor, 'guaranteed': guaranteed}
+    if not guaranteed:
+        warnings.warn(f"The top {top} repeats of length {length} are uncertain: k-mers outside the summary may occur "
+                      f"up to {ceiling} times; lower epsilon", RuntimeWarning, stacklevel=2)
+    return repeats
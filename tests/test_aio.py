@@ -0,0 +1,112 @@
+"""
+Test Cases for per-instance stores and the asyncio API
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from source import aio, sequences
+
+
+class TestAio(TestCase):
+    """ Tests for aio.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+    OTHER = 'dna2.fasta'
+
+    def setUp(self):
+        """ Load both example files in separate instances """
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+        self.other = sequences.FastaSeq()
+        self.other.buildDict(self.OTHER)
+
+    def tearDown(self):
+        """ Empty both instances """
+        self.fs.close()
+        self.other.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_independent_instances(self):
+        """ It should keep each instance's file when another one loads or closes """
+        names = list(self.fs.sequences)
+        self.assertNotEqual(names, list(self.other.sequences))
+        self.other.close()
+        self.assertEqual(list(self.fs.sequences), names)
+        self.assertEqual(self.other.numRecords(), 0)
+
+    def test_threads(self):
+        """ It should load and analyze files from several threads at once """
+        expected = {name: sequences.FastaSeq() for name in (self.FILENAME, self.OTHER)}
+        for name, fs in expected.items():
+            fs.buildDict(name)
+        results = {}
+
+        def run(filename):
+            fs = sequences.FastaSeq()
+            fs.buildDict(filename)
+            results[filename] = (fs.getFileLongestORF(), fs.getLongest())
+        threads = [threading.Thread(target=run, args=(name,)) for name in expected for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name, fs in expected.items():
+            self.assertEqual(results[name], (fs.getFileLongestORF(), fs.getLongest()))
+
+    def test_async_matches(self):
+        """ It should give the same answers as the synchronous methods, for several files at once """
+        async def analyze(pool, filename):
+            afs = aio.AsyncFastaSeq(pool)
+            await afs.buildDict(filename)
+            try:
+                return (await afs.getFileLongestORF(), await afs.getMultiSeqRepeats(afs.sequences, 5),
+                        afs.numRecords(), await afs.getLongestORF(next(iter(afs.sequences.values()))))
+            finally:
+                await afs.close()
+
+        async def main():
+            async with aio.AnalysisPool(jobs=2, max_pending=1) as pool:
+                return await asyncio.gather(analyze(pool, self.FILENAME), analyze(pool, self.OTHER))
+        for fs, result in zip((self.fs, self.other), asyncio.run(main())):
+            self.assertEqual(result[0], fs.getFileLongestORF())
+            self.assertEqual(result[1], fs.getMultiSeqRepeats(fs.sequences, 5))
+            self.assertEqual(result[2], fs.numRecords())
+            self.assertEqual(result[3], fs.getLongestORF(next(iter(fs.sequences.values()))))
+
+    def test_async_lazy(self):
+        """ It should send lazily loaded records to workers through the index """
+        async def main(fasta):
+            async with aio.AnalysisPool(jobs=1) as pool:
+                afs = aio.AsyncFastaSeq(pool)
+                await afs.buildDict(fasta, lazy=True)
+                try:
+                    return await afs.getFileLongestORF(), await afs.getRepeats(afs.getSeq(next(iter(afs.sequences))), 3)
+                finally:
+                    await afs.close()
+        with tempfile.TemporaryDirectory() as tmp:
+            longest, repeats = asyncio.run(main(shutil.copy(self.FILENAME, tmp)))
+        self.assertEqual(longest, self.fs.getFileLongestORF())
+        self.assertEqual(repeats, self.fs.getRepeats(next(iter(self.fs.sequences.values())), 3))
+
+    def test_async_cache(self):
+        """ It should load through the pool's threads with the result cache enabled """
+        async def main(cache_file):
+            async with aio.AnalysisPool(jobs=1) as pool:
+                afs = aio.AsyncFastaSeq(pool)
+                afs.enableCache(cache_file)
+                await afs.buildDict(self.FILENAME)
+                await afs.buildDict(self.FILENAME)
+                try:
+                    return list(afs.sequences), afs.cache.size()
+                finally:
+                    await afs.close()
+                    afs.disableCache()
+        with tempfile.TemporaryDirectory() as tmp:
+            names, size = asyncio.run(main(os.path.join(tmp, 'cache.sqlite')))
+        self.assertEqual(names, list(self.fs.sequences))
+        self.assertGreater(size, 0)
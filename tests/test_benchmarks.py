@@ -0,0 +1,64 @@
+"""
+Test Cases for the benchmark suite
+"""
+import os
+import tempfile
+from collections import Counter
+from unittest import TestCase
+from benchmarks import bench, synthetic
+
+
+class TestBenchmarks(TestCase):
+    """ Tests for benchmarks/ """
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_deterministic(self):
+        """ It should generate the same records for the same seed and different ones for another """
+        first = list(synthetic.generateRecords(3, 500, seed=4))
+        self.assertEqual(first, list(synthetic.generateRecords(3, 500, seed=4)))
+        self.assertNotEqual(first, list(synthetic.generateRecords(3, 500, seed=5)))
+        self.assertEqual([len(seq) for _, seq in first], [500] * 3)
+
+    def test_gc_content(self):
+        """ It should follow the requested GC content """
+        for gc in (0.2, 0.5, 0.8):
+            (_, seq), = synthetic.generateRecords(1, 20000, gc=gc)
+            bases = Counter(seq)
+            self.assertAlmostEqual((bases['G'] + bases['C']) / len(seq), gc, delta=0.03)
+        self.assertRaises(ValueError, synthetic.baseWeights, 1.5)
+
+    def test_repeat_density(self):
+        """ It should make denser repeats give more frequent 12-mers """
+        def most(density):
+            (_, seq), = synthetic.generateRecords(1, 20000, repeat_density=density)
+            return Counter(seq[idx:idx + 12] for idx in range(len(seq) - 11)).most_common(1)[0][1]
+        self.assertGreater(most(0.5), most(0.0))
+
+    def test_suite_and_gates(self):
+        """ It should measure every case and flag slowdowns past the threshold """
+        results = bench.runSuite(sizes=[300, 600], records=2, repeat=1, cases=['buildDict', 'getRepeats'])
+        self.assertEqual(set(results), {'buildDict', 'getRepeats'})
+        self.assertEqual(set(results['getRepeats']), {'300', '600'})
+        self.assertEqual(len(bench.scaling(results)['buildDict']), 1)
+        self.assertEqual(bench.compare(results, results), [])
+        slow = {'getRepeats': {'300': {'seconds': 1.0, 'bases_per_second': 300.0, 'peak_bytes': 10}}}
+        fast = {'getRepeats': {'300': {'seconds': 0.5, 'bases_per_second': 600.0, 'peak_bytes': 10}}}
+        self.assertEqual(bench.compare(slow, fast), [('getRepeats', '300', 'seconds', 0.5, 1.0)])
+        self.assertEqual(bench.compare(fast, slow), [])
+
+    def test_parse_length(self):
+        """ It should read lengths in powers of 1000 """
+        self.assertEqual(bench.parseLength('1kb'), 1000)
+        self.assertEqual(bench.parseLength('100M'), 100000000)
+
+    def test_missing_baseline(self):
+        """ It should fail without a baseline and gate against the one it saves """
+        with tempfile.TemporaryDirectory() as tmp:
+            args = ['--sizes', '300', '--records', '1', '--repeat', '1', '--cases', 'getRepeats',
+                    '--baseline', os.path.join(tmp, 'baseline.json')]
+            self.assertEqual(bench.main(args), 2)
+            self.assertEqual(bench.main(args + ['--save-baseline']), 0)
+            self.assertEqual(bench.main(args + ['--threshold', '1000']), 0)
@@ -0,0 +1,109 @@
+"""
+Test Cases for the result cache
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from source import cache, sequences
+
+
+class TestCache(TestCase):
+    """ Tests for cache.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Copy the fixture and open a cache in a scratch directory """
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'dna.fasta')
+        shutil.copy(self.FILENAME, self.filename)
+        self.fs = sequences.FastaSeq()
+        self.fs.enableCache(os.path.join(self.tmpdir, 'results.sqlite'))
+
+    def tearDown(self):
+        """ Close the cache and remove the scratch directory """
+        self.fs.disableCache()
+        self.fs.close()
+        shutil.rmtree(self.tmpdir)
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_cached_results(self):
+        """ It should return stored results instead of recomputing them """
+        self.fs.buildDict(self.filename)
+        orfs = self.fs.getFileLongestORF()
+        repeats = self.fs.getMultiSeqRepeats(self.fs.sequences, 3)
+        source, version = self.fs.stamp
+        self.fs.cache.put(source, version, ('getFileLongestORF',), 'stored')
+        self.fs.buildDict(self.filename)
+        self.assertEqual('stored', self.fs.getFileLongestORF())
+        self.assertEqual(list(repeats.items()), list(self.fs.getMultiSeqRepeats(self.fs.sequences, 3).items()))
+        self.fs.disableCache()
+        self.assertEqual(orfs, self.fs.getFileLongestORF())
+
+    def test_invalidation(self):
+        """ It should drop the results of a file once it changes """
+        self.fs.buildDict(self.filename)
+        self.fs.getFileLongestORF()
+        with open(self.filename, 'a') as file:
+            file.write(">extra\nATGAAATAG\n")
+        os.utime(self.filename, ns=(0, os.stat(self.filename).st_mtime_ns + 10 ** 9))
+        self.fs.buildDict(self.filename)
+        self.assertIn("extra", self.fs.sequences)
+        source, version = self.fs.stamp
+        self.assertIsNone(self.fs.cache.get(source, version, ('getFileLongestORF',)))
+        self.fs.getFileLongestORF()
+        rows = self.fs.cache.db.execute("SELECT DISTINCT version FROM results WHERE source = ?", (source,)).fetchall()
+        self.assertEqual([(version,)], rows)
+
+    def test_content_hash(self):
+        """ It should key dictionaries that are not the loaded file by their contents """
+        test_dict = {"Alice": 'ACACAGGGACACA'}
+        self.assertEqual(4, self.fs.getMultiSeqRepeats(test_dict, 3)['aca'])
+        self.fs.cache.put(cache.contentHash(test_dict), '', ('getMultiSeqRepeats', 3), {'aca': 99})
+        self.assertEqual({'aca': 99}, self.fs.getMultiSeqRepeats(test_dict, 3))
+        self.assertEqual(4, self.fs.getMultiSeqRepeats({"Bob": 'ACACAGGGACACA'}, 3)['aca'])
+
+    def test_lru_eviction(self):
+        """ It should evict the least recently used results past max_bytes """
+        results = cache.ResultCache(os.path.join(self.tmpdir, 'small.sqlite'), max_bytes=2500)
+        for idx in range(4):
+            results.put(f"src{idx}", '', ('call',), 'x' * 1000)
+            results.get("src0", '', ('call',))
+        self.assertLessEqual(results.size(), 2500)
+        self.assertIsNotNone(results.get("src0", '', ('call',)))
+        self.assertIsNone(results.get("src1", '', ('call',)))
+        results.close()
+
+    def test_memo(self):
+        """ It should keep per-sequence results in memory and hand out copies """
+        seq = 'ATGAAATAGCATGCCCCCCTGA'
+        first = self.fs.getLongestORF(seq)
+        first[0]['length'] = -1
+        self.assertEqual(9, self.fs.getLongestORF(seq)[0]['length'])
+        self.assertEqual(1, len(self.fs.memo.entries))
+        self.fs.getRepeats(seq, 3)
+        self.fs.getRepeats(seq, 3)
+        self.assertEqual(2, len(self.fs.memo.entries))
+        self.assertFalse(any(seq in key for key in self.fs.memo.entries))
+
+    def test_memo_keeps_no_records(self):
+        """ It should key results by a digest, so no decoded record of a lazily loaded file is kept alive """
+        self.fs.buildDict(self.filename, lazy=True)
+        self.fs.getFileLongestORF()
+        self.assertEqual(len(self.fs.memo.entries), len(self.fs.sequences))
+        for key in self.fs.memo.entries:
+            self.assertFalse(any(isinstance(part, str) and len(part) > 64 for part in key))
+
+    def test_oversized_results(self):
+        """ It should neither store a result larger than the whole cache nor cache a file that large """
+        results = cache.ResultCache(os.path.join(self.tmpdir, 'small.sqlite'), max_bytes=100)
+        results.put("src", '', ('call',), 'x' * 1000)
+        self.assertEqual(results.size(), 0)
+        results.close()
+        self.fs.enableCache(os.path.join(self.tmpdir, 'small.sqlite'), max_bytes=100)
+        self.fs.buildDict(self.filename)
+        self.assertEqual(self.fs.cache.size(), 0)
+        self.assertGreater(self.fs.numRecords(), 0)
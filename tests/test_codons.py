@@ -0,0 +1,47 @@
+"""
+Test Cases for codon scanning
+"""
+import random
+from unittest import TestCase
+from source import codons
+
+
+def naiveCodons(sequence, codon_list):
+    """ Reference implementation: slice every index of the lowercased sequence """
+    frames = {x: [] for x in range(3)}
+    seq = sequence.lower()
+    for idx in range(len(seq)):
+        if seq[idx:idx+3] in codon_list:
+            frames[idx % 3] += [idx]
+    return frames
+
+
+class TestCodons(TestCase):
+    """ Tests for codons.py """
+
+    def setUp(self):
+        """ Build random mixed case sequences, including ambiguous bases """
+        rng = random.Random(42)
+        self.samples = [''.join(rng.choice('ACGTacgtN') for _ in range(rng.randint(0, 400))) for _ in range(50)]
+
+    def test_scan_matches_reference(self):
+        """ It should find the same start and stop codons as slicing every index """
+        for seq in self.samples:
+            starts, stops = codons.scanCodons(seq)
+            self.assertEqual(naiveCodons(seq, codons.START_CODONS), starts)
+            self.assertEqual(naiveCodons(seq, codons.STOP_CODONS), stops)
+            self.assertEqual(starts, codons.findStarts(seq))
+            self.assertEqual(stops, codons.findStops(seq))
+
+    def test_overlapping_codons(self):
+        """ It should report codons that overlap each other """
+        starts, stops = codons.scanCodons('ATGATAGTAA')
+        self.assertEqual({0: [0], 1: [], 2: []}, starts)
+        self.assertEqual({0: [], 1: [1, 4, 7], 2: []}, stops)
+
+    def test_pair_orfs(self):
+        """ It should pair the first start after each stop with the next stop on the same frame """
+        result = codons.pairORFs(*codons.scanCodons('ATGAAATAGCATGCCCCCCTGA'))
+        self.assertEqual({'length': 9, 'index': 0}, result[0])
+        self.assertEqual({'length': 12, 'index': 10}, result[1])
+        self.assertEqual({'length': 0, 'index': -1}, result[2])
@@ -0,0 +1,102 @@
+"""
+Test Cases for compressed FASTA input
+"""
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from source import compressed, fasta, report, sequences
+
+
+class TestCompressed(TestCase):
+    """ Tests for compressed.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Write the fixture compressed in every supported format to a scratch directory """
+        self.tmpdir = tempfile.mkdtemp()
+        with open(self.FILENAME, 'rb') as file:
+            self.raw = file.read()
+        self.files = {}
+        for name, module in (('gzip', gzip), ('bz2', bz2), ('xz', lzma)):
+            self.files[name] = os.path.join(self.tmpdir, f"dna.fasta.{name}")
+            with module.open(self.files[name], 'wb') as file:
+                file.write(self.raw)
+        plain = os.path.join(self.tmpdir, 'dna.fasta')
+        shutil.copy(self.FILENAME, plain)
+        self.bgzf = compressed.compressBgzf(plain)
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+        self.eager = dict(self.fs.sequences)
+
+    def tearDown(self):
+        """ Release any open file and remove the scratch directory """
+        self.fs.close()
+        shutil.rmtree(self.tmpdir)
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_detect(self):
+        """ It should recognize each format by its content """
+        for name, filename in self.files.items():
+            self.assertEqual(compressed.detectCompression(filename), name)
+        self.assertIsNone(compressed.detectCompression(self.FILENAME))
+        self.assertEqual(compressed.detectCompression(self.bgzf), 'gzip')
+        self.assertTrue(compressed.isBgzf(self.bgzf))
+        self.assertFalse(compressed.isBgzf(self.files['gzip']))
+
+    def test_threaded_stream(self):
+        """ It should stream the same bytes through the background thread, in small chunks too """
+        for filename in list(self.files.values()) + [self.bgzf]:
+            with compressed.openFasta(filename) as file:
+                self.assertEqual(file.read(), self.raw)
+            stream = gzip.open(self.bgzf, 'rb')
+            with compressed._ThreadedReader(stream, chunk_size=1000, depth=2) as reader:
+                self.assertEqual(reader.read(), self.raw)
+
+    def test_early_close(self):
+        """ It should stop the background thread when closed before the end """
+        with compressed.openFasta(self.files['xz']) as file:
+            file.readline()
+
+    def test_build_dict(self):
+        """ It should load compressed files like the plain one """
+        for filename in list(self.files.values()) + [self.bgzf]:
+            self.fs.buildDict(filename)
+            self.assertEqual(self.fs.sequences, self.eager)
+
+    def test_bgzf_lazy(self):
+        """ It should fetch records of a BGZF file through its block index """
+        self.fs.buildDict(self.bgzf, lazy=True)
+        self.assertTrue(os.path.exists(self.bgzf + '.gzi'))
+        self.assertEqual(dict(self.fs.sequences), self.eager)
+        name = next(iter(self.eager))
+        self.assertEqual(self.fs.sequences.fetch(name, 100, 200), self.eager[name][100:200])
+        self.assertEqual(compressed.readBlocks(self.bgzf + '.gzi'), compressed.scanBlocks(self.bgzf))
+
+    def test_bgzf_blocks(self):
+        """ It should slice across block boundaries """
+        big = os.path.join(self.tmpdir, 'big.txt')
+        data = bytes(range(256)) * 1000
+        with open(big, 'wb') as file:
+            file.write(data)
+        reader = compressed.BgzfFile(compressed.compressBgzf(big))
+        self.assertEqual(len(reader), len(data))
+        self.assertGreater(len(reader.coffsets), 3)
+        for start, stop in [(0, 10), (65270, 65290), (1000, 200000), (len(data) - 5, len(data) + 5)]:
+            self.assertEqual(reader[start:stop], data[start:stop])
+        reader.close()
+
+    def test_plain_gzip_not_lazy(self):
+        """ It should refuse random access to plain gzip """
+        self.assertRaises(ValueError, fasta.IndexedFasta, self.files['gzip'])
+
+    def test_report(self):
+        """ It should report on compressed files """
+        self.assertEqual(report.buildReport(self.files['bz2'], [4])['repeats'],
+                         report.buildReport(self.FILENAME, [4])['repeats'])
@@ -0,0 +1,99 @@
+"""
+Test Cases for FASTA parsing and indexing
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from source import fasta, sequences
+
+
+class TestFasta(TestCase):
+    """ Tests for fasta.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+    NAME = "gi|142022655|gb|EQ086233.1|43"
+
+    def setUp(self):
+        """ Copy the fixture to a scratch directory so index files are not written into the repository """
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'dna.fasta')
+        shutil.copy(self.FILENAME, self.filename)
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.filename)
+        self.eager = dict(self.fs.sequences)
+
+    def tearDown(self):
+        """ Release any memory map and remove the scratch directory """
+        self.fs.close()
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text):
+        """ Write text to a scratch FASTA file and return its name """
+        filename = os.path.join(self.tmpdir, 'small.fasta')
+        with open(filename, 'w') as file:
+            file.write(text)
+        return filename
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_index_entries(self):
+        """ It should record the length and layout of every record """
+        self.assertEqual(list(self.eager), list(self.fs.index))
+        rec = self.fs.index[self.NAME]
+        self.assertEqual(len(self.eager[self.NAME]), rec.length)
+        self.assertEqual(70, rec.linebases)
+        self.assertEqual(71, rec.linewidth)
+
+    def test_index_round_trip(self):
+        """ It should write an index that reads back unchanged """
+        index = fasta.buildIndex(self.filename)
+        self.assertTrue(os.path.exists(fasta.indexPath(self.filename)))
+        self.assertEqual(index, fasta.readIndex(fasta.indexPath(self.filename)))
+        self.assertEqual(self.fs.index, index)
+
+    def test_lazy_records(self):
+        """ It should slice every record out of the memory map on demand """
+        self.fs.buildDict(self.filename, lazy=True)
+        self.assertIsInstance(self.fs.sequences, fasta.IndexedFasta)
+        self.assertEqual(len(self.eager), self.fs.numRecords())
+        for name, seq in self.eager.items():
+            self.assertEqual(len(seq), self.fs.getLength(name))
+            self.assertEqual(seq, self.fs.getSeq(name))
+        self.assertEqual(self.eager[self.NAME][65:150], self.fs.sequences.fetch(self.NAME, 65, 150))
+
+    def test_lazy_queries(self):
+        """ It should answer length and ORF queries in lazy mode exactly as in eager mode """
+        longest = self.fs.getLongest()
+        orfs = self.fs.getFileLongestORF()
+        self.fs.buildDict(self.filename, lazy=True)
+        self.assertEqual(longest, self.fs.getLongest())
+        self.assertEqual(orfs, self.fs.getFileLongestORF())
+
+    def test_crlf_and_short_lines(self):
+        """ It should index files with CRLF line endings and a short last line """
+        filename = self.write(">a desc\r\nACGT\r\nAC\r\n>b\r\nGGGG\r\nTTTT\r\n")
+        self.fs.buildDict(filename, lazy=True)
+        self.assertEqual("ACGTAC", self.fs.getSeq("a"))
+        self.assertEqual("GGGGTTTT", self.fs.getSeq("b"))
+        self.assertEqual("GTT", self.fs.sequences.fetch("b", 3, 6))
+
+    def test_irregular_lines(self):
+        """ It should load but refuse to index records with irregular line lengths """
+        filename = self.write(">a\nAC\nACGT\n>b\nGG\n")
+        self.fs.buildDict(filename)
+        self.assertEqual("ACACGT", self.fs.getSeq("a"))
+        self.assertEqual(["b"], list(self.fs.index))
+        self.assertRaises(ValueError, fasta.buildIndex, filename)
+
+    def test_trailing_whitespace(self):
+        """ It should strip trailing spaces from the sequence and its length, and refuse to address such records lazily """
+        filename = self.write(">a\nACGT  \nAC\n>b\nACGTACG\n")
+        self.fs.buildDict(filename)
+        self.assertEqual("ACGTAC", self.fs.getSeq("a"))
+        self.assertEqual(["b"], list(self.fs.index))
+        self.assertEqual(7, self.fs.index["b"].length)
+        self.assertRaises(ValueError, self.fs.buildDict, filename, write_index=True)
+        self.assertRaises(ValueError, self.fs.buildDict, filename, lazy=True)
+        self.assertRaises(ValueError, fasta.buildIndex, filename)
@@ -0,0 +1,71 @@
+"""
+Test Cases for k-mer counting
+"""
+import random
+from unittest import TestCase, skipIf
+from source import kmers
+
+
+def naiveRepeats(sequence, length):
+    """ Reference implementation: the original getRepeats loop, with a dict lookup instead of a list scan """
+    repeats = {}
+    for idx in range(len(sequence)):
+        substr = sequence[idx:idx+length].lower()
+        if substr in repeats:
+            repeats[substr] += 1
+        elif len(substr) == length:
+            repeats[substr] = 1
+    return repeats
+
+
+class TestKmers(TestCase):
+    """ Tests for kmers.py """
+
+    def setUp(self):
+        """ Build random mixed case sequences, including ambiguous bases """
+        rng = random.Random(11)
+        self.samples = [''.join(rng.choice('ACGTacgtN') for _ in range(rng.randint(0, 300))) for _ in range(40)]
+        self.min_length = kmers.NUMPY_MIN_LENGTH
+
+    def tearDown(self):
+        """ Restore the array pipeline threshold """
+        kmers.NUMPY_MIN_LENGTH = self.min_length
+
+    def assertSameCounts(self, expected, result):
+        """ Compare counts including the first-occurrence order of the keys """
+        self.assertEqual(list(expected.items()), list(result.items()))
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_count_kmers(self):
+        """ It should count the same k-mers in the same order as getRepeats """
+        for seq in self.samples:
+            for length in (0, 1, 3, 7, 12):
+                self.assertSameCounts(naiveRepeats(seq, length), kmers.countKmers(seq, length))
+
+    def test_count_multi_kmers(self):
+        """ It should merge the counts of several sequences in first-occurrence order """
+        for length in (2, 5, 11):
+            expected = {}
+            for seq in self.samples:
+                for key, val in naiveRepeats(seq, length).items():
+                    expected[key] = expected.get(key, 0) + val
+            self.assertSameCounts(expected, kmers.countMultiKmers(self.samples, length))
+
+    @skipIf(kmers.np is None, "numpy is not installed")
+    def test_table_counter(self):
+        """ It should give the same counts through the packed table for every sequence """
+        kmers.NUMPY_MIN_LENGTH = 0
+        for seq in self.samples:
+            self.assertSameCounts(naiveRepeats(seq, 4), kmers.countKmers(seq, 4))
+
+    @skipIf(kmers.np is None, "numpy is not installed")
+    def test_pack_round_trip(self):
+        """ It should decode packed k-mers back to the lowercased windows """
+        seq = 'ACGTTGCAAGCTTACG' * 3
+        packed, valid = kmers.packKmers(*kmers.encodeBases(seq), 32)
+        self.assertTrue(valid.all())
+        expected = [seq[idx:idx+32].lower() for idx in range(len(seq) - 31)]
+        self.assertEqual(expected, kmers.unpackKmers(packed, 32))
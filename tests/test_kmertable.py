@@ -0,0 +1,108 @@
+"""
+Test Cases for out-of-core k-mer counting
+"""
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+from source import kmertable, packed, sequences
+
+
+@skipIf(packed.np is None, "numpy is not installed")
+class TestKmerTable(TestCase):
+    """ Tests for kmertable.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Load the example file and make a scratch directory """
+        self.tmpdir = tempfile.mkdtemp()
+        self.table_file = kmertable.tablePath(os.path.join(self.tmpdir, 'dna'))
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+
+    def tearDown(self):
+        """ Empty the instance dictionary and remove the scratch directory """
+        self.fs.close()
+        shutil.rmtree(self.tmpdir)
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_matches_in_memory(self):
+        """ It should give the same counts, in the same order, whatever the number of bins """
+        for length in (1, 4, 12, 31):
+            expected = self.fs.getMultiSeqRepeats(self.fs.sequences, length)
+            for max_memory in (1 << 14, 1 << 30):
+                table = self.fs.getRepeatTable(self.fs.sequences, length, self.table_file, max_memory)
+                self.assertEqual(list(table.iterCounts()), list(expected.items()))
+                self.assertEqual(len(table), len(expected))
+                table.close()
+
+    def test_bins_and_chunks(self):
+        """ It should spread the k-mers over several bins and still merge counts split across chunks """
+        self.assertGreater(kmertable.binCount(10 ** 6, 15, 1 << 20), 1)
+        self.assertEqual(kmertable.binCount(10 ** 12, 15, 1), kmertable.MAX_BINS)
+        seqs = list(self.fs.sequences.values())
+        bins = 7
+        windows = kmertable.partitionKmers(seqs, 5, bins, self.tmpdir, chunk_windows=50)
+        self.assertEqual(windows, sum(len(seq) - 4 for seq in seqs))
+        bin_files = [kmertable.binPath(self.tmpdir, idx) for idx in range(bins)]
+        sizes = [kmertable.countBin(bin_file, 5) for bin_file in bin_files]
+        self.assertTrue(all(sizes))
+        kmertable.writeTable(self.table_file, 5, windows, bin_files, sizes)
+        table = kmertable.KmerTable(self.table_file)
+        self.assertEqual(dict(table.iterCounts()), self.fs.getMultiSeqRepeats(self.fs.sequences, 5))
+        self.assertEqual(table.windows, windows)
+        table.close()
+
+    def test_lookups(self):
+        """ It should look up any k-mer, ignoring case, and reject the absent ones """
+        expected = self.fs.getMultiSeqRepeats(self.fs.sequences, 6)
+        table = kmertable.countToTable(self.fs.sequences.values(), 6, self.table_file, 1 << 14)
+        reopened = kmertable.KmerTable(self.table_file)
+        for kmer in random.Random(2).sample(list(expected), 100):
+            self.assertEqual(table[kmer], expected[kmer])
+            self.assertEqual(reopened[kmer.upper()], expected[kmer])
+        self.assertNotIn('zzzzzz', table)
+        self.assertNotIn('acg', table)
+        self.assertEqual(table.get('acg', 0), 0)
+        table.close()
+        reopened.close()
+
+    def test_most_repeats(self):
+        """ It should find the most common repeat of getMostRepeats, ties going to the first seen """
+        for length in (2, 7, 20):
+            table = self.fs.getRepeatTable(self.fs.sequences, length, self.table_file, 1 << 14)
+            expected = self.fs.getMostRepeats(self.fs.getMultiSeqRepeats(self.fs.sequences, length))
+            self.assertEqual(self.fs.getMostRepeats(table), expected)
+            table.close()
+        tied = {'one': 'aacc', 'two': 'ggcc'}
+        table = self.fs.getRepeatTable(tied, 2, self.table_file, 1 << 14)
+        self.assertEqual(table.mostCommon(), self.fs.getMostRepeats(self.fs.getMultiSeqRepeats(tied, 2)))
+        table.close()
+
+    def test_max_memory_and_jobs(self):
+        """ It should give the in-memory answer of getMultiSeqRepeats with a memory budget, serially or in workers """
+        expected = self.fs.getMultiSeqRepeats(self.fs.sequences, 9)
+        self.assertEqual(list(self.fs.getMultiSeqRepeats(self.fs.sequences, 9, max_memory=1 << 14).items()),
+                         list(expected.items()))
+        self.assertEqual(self.fs.getMultiSeqRepeats(self.fs.sequences, 9, jobs=2, max_memory=1 << 14), expected)
+
+    def test_edge_cases(self):
+        """ It should count records shorter than the k-mer, ambiguous bases and an empty input """
+        records = {'short': 'ac', 'ambiguous': 'ACGNNRYACGNN', 'empty': ''}
+        table = self.fs.getRepeatTable(records, 3, self.table_file, 1 << 14)
+        self.assertEqual(dict(table.iterCounts()), self.fs.getMultiSeqRepeats(records, 3))
+        table.close()
+        table = self.fs.getRepeatTable({}, 3, self.table_file, 1 << 14)
+        self.assertEqual((len(table), table.mostCommon()), (0, {'': 0}))
+        table.close()
+        with self.assertRaises(ValueError):
+            kmertable.countToTable([], 0, self.table_file, 1 << 14)
+
+    def test_not_a_table(self):
+        """ It should refuse a file that is not a k-mer table """
+        with self.assertRaises(ValueError):
+            kmertable.KmerTable(self.FILENAME)
@@ -0,0 +1,118 @@
+"""
+Test Cases for the length index
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from source import lengths, sequences
+
+
+class TestLengths(TestCase):
+    """ Tests for lengths.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Load the example file """
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+
+    def tearDown(self):
+        """ Empty the instance dictionary """
+        self.fs.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_built_while_loading(self):
+        """ It should hold the length of every record in dictionary order """
+        self.assertEqual(self.fs.lengths.names, list(self.fs.sequences))
+        self.assertEqual(self.fs.lengths.lengths, [len(seq) for seq in self.fs.sequences.values()])
+
+    def test_lazy_matches(self):
+        """ It should build the same index from the .fai entries of a lazily loaded file """
+        names, lens = self.fs.lengths.names, self.fs.lengths.lengths
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.fs.buildDict(shutil.copy(self.FILENAME, tmpdir), lazy=True)
+            self.assertEqual(self.fs.lengths.names, names)
+            self.assertEqual(self.fs.lengths.lengths, lens)
+            self.fs.close()
+
+    def test_trailing_whitespace(self):
+        """ It should measure the stored sequences, not the raw lines, when lines carry trailing whitespace """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'spaces.fasta')
+            with open(filename, 'w') as file:
+                file.write(">a\nACGT  \nAC\t\n>b\nACGTACG\n")
+            self.fs.buildDict(filename)
+        self.assertEqual(self.fs.getAllLengths(), [len(seq) for seq in self.fs.sequences.values()])
+        self.assertEqual(self.fs.getLongest(), {7: ['b']})
+
+    def test_longest_shortest(self):
+        """ It should give the same answers as a scan over the dictionary """
+        lens = [len(seq) for seq in self.fs.sequences.values()]
+        self.assertEqual(self.fs.getLongest(), {max(lens): [n for n, s in self.fs.sequences.items()
+                                                            if len(s) == max(lens)]})
+        self.assertEqual(self.fs.getShortest(), {min(lens): [n for n, s in self.fs.sequences.items()
+                                                             if len(s) == min(lens)]})
+
+    def test_rebuilt_when_stale(self):
+        """ It should rebuild the index when the dictionary was filled without buildDict """
+        self.fs.close()
+        self.fs.sequences.update({'a': 'acgt', 'b': 'ac', 'c': 'acgt'})
+        self.assertEqual(self.fs.getLongest(), {4: ['a', 'c']})
+        self.assertEqual(self.fs.getAllLengths(), [4, 2, 4])
+
+    def test_top_longest(self):
+        """ It should list the longest records first, in insertion order among ties """
+        index = lengths.LengthIndex()
+        for name, length in [('a', 5), ('b', 9), ('c', 5), ('d', 1), ('e', 9)]:
+            index.add(name, length)
+        self.assertEqual(index.topLongest(3), [('b', 9), ('e', 9), ('a', 5)])
+        self.assertEqual(index.topLongest(0), [])
+        self.assertEqual(len(index.topLongest(10)), 5)
+
+    def test_repeated_name(self):
+        """ It should keep the first position and the last length of a repeated name, like a dictionary """
+        index = lengths.LengthIndex()
+        for name, length in [('a', 5), ('b', 9), ('a', 12)]:
+            index.add(name, length)
+        self.assertEqual(index.lengths, [12, 9])
+        self.assertEqual(index.longest(), {12: ['a']})
+        self.assertEqual(index.shortest(), {9: ['b']})
+
+    def test_n50(self):
+        """ It should find the N50 and L50 and other Nx statistics """
+        index = lengths.LengthIndex()
+        for idx, length in enumerate([2, 3, 4, 5, 6, 7, 8, 9, 10]):
+            index.add(str(idx), length)
+        self.assertEqual(index.nx(), (8, 3))
+        self.assertEqual(index.nx(0.9), (4, 7))
+        self.assertEqual(index.nx(1), (2, 9))
+
+    def test_percentile(self):
+        """ It should interpolate between the nearest lengths """
+        index = lengths.LengthIndex()
+        for idx, length in enumerate([10, 40, 20, 30]):
+            index.add(str(idx), length)
+        self.assertEqual(index.percentile(0), 10)
+        self.assertEqual(index.percentile(100), 40)
+        self.assertAlmostEqual(index.percentile(50), 25)
+
+    def test_histogram(self):
+        """ It should count every record in exactly one bin """
+        hist = self.fs.getLengthHistogram(7)
+        self.assertEqual(len(hist), 7)
+        self.assertEqual(sum(count for _, _, count in hist), self.fs.numRecords())
+        self.assertEqual(hist[0][0], min(self.fs.getAllLengths()))
+        self.assertEqual(hist[-1][1], max(self.fs.getAllLengths()))
+        index = lengths.LengthIndex()
+        index.add('a', 3)
+        self.assertEqual(index.histogram(2), [(3, 3.5, 1), (3.5, 4, 0)])
+
+    def test_empty(self):
+        """ It should raise ValueError on an empty index like max() does """
+        self.fs.close()
+        self.assertRaises(ValueError, self.fs.getLongest)
+        self.assertRaises(ValueError, self.fs.getN50)
@@ -0,0 +1,117 @@
+"""
+Test Cases for the motif index
+"""
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+from source import motifs, packed, sequences
+
+
+def scanMotif(seq_dict, motif):
+    """ Every occurrence of motif found with a find loop over the records """
+    hits = []
+    for name, seq in seq_dict.items():
+        seq, pos = seq.lower(), -1
+        while True:
+            pos = seq.find(motif.lower(), pos + 1)
+            if pos < 0:
+                break
+            hits.append((name, pos))
+    return hits
+
+
+class TestMotifs(TestCase):
+    """ Tests for motifs.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Copy the fixture into a scratch directory and load it """
+        self.tmpdir = tempfile.mkdtemp()
+        self.fasta = shutil.copy(self.FILENAME, self.tmpdir)
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.fasta)
+
+    def tearDown(self):
+        """ Empty the instance dictionary and remove the scratch directory """
+        self.fs.close()
+        shutil.rmtree(self.tmpdir)
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_matches_find_loop(self):
+        """ It should find the same occurrences as a find loop, ignoring case and including overlaps """
+        rng = random.Random(5)
+        seqs = list(self.fs.sequences.values())
+        queries = ['a', 'ATG', 'tttt', 'acgtacgt', 'NOTADNA']
+        for _ in range(30):
+            seq = rng.choice(seqs)
+            start = rng.randrange(len(seq) - 12)
+            queries.append(seq[start:start + rng.randint(1, 12)])
+        for motif in queries:
+            expected = scanMotif(self.fs.sequences, motif)
+            self.assertEqual(self.fs.findMotif(motif), expected)
+            self.assertEqual(self.fs.getMotifIndex().count(motif), len(expected))
+
+    def test_no_match_across_records(self):
+        """ It should never match a motif running from one record into the next """
+        index = motifs.MotifIndex.fromSequences([('one', 'AACC'), ('two', 'GGTT')])
+        self.assertEqual(index.count('ccgg'), 0)
+        self.assertEqual(index.find('cc'), [('one', 2)])
+        self.assertEqual(index.find('A'), [('one', 0), ('one', 1)])
+
+    def test_batches(self):
+        """ It should give each motif of a batch the answer of a single query, in the order given """
+        queries = ['gatc', 'ATG', 'aa', 'cgcg', 'atg', 'zz']
+        counts = self.fs.countMotifs(queries)
+        self.assertEqual(list(counts), queries)
+        hits = self.fs.findMotifs(queries)
+        for motif in queries:
+            self.assertEqual(hits[motif], self.fs.findMotif(motif))
+            self.assertEqual(counts[motif], len(hits[motif]))
+
+    def test_built_once(self):
+        """ It should reuse the index until another file is loaded """
+        index = self.fs.getMotifIndex()
+        self.assertIs(index, self.fs.getMotifIndex())
+        self.fs.buildDict(self.fasta)
+        self.assertIsNot(index, self.fs.getMotifIndex())
+        with self.assertRaises(ValueError):
+            index.count('')
+
+    @skipIf(packed.np is None, "numpy is not installed")
+    def test_persist(self):
+        """ It should save the index next to the file and read it back while it is newer than the file """
+        built = self.fs.getMotifIndex(persist=True)
+        index_file = motifs.motifPath(os.path.abspath(self.fasta))
+        self.assertTrue(os.path.exists(index_file))
+        self.fs.buildDict(self.fasta)
+        loaded = self.fs.getMotifIndex(persist=True)
+        self.assertEqual(loaded.names, built.names)
+        self.assertEqual(loaded.countAll(['atg', 'gc', 'ttaa']), built.countAll(['atg', 'gc', 'ttaa']))
+        self.assertEqual(loaded.find('gatc'), built.find('gatc'))
+        loaded.close()
+
+    @skipIf(packed.np is None, "numpy is not installed")
+    def test_stale_index(self):
+        """ It should rebuild the saved index when the file is newer """
+        motifs.MotifIndex.fromSequences([('other', 'ACGT')]).save(motifs.motifPath(os.path.abspath(self.fasta)))
+        os.utime(self.fasta, (0, 0))
+        self.assertEqual(self.fs.getMotifIndex(persist=True).names, ['other'])
+        self.fs.close()
+        mtime = os.path.getmtime(motifs.motifPath(self.fasta)) + 10
+        os.utime(self.fasta, (mtime, mtime))
+        self.fs.buildDict(self.fasta)
+        self.assertEqual(self.fs.getMotifIndex(persist=True).names, list(self.fs.sequences))
+
+    def test_packed_matches(self):
+        """ It should index packed and lazily loaded records the same way """
+        expected = self.fs.countMotifs(['atg', 'ccc', 'gattaca'])
+        self.fs.buildDict(self.fasta, lazy=True)
+        self.assertEqual(self.fs.countMotifs(['atg', 'ccc', 'gattaca']), expected)
+        if packed.np is not None:
+            self.fs.buildDict(self.fasta, packed=True)
+            self.assertEqual(self.fs.countMotifs(['atg', 'ccc', 'gattaca']), expected)
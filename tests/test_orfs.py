@@ -0,0 +1,131 @@
+"""
+Test Cases for the streaming ORF enumerator
+"""
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+from source import orfs, packed, sequences
+
+
+def bruteORFs(sequence, nested):
+    """ Every ORF of the forward strand found codon by codon, as (frame, start, end) """
+    found = []
+    seq = sequence.upper()
+    for frame in range(3):
+        starts = []
+        for idx in range(frame, len(seq) - 2, 3):
+            codon = seq[idx:idx + 3]
+            if codon == 'ATG' and (nested or not starts):
+                starts.append(idx)
+            elif codon in ('TAG', 'TAA', 'TGA'):
+                found.extend((frame, start, idx + 3) for start in starts)
+                starts = []
+    return sorted(found)
+
+
+class TestOrfs(TestCase):
+    """ Tests for orfs.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Load the example file """
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+
+    def tearDown(self):
+        """ Empty the instance dictionary """
+        self.fs.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_reverse_complement(self):
+        """ It should complement and reverse, keeping case and ambiguity codes """
+        self.assertEqual(orfs.reverseComplement('ATGcN'), 'NgCAT')
+        self.assertEqual(orfs.reverseComplement('ACGTRY'), 'RYACGT')
+
+    def test_small_sequence(self):
+        """ It should find the ORFs of both strands in forward coordinates """
+        seq = 'CCATGAAATAGCTTACATCAT'
+        found = list(orfs.iterORFs(seq))
+        self.assertEqual(found[0], orfs.ORF('+', 2, 2, 11, 9))
+        reverse = [orf for orf in found if orf.strand == '-']
+        self.assertEqual(reverse, [orfs.ORF('-', 0, 12, 21, 9)])
+        self.assertEqual(orfs.reverseComplement(seq[12:21]), 'ATGATGTAA')
+
+    def test_forward_matches_brute_force(self):
+        """ It should find the same forward ORFs as a codon by codon walk, nested or not """
+        for seq in self.fs.sequences.values():
+            for nested in (False, True):
+                found = sorted((orf.frame, orf.start, orf.end)
+                               for orf in orfs.iterORFs(seq, nested=nested, strands='+'))
+                self.assertEqual(found, bruteORFs(seq, nested))
+
+    def test_reverse_matches_brute_force(self):
+        """ It should find the ORFs of the reverse complement on the reverse strand """
+        for seq in self.fs.sequences.values():
+            rc = orfs.reverseComplement(seq)
+            found = sorted((orf.frame, len(seq) - orf.end, len(seq) - orf.start)
+                           for orf in orfs.iterORFs(seq, nested=True, strands='-'))
+            self.assertEqual(found, bruteORFs(rc, True))
+
+    def test_chunks_do_not_change_results(self):
+        """ It should find the same ORFs whatever the chunk size, codons straddling chunks included """
+        seq = max(self.fs.sequences.values(), key=len)
+        whole = list(orfs.iterORFs(seq, nested=True))
+        for chunk_size in (1, 2, 7, 64):
+            self.assertEqual(list(orfs.iterORFs(seq, nested=True, chunk_size=chunk_size)), whole)
+
+    def test_longest_matches_getLongestORF(self):
+        """ It should yield the longest ORF of each forward frame that getLongestORF reports """
+        for seq in self.fs.sequences.values():
+            expected = self.fs.getLongestORF(seq)
+            for frame in range(3):
+                found = [orf for orf in orfs.iterORFs(seq, strands='+') if orf.frame == frame]
+                longest = max(found, key=lambda orf: orf.length, default=None)
+                if longest is None:
+                    self.assertEqual(expected[frame]['length'], 0)
+                    continue
+                self.assertEqual((longest.length, longest.start), (expected[frame]['length'], expected[frame]['index']))
+
+    def test_min_length(self):
+        """ It should drop the ORFs shorter than min_length """
+        seq = max(self.fs.sequences.values(), key=len)
+        every = list(orfs.iterORFs(seq, nested=True))
+        self.assertEqual(list(orfs.iterORFs(seq, min_length=300, nested=True)),
+                         [orf for orf in every if orf.length >= 300])
+
+    def test_lazy(self):
+        """ It should yield a generator and give the same ORFs over a lazily loaded file """
+        self.assertFalse(isinstance(self.fs.iterFileORFs(), list))
+        loaded = list(self.fs.iterFileORFs(min_length=100))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.fs.buildDict(shutil.copy(self.FILENAME, tmpdir), lazy=True)
+            self.assertEqual(list(self.fs.iterFileORFs(min_length=100)), loaded)
+            self.fs.close()
+
+    @skipIf(packed.np is None, "numpy is not installed")
+    def test_packed(self):
+        """ It should give the same ORFs for packed sequences and packed stores """
+        loaded = list(self.fs.iterFileORFs(nested=True))
+        self.fs.buildDict(self.FILENAME, packed=True)
+        self.assertEqual(list(self.fs.iterFileORFs(nested=True)), loaded)
+        with tempfile.TemporaryDirectory() as tmp:
+            store_file = self.fs.writeStore(os.path.join(tmp, 'dna.pgds'))
+            self.fs.loadStore(store_file)
+            self.assertEqual(list(self.fs.iterFileORFs(nested=True)), loaded)
+            self.fs.close()
+
+    def test_write_bed(self):
+        """ It should write one BED line per ORF """
+        handle = io.StringIO()
+        count = orfs.writeBed(self.fs.iterFileORFs(min_length=200), handle)
+        lines = handle.getvalue().splitlines()
+        self.assertEqual(len(lines), count)
+        name, start, end, _, _, strand = lines[0].split('\t')
+        self.assertIn(name, self.fs.sequences)
+        self.assertGreaterEqual(int(end) - int(start), 200)
+        self.assertIn(strand, '+-')
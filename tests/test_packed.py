@@ -0,0 +1,60 @@
+"""
+Test Cases for the packed sequence backend
+"""
+import random
+from unittest import TestCase, skipIf
+from source import codons, packed, sequences
+
+
+@skipIf(packed.np is None, "numpy is not installed")
+class TestPacked(TestCase):
+    """ Tests for packed.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Build random mixed case sequences, including ambiguous bases """
+        rng = random.Random(7)
+        self.samples = [''.join(rng.choice('ACGTACGTacgtNRY') for _ in range(rng.randint(0, 500))) for _ in range(50)]
+        self.samples += ['', 'A', 'AT', 'ATG', 'NNNN', 'ATGTAA']
+        self.fs = sequences.FastaSeq()
+
+    def tearDown(self):
+        """ Empty the instance dictionary """
+        self.fs.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_round_trip(self):
+        """ It should unpack to the uppercased original sequence, keeping ambiguous bases """
+        for seq in self.samples:
+            pseq = packed.PackedSeq.fromString(seq)
+            self.assertEqual(len(seq), len(pseq))
+            self.assertEqual(seq.upper(), str(pseq).upper())
+            self.assertLessEqual(pseq.bases.nbytes, (len(seq) + 3) // 4)
+
+    def test_codons_match_scanner(self):
+        """ It should find the same codons per frame as the string scanner """
+        for seq in self.samples:
+            self.assertEqual(codons.scanCodons(seq), packed.PackedSeq.fromString(seq).scanCodons())
+
+    def test_longest_orf_matches_scanner(self):
+        """ It should pair starts and stops exactly like the string scanner """
+        for seq in self.samples:
+            expected = codons.pairORFs(*codons.scanCodons(seq))
+            self.assertEqual(expected, packed.PackedSeq.fromString(seq).longestORF())
+
+    def test_packed_backend(self):
+        """ It should answer the file queries with records stored packed """
+        self.fs.buildDict(self.FILENAME)
+        plain = dict(self.fs.sequences)
+        orfs = self.fs.getFileLongestORF()
+        longest = self.fs.getLongest()
+        repeats = self.fs.getMultiSeqRepeats(self.fs.sequences, 3)
+        self.fs.buildDict(self.FILENAME, packed=True)
+        self.assertIsInstance(next(iter(self.fs.sequences.values())), packed.PackedSeq)
+        self.assertEqual(plain, {name: self.fs.getSeq(name) for name in self.fs.sequences})
+        self.assertEqual(orfs, self.fs.getFileLongestORF())
+        self.assertEqual(repeats, self.fs.getMultiSeqRepeats(self.fs.sequences, 3))
+        self.assertEqual(longest, self.fs.getLongest())
@@ -0,0 +1,116 @@
+"""
+Test Cases for process pool execution
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from source import parallel, sequences
+
+
+class TestParallel(TestCase):
+    """ Tests for parallel.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Load the example file and let every sequence be split into windows """
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+        self.min_length = parallel.CHUNK_MIN_LENGTH
+        parallel.CHUNK_MIN_LENGTH = 0
+
+    def tearDown(self):
+        """ Empty the instance dictionary """
+        parallel.CHUNK_MIN_LENGTH = self.min_length
+        self.fs.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_balanced_batches(self):
+        """ It should cover every record once, in order, in batches of similar size """
+        batches = parallel.balancedBatches(self.fs.sequences, 2)
+        self.assertEqual(list(self.fs.sequences), [name for batch in batches for name in batch])
+        self.assertLessEqual(len(batches), 2 * parallel.BATCHES_PER_JOB + 1)
+        self.assertEqual([['a'], ['b']], parallel.balancedBatches({'a': 'ACGT', 'b': 'ACGT'}, 1))
+
+    def test_parallel_orfs(self):
+        """ It should find the same longest ORFs as the serial scan """
+        self.assertEqual(self.fs.getFileLongestORF(), self.fs.getFileLongestORF(jobs=2))
+
+    def test_parallel_repeats(self):
+        """ It should merge the batch counts into the serial result, key order included """
+        expected = self.fs.getMultiSeqRepeats(self.fs.sequences, 4)
+        result = self.fs.getMultiSeqRepeats(self.fs.sequences, 4, jobs=3)
+        self.assertEqual(list(expected.items()), list(result.items()))
+
+    def test_parallel_lazy(self):
+        """ It should let workers read the records of a memory-mapped file themselves """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'dna.fasta')
+            shutil.copy(self.FILENAME, filename)
+            expected = self.fs.getFileLongestORF()
+            self.fs.buildDict(filename, lazy=True)
+            task = parallel._task(self.fs.sequences, list(self.fs.sequences)[:2])
+            self.assertEqual(filename, task[0])
+            self.assertEqual(expected, self.fs.getFileLongestORF(jobs=2))
+        finally:
+            self.fs.close()
+            shutil.rmtree(tmpdir)
+
+    def test_changed_file_reopened(self):
+        """ It should reopen a file that changed since a worker opened it, closing the stale handle """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'x.fa')
+            with open(filename, 'w') as file:
+                file.write('>x\nATGAAATAG\n')
+            self.fs.buildDict(filename, lazy=True)
+            task, = parallel.batchTasks(self.fs.sequences, 1)
+            self.assertEqual(parallel.runBatch(sequences.recordLongestORF, True, task)[0][1][0]['length'], 9)
+            stale = parallel._open_files[filename][1]
+            with open(filename + '.new', 'w') as file:
+                file.write('>x\nCCCATGAAACCCGGGTTTTAGC\n')
+            os.replace(filename + '.new', filename)
+            self.fs.buildDict(filename, lazy=True)
+            task, = parallel.batchTasks(self.fs.sequences, 1)
+            orfs = parallel.runBatch(sequences.recordLongestORF, True, task)[0][1]
+            self.assertEqual((orfs[0]['length'], orfs[0]['index']), (18, 3))
+            self.assertTrue(stale._file.closed)
+        finally:
+            self.fs.close()
+            parallel._open_files.pop(filename)[1].close()
+            shutil.rmtree(tmpdir)
+
+    def test_chunk_bounds(self):
+        """ It should cover the sequence with consecutive windows """
+        self.assertEqual([(0, 2), (2, 5), (5, 7), (7, 10)], parallel.chunkBounds(10, 1))
+        self.assertEqual([(0, 1), (1, 2)], parallel.chunkBounds(2, 8))
+        bounds = parallel.chunkBounds(1000, 2)
+        self.assertEqual(0, bounds[0][0])
+        self.assertEqual(1000, bounds[-1][1])
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(bounds, bounds[1:])))
+
+    def test_chunked_codons(self):
+        """ It should find every codon exactly once when a sequence is split into windows """
+        seq = self.fs.getSeq("gi|142022655|gb|EQ086233.1|43")
+        self.assertEqual(self.fs.getStartCodons(seq), self.fs.getStartCodons(seq, jobs=2))
+        self.assertEqual(self.fs.getStopCodons(seq), self.fs.getStopCodons(seq, jobs=2))
+
+    def test_chunked_orf(self):
+        """ It should stitch an ORF that spans several windows """
+        seq = 'CC' + 'ATG' + 'GCC' * 40 + 'TAA' + 'ATGTAG'
+        expected = self.fs.getLongestORF(seq)
+        self.assertEqual({'length': 126, 'index': 2}, expected[2])
+        self.assertEqual(expected, self.fs.getLongestORF(seq, jobs=4))
+        for seq in self.fs.sequences.values():
+            self.assertEqual(self.fs.getLongestORF(seq), self.fs.getLongestORF(seq, jobs=3))
+
+    def test_chunked_repeats(self):
+        """ It should count k-mers on window borders exactly once """
+        seq = self.fs.getSeq("gi|142022655|gb|EQ086233.1|43")
+        for length in (1, 5, 14):
+            expected = self.fs.getRepeats(seq, length)
+            self.assertEqual(list(expected.items()), list(self.fs.getRepeats(seq, length, jobs=3).items()))
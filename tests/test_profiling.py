@@ -0,0 +1,74 @@
+"""
+Test Cases for the FastaSeq instrumentation
+"""
+import tracemalloc
+from unittest import TestCase
+from source import sequences
+
+
+class TestProfiling(TestCase):
+    """ Tests for profiling.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Load the example file """
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+
+    def tearDown(self):
+        """ Stop profiling and empty the instance dictionary """
+        self.fs.disableProfiling()
+        self.fs.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_disabled(self):
+        """ It should record nothing while profiling is off """
+        self.assertIsNone(self.fs.profiler)
+        self.fs.getFileLongestORF()
+        self.assertEqual(self.fs.getProfile(), {})
+
+    def test_counts_and_sizes(self):
+        """ It should count calls and the bases each one processed, nested calls included """
+        self.fs.enableProfiling()
+        seq = self.fs.getSeq(next(iter(self.fs.sequences)))
+        self.fs.getRepeats(seq, 4)
+        self.fs.getRepeats(seq, 5)
+        self.fs.getFileLongestORF()
+        stats = self.fs.getProfile()
+        self.assertEqual(stats['getRepeats']['calls'], 2)
+        self.assertEqual(stats['getRepeats']['bases'], 2 * len(seq))
+        self.assertEqual(stats['getLongestORF']['calls'], self.fs.numRecords())
+        self.assertEqual(stats['getFileLongestORF']['bases'], sum(self.fs.getAllLengths()))
+        self.assertGreaterEqual(stats['getFileLongestORF']['wall'], stats['getLongestORF']['wall'])
+
+    def test_hook(self):
+        """ It should pass every call to the hook """
+        events = []
+        self.fs.enableProfiling(hook=events.append)
+        self.fs.buildDict(self.FILENAME)
+        self.assertEqual([event['method'] for event in events], ['buildDict'])
+        self.assertEqual(events[0]['bases'], sum(self.fs.getAllLengths()))
+        self.assertGreater(events[0]['bytes'], events[0]['bases'])
+
+    def test_context_manager(self):
+        """ It should profile only the block and restore the previous state """
+        with self.fs.profile(trace_memory=True) as profiler:
+            self.fs.getMultiSeqRepeats(self.fs.sequences, 6)
+        self.assertIsNone(self.fs.profiler)
+        self.assertFalse(tracemalloc.is_tracing())
+        stats = profiler.snapshot()
+        self.assertEqual(list(stats), ['getMultiSeqRepeats'])
+        self.assertGreater(stats['getMultiSeqRepeats']['peak'], 0)
+
+    def test_nested_peak(self):
+        """ It should include the peak of a nested call in the peak of the call around it """
+        profiler = self.fs.enableProfiling(trace_memory=True)
+
+        def outer(owner):
+            return owner.getRepeats('acgt' * 5000, 8)
+        profiler.call('outer', None, outer, self.fs, (), {})
+        stats = profiler.snapshot()
+        self.assertGreaterEqual(stats['outer']['peak'], stats['getRepeats']['peak'])
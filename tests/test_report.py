@@ -0,0 +1,90 @@
+"""
+Test Cases for the single pass report
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+from source import report, sequences
+
+
+class TestReport(TestCase):
+    """ Tests for report.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Load the example file """
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Empty the instance dictionary and remove the scratch directory """
+        self.fs.close()
+        shutil.rmtree(self.tmpdir)
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_matches_methods(self):
+        """ It should give the same answers as the FastaSeq methods """
+        result = report.buildReport(self.FILENAME, [3, 8])
+        self.assertEqual(result['records'], self.fs.numRecords())
+        self.assertEqual(result['lengths']['total'], sum(self.fs.getAllLengths()))
+        longest, = self.fs.getLongest().items()
+        self.assertEqual((result['lengths']['longest']['length'], result['lengths']['longest']['names']), longest)
+        self.assertEqual(result['lengths']['n50'], self.fs.getN50()[0])
+        self.assertEqual(result['orfs'], self.fs.getFileLongestORF())
+        for length in (3, 8):
+            counts = self.fs.getMultiSeqRepeats(self.fs.sequences, length)
+            tally = result['repeats'][length]
+            self.assertTrue(tally['exact'])
+            self.assertEqual(tally['distinct'], len(counts))
+            self.assertEqual({tally['most_common']: tally['repeats']}, self.fs.getMostRepeats(counts))
+
+    def test_jobs(self):
+        """ It should give the same report with a process pool """
+        report.BATCH_BASES, batch_bases = 5000, report.BATCH_BASES
+        try:
+            self.assertEqual(report.buildReport(self.FILENAME, [4], jobs=2), report.buildReport(self.FILENAME, [4]))
+        finally:
+            report.BATCH_BASES = batch_bases
+
+    def test_max_memory(self):
+        """ It should turn approximate past the memory limit and still find the most frequent repeat """
+        counts = self.fs.getMultiSeqRepeats(self.fs.sequences, 3)
+        tally = report.buildReport(self.FILENAME, [3], max_memory=2000)['repeats'][3]
+        self.assertFalse(tally['exact'])
+        self.assertIsNone(tally['distinct'])
+        self.assertEqual(tally['most_common'], list(self.fs.getMostRepeats(counts))[0])
+        self.assertLessEqual(tally['repeats'] - tally['error'], counts[tally['most_common']])
+        self.assertGreaterEqual(tally['repeats'], counts[tally['most_common']])
+
+    def test_parse_size(self):
+        """ It should read sizes with binary units """
+        self.assertEqual(report.parseSize('512'), 512)
+        self.assertEqual(report.parseSize('2k'), 2048)
+        self.assertEqual(report.parseSize('1.5GB'), 3 << 29)
+        self.assertRaises(ValueError, report.parseSize, 'lots')
+
+    def test_main(self):
+        """ It should write JSON to standard output and TSV to a file """
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(sequences.main([self.FILENAME, '-n', '3']), 0)
+        self.assertEqual(json.loads(out.getvalue())['records'], self.fs.numRecords())
+        output = os.path.join(self.tmpdir, 'report.tsv')
+        self.assertEqual(sequences.main([self.FILENAME, '-n', '3', '-f', 'tsv', '-o', output]), 0)
+        with open(output) as file:
+            rows = dict(line.rstrip('\n').split('\t') for line in file)
+        self.assertEqual(rows['records'], str(self.fs.numRecords()))
+        self.assertEqual(rows['repeats.3.exact'], 'True')
+
+    def test_missing_file(self):
+        """ It should report a missing file and fail """
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(sequences.main(['no_such_file.fasta']), 1)
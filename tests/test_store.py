@@ -0,0 +1,81 @@
+"""
+Test Cases for the packed sequence store
+"""
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+from source import packed, parallel, sequences, store
+
+
+@skipIf(packed.np is None, "numpy is not installed")
+class TestStore(TestCase):
+    """ Tests for store.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Convert the fixture into a scratch directory """
+        self.tmpdir = tempfile.mkdtemp()
+        self.store_file = store.convertFasta(self.FILENAME, os.path.join(self.tmpdir, 'dna.pgds'))
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+        self.eager = {name: seq.upper() for name, seq in self.fs.sequences.items()}
+
+    def tearDown(self):
+        """ Release the store and remove the scratch directory """
+        self.fs.close()
+        shutil.rmtree(self.tmpdir)
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_round_trip(self):
+        """ It should give back every record, in order and uppercased """
+        self.fs.loadStore(self.store_file)
+        self.assertEqual(list(self.fs.sequences), list(self.eager))
+        self.assertEqual(self.fs.numRecords(), len(self.eager))
+        for name, seq in self.eager.items():
+            self.assertEqual(self.fs.getLength(name), len(seq))
+            self.assertEqual(self.fs.getSeq(name), seq)
+
+    def test_ambiguous_and_empty(self):
+        """ It should keep bases outside ACGT and records of every length, including empty ones """
+        rng = random.Random(3)
+        records = [(f"r{idx}", ''.join(rng.choice('ACGTNRY') for _ in range(rng.randint(0, 300)))) for idx in range(30)]
+        records += [('empty', ''), ('ns', 'NNNNN')]
+        store_file = os.path.join(self.tmpdir, 'random.pgds')
+        self.assertEqual(store.writeStore(records, store_file), len(records))
+        opened = store.PackedStore(store_file)
+        for name, seq in records:
+            self.assertEqual(str(opened[name]), seq)
+            for start, end in [(0, 1), (3, 17), (5, len(seq)), (len(seq) - 6, len(seq) + 4)]:
+                self.assertEqual(opened.fetch(name, max(start, 0), end), seq[max(start, 0):end])
+
+    def test_same_answers(self):
+        """ It should answer the ORF and repeat queries like the text file """
+        longest = self.fs.getFileLongestORF()
+        repeats = self.fs.getMultiSeqRepeats(self.fs.sequences, 4)
+        lengths = self.fs.getLongest(), self.fs.getShortest()
+        self.fs.loadStore(self.store_file)
+        self.assertEqual(self.fs.getFileLongestORF(), longest)
+        self.assertEqual(self.fs.getMultiSeqRepeats(self.fs.sequences, 4), repeats)
+        self.assertEqual((self.fs.getLongest(), self.fs.getShortest()), lengths)
+
+    def test_write_loaded(self):
+        """ It should write the instance dictionary as a store """
+        store_file = self.fs.writeStore(os.path.join(self.tmpdir, 'loaded.pgds'))
+        self.fs.loadStore(store_file)
+        self.assertEqual({name: self.fs.getSeq(name) for name in self.fs.sequences}, self.eager)
+
+    def test_workers(self):
+        """ It should send store records to workers by name """
+        self.fs.loadStore(self.store_file)
+        task = parallel._task(self.fs.sequences, ['a', 'b'])
+        self.assertEqual(task, (self.store_file, ['a', 'b']))
+        self.assertEqual(self.fs.getFileLongestORF(jobs=2), self.fs.getFileLongestORF())
+
+    def test_not_a_store(self):
+        """ It should refuse files that are not stores """
+        self.assertRaises(ValueError, store.PackedStore, self.FILENAME)
@@ -0,0 +1,59 @@
+"""
+Test Cases for the suffix array repeat index
+"""
+import random
+from unittest import TestCase
+from source import kmers, sequences, suffix
+
+
+class TestSuffix(TestCase):
+    """ Tests for suffix.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Build random mixed case sequences, including ambiguous bases """
+        rng = random.Random(5)
+        self.samples = [''.join(rng.choice('ACGTacgN') for _ in range(rng.randint(0, 80))) for _ in range(6)]
+        self.fs = sequences.FastaSeq()
+
+    def tearDown(self):
+        """ Empty the instance dictionary """
+        self.fs.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_suffix_array(self):
+        """ It should sort every suffix of the text """
+        text = 'acacagggacaca\x00acgt\x00'
+        expected = sorted(range(len(text)), key=lambda idx: text[idx:])
+        self.assertEqual(expected, [int(x) for x in suffix.suffixArray(text)])
+        self.assertEqual(expected, suffix._suffixArrayList(text))
+
+    def test_repeats_every_length(self):
+        """ It should give the same repeats as getMultiSeqRepeats for every length from one index """
+        index = suffix.RepeatIndex(self.samples)
+        for length in range(1, 12):
+            expected = kmers.countMultiKmers(self.samples, length)
+            self.assertEqual(list(expected.items()), list(index.getRepeats(length).items()))
+            self.assertEqual(self.fs.getMostRepeats(expected), index.getMostRepeats(length))
+            self.assertEqual(sum(1 for x in expected.values() if x > 1), index.numRepeats(length))
+
+    def test_spectrum(self):
+        """ It should count how many substrings occur each number of times """
+        index = suffix.RepeatIndex(['ACACAGGGACACA'])
+        self.assertEqual({1: 5, 2: 1, 4: 1}, index.getSpectrum(3))
+        self.assertEqual({2: index.getSpectrum(2), 3: index.getSpectrum(3)}, index.getSpectra(range(2, 4)))
+        self.assertRaises(ValueError, index.getRepeats, 0)
+
+    def test_file_repeat_index(self):
+        """ It should build the index once per loaded file """
+        self.fs.buildDict(self.FILENAME)
+        index = self.fs.getRepeatIndex()
+        self.assertIs(index, self.fs.getRepeatIndex())
+        expected = self.fs.getMultiSeqRepeats(self.fs.sequences, 3)
+        self.assertEqual(expected, index.getRepeats(3))
+        self.assertEqual(self.fs.getMostRepeats(expected), index.getMostRepeats(3))
+        self.fs.buildDict(self.FILENAME)
+        self.assertIsNot(index, self.fs.getRepeatIndex())
@@ -0,0 +1,88 @@
+"""
+Test Cases for bounded-memory top-k repeats
+"""
+from collections import Counter
+from unittest import TestCase
+from source import sequences, topk
+
+
+class TestTopk(TestCase):
+    """ Tests for topk.py """
+    FILENAME = 'tests/fixtures/dna.example.fasta'
+
+    def setUp(self):
+        """ Load the example file """
+        self.fs = sequences.FastaSeq()
+        self.fs.buildDict(self.FILENAME)
+
+    def tearDown(self):
+        """ Empty the instance dictionary """
+        self.fs.close()
+
+    ###########################################################################
+    #   T E S T  C A S E S
+    ###########################################################################
+
+    def test_space_saving_bound(self):
+        """ It should never undercount and overcount by at most N / capacity """
+        stream = list('aaaaabbbbccdefghaaijkb')
+        summary = topk.SpaceSaving(4)
+        for key in stream:
+            summary.update(key)
+        exact = Counter(stream)
+        self.assertEqual(4, len(summary.counters))
+        for key, count, error in summary.top(4):
+            self.assertGreaterEqual(count, exact[key])
+            self.assertLessEqual(count - exact[key], error)
+            self.assertLessEqual(error, summary.bound)
+        self.assertEqual('a', summary.top(1)[0][0])
+
+    def test_top_repeats_exact(self):
+        """ It should find the same most frequent repeat as getMostRepeats """
+        for length in (3, 6):
+            expected = self.fs.getMostRepeats(self.fs.getMultiSeqRepeats(self.fs.sequences, length))
+            self.assertEqual(expected, self.fs.getTopRepeats(self.fs.sequences, length, epsilon=0.001))
+
+    def test_top_repeats_estimates(self):
+        """ It should keep estimates within the error bound when not verifying """
+        exact = self.fs.getMultiSeqRepeats(self.fs.sequences, 4)
+        total = sum(exact.values())
+        result = self.fs.getTopRepeats(self.fs.sequences, 4, top=5, epsilon=0.01, verify=False)
+        self.assertEqual(5, len(result))
+        for key, count in result.items():
+            self.assertGreaterEqual(count, exact[key])
+            self.assertLessEqual(count - exact[key], 0.01 * total)
+
+    def test_guarantee(self):
+        """ It should flag top repeats that may be wrong because the true ones fell outside the summary """
+        other = sequences.FastaSeq()
+        other.buildDict('dna2.fasta')
+        expected = self.fs.getMostRepeats(other.getMultiSeqRepeats(other.sequences, 15))
+        result = other.getTopRepeats(other.sequences, 15, top=3, errors=True)
+        self.assertFalse(result['guaranteed'])
+        self.assertGreaterEqual(result['floor'], max(expected.values()))
+        with self.assertWarns(RuntimeWarning):
+            other.getTopRepeats(other.sequences, 15, top=3)
+        result = other.getTopRepeats(other.sequences, 15, top=3, epsilon=1e-5, errors=True)
+        self.assertTrue(result['guaranteed'])
+        self.assertEqual(next(iter(result['repeats'].items())), next(iter(expected.items())))
+        self.assertEqual(set(result['errors'].values()), {0})
+        other.close()
+
+    def test_estimate_errors(self):
+        """ It should return the error of every estimate and bound the true counts by it """
+        exact = self.fs.getMultiSeqRepeats(self.fs.sequences, 4)
+        result = self.fs.getTopRepeats(self.fs.sequences, 4, top=5, epsilon=0.01, verify=False, errors=True)
+        for key, count in result['repeats'].items():
+            self.assertLessEqual(count - result['errors'][key], exact[key])
+            self.assertLessEqual(exact[key], count)
+
+    def test_chunked_windows(self):
+        """ It should count windows that straddle chunk borders exactly once """
+        chunk = topk.CHUNK_SIZE
+        topk.CHUNK_SIZE = 5
+        try:
+            result = topk.verifyCounts(['ACACAGGGACACA'], 3, ['aca', 'cac', 'ggg'])
+        finally:
+            topk.CHUNK_SIZE = chunk
+        self.assertEqual({'aca': 4, 'cac': 2, 'ggg': 1}, result)